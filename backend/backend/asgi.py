@@ -12,11 +12,18 @@ import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.urls import path
-from futuboard.consumers import BoardConsumer
 
 settings_module = "backend.deployment" if "WEBSITE_HOSTNAME" in os.environ else "backend.settings"
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
 
+# Sets up Django, which has to be done before importing the consumers, as they use the models
+django_asgi_application = get_asgi_application()
+
+from futuboard.consumers import BoardConsumer  # noqa: E402
+
 application = ProtocolTypeRouter(
-    {"http": get_asgi_application(), "websocket": URLRouter([path("board/<uuid:board_id>", BoardConsumer.as_asgi())])}
+    {
+        "http": django_asgi_application,
+        "websocket": URLRouter([path("board/<uuid:board_id>", BoardConsumer.as_asgi())]),
+    }
 )
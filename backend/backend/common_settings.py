@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -62,6 +65,9 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_EXPOSE_HEADERS = ["Content-Disposition"]
 
+# Clients send their websocket client id with their changes, see futuboard/board_events.py
+CORS_ALLOW_HEADERS = (*default_headers, "x-client-id")
+
 ROOT_URLCONF = "backend.urls"
 
 TEMPLATES = [
@@ -80,7 +86,48 @@ TEMPLATES = [
     },
 ]
 
-CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+def get_channel_layers(url, backend="channels_redis.pubsub.RedisPubSubChannelLayer"):
+    """
+    Returns the channel layer that carries the board events to the websocket consumers, see futuboard/board_events.py.
+
+    Without a url, the in-memory layer is used, which only delivers events within one process. With the url of a
+    Redis compatible broker (e.g. redis://localhost:6379/0), every backend process shares the broker and the consumers
+    of one board can be spread over several processes. Several comma separated urls shard the groups over several
+    brokers. With the default pub/sub layer, sending to a group is one publish on the broker, which fans it out to the
+    processes that have consumers in the group, and each process delivers it to its own consumers.
+    """
+    if not url:
+        return {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+    return {"default": {"BACKEND": backend, "CONFIG": {"hosts": url.split(","), "prefix": "futuboard"}}}
+
+
+CHANNEL_LAYER_URL = os.environ.get("CHANNEL_LAYER_URL", "")
+CHANNEL_LAYERS = get_channel_layers(
+    CHANNEL_LAYER_URL, os.environ.get("CHANNEL_LAYER_BACKEND", "channels_redis.pubsub.RedisPubSubChannelLayer")
+)
+
+# The websocket connections of the boards are registered in the first broker of the channel layer, or in the memory of
+# each process without one, see futuboard/presence.py
+PRESENCE_URL = CHANNEL_LAYER_URL.split(",")[0]
+PRESENCE_HEARTBEAT_INTERVAL = 30
+PRESENCE_RATE_WINDOW = 5
+
+# Seconds for which the change events of a board are collected and coalesced before sending them to the clients,
+# see futuboard/board_events.py
+BOARD_EVENT_COALESCE_WINDOW = 0.05
+
+# Number of events that can wait to be sent to one websocket client. A connection that falls further behind gets a
+# resync frame instead of the events. This doesn't cover clients on slow networks, whose frames wait in the server's
+# write buffer instead, see futuboard/consumers.py
+BOARD_EVENT_QUEUE_SIZE = 100
+
+# Rows read at a time when exporting a board, and inserted at a time when importing one. Imports of files larger than
+# IMPORT_MAX_UPLOAD_SIZE bytes are rejected, see futuboard/board_import.py
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_UPLOAD_SIZE = 100 * 1024 * 1024
 
 WSGI_APPLICATION = "backend.wsgi.application"
 ASGI_APPLICATION = "backend.asgi.application"
@@ -16,3 +16,9 @@ DATABASES = {
         "PORT": config("DB_PORT"),
     }
 }
+
+CHANNEL_LAYER_URL = config("CHANNEL_LAYER_URL", default="")
+CHANNEL_LAYERS = get_channel_layers(  # noqa: F405
+    CHANNEL_LAYER_URL, config("CHANNEL_LAYER_BACKEND", default="channels_redis.pubsub.RedisPubSubChannelLayer")
+)
+PRESENCE_URL = CHANNEL_LAYER_URL.split(",")[0]
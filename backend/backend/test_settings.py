@@ -6,6 +6,7 @@ from .common_settings import *  # noqa: F403
 from .common_settings import BASE_DIR
 
 DISABLE_AUTH_TOKEN_CHECKING = True  # Disable authentication for testing purposes
+BOARD_EVENT_COALESCE_WINDOW = 0  # Send board events right away, tests that need coalescing set a window
 
 # Test database
 DATABASES = {
@@ -21,6 +21,7 @@ urlpatterns = [
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
     path("api/boards/", boardViews.all_boards, name="all_boards"),
     path("api/boards/<uuid:board_id>/", boardViews.board_by_id, name="board_by_id"),
+    path("api/boards/<uuid:board_id>/snapshot/", boardViews.board_snapshot, name="board_snapshot"),
     path("api/boards/<uuid:board_id>/title/", boardViews.update_board_title, name="update_board_title"),
     path(
         "api/boards/<uuid:board_id>/ticket_template/", boardViews.update_ticket_template, name="update_ticket_template"
@@ -34,6 +35,9 @@ urlpatterns = [
         name="tickets_on_column",
     ),
     path("api/boards/<uuid:board_id>/notes", boardViews.update_board_notes, name="update_board_notes"),
+    path("api/boards/<uuid:board_id>/event_metrics/", boardViews.board_event_metrics, name="board_event_metrics"),
+    path("api/boards/<uuid:board_id>/presence/", boardViews.board_presence, name="board_presence"),
+    path("api/presence/", boardViews.hot_boards, name="hot_boards"),
     path("api/tickets/<uuid:ticket_id>/", views.update_ticket, name="update_ticket"),
     path("api/boards/<uuid:board_id>/users/", views.users_on_board, name="users_on_board"),
     path("api/tickets/<uuid:ticket_id>/users/", views.users_on_ticket, name="users_on_ticket"),
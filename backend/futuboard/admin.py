@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Board, Column, Ticket, User, Action, Swimlanecolumn
+from .verification import check_if_password_hash_is_empty
 
 
 class BoardAdmin(admin.ModelAdmin):
@@ -13,6 +14,11 @@ class BoardAdmin(admin.ModelAdmin):
     ]
     list_display = ("title",)
 
+    def save_model(self, request, obj, form, change):
+        if "passwordhash" in form.changed_data:
+            obj.has_password = not check_if_password_hash_is_empty(obj.passwordhash)
+        super().save_model(request, obj, form, change)
+
 
 admin.site.register(Board, BoardAdmin)
 
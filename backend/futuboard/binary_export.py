@@ -0,0 +1,220 @@
+"""
+Compact binary format of board exports.
+
+The binary export has the same tables and fields as the JSON export, encoded as a stream of msgpack objects:
+
+    {"format": "futuboard-board", "version": 1}
+    then for each table, starting with the board:
+        {"table": key of the table, "fields": [names of the fields]}
+        arrays of at most chunk_size rows, each row an array of the values of the fields
+        an empty array, which ends the table
+
+The field names are written once per table instead of once per row, ids are written as 16 bytes instead of 36
+characters, and times as integer microseconds since the epoch instead of ISO text. The values are read from the models
+directly instead of through the serializers. Like the JSON export, the file is written and read a chunk of rows at a
+time, see export_reader.py.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import msgpack
+from django.db import models
+from django.db.models import Prefetch
+from rest_framework.renderers import BaseRenderer
+
+from .board_import import IMPORT_TABLES
+from .export_reader import BoardImportError
+from .models import Board
+from .serializers import BoardSerializer
+
+BINARY_CONTENT_TYPE = "application/vnd.futuboard.board+msgpack"
+FORMAT = "futuboard-board"
+FORMAT_VERSION = 1
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class BinaryExportRenderer(BaseRenderer):
+    """
+    Lets views negotiate the binary export with the Accept header. The views stream the export themselves.
+    """
+
+    media_type = BINARY_CONTENT_TYPE
+    format = "msgpack"
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+def encode_datetime(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def decode_datetime(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+def is_uuid_field(field):
+    if field.is_relation:
+        field = field.target_field
+    return isinstance(field, models.UUIDField)
+
+
+def get_encoder(field):
+    """
+    Returns the function that encodes the values of a field, or None if they are written as they are
+    """
+    if field.many_to_many:
+        return lambda related_ids: [related_id.bytes for related_id in related_ids]
+    if is_uuid_field(field):
+        return lambda value: None if value is None else value.bytes
+    if isinstance(field, models.DateTimeField):
+        return lambda value: None if value is None else encode_datetime(value)
+    return None
+
+
+def get_decoder(field):
+    """
+    Returns the function that decodes the values of a field, or None if they are read as they are
+    """
+    if field.many_to_many:
+        return lambda related_ids: [uuid.UUID(bytes=related_id) for related_id in related_ids]
+    if is_uuid_field(field):
+        return lambda value: None if value is None else uuid.UUID(bytes=value)
+    if isinstance(field, models.DateTimeField):
+        return lambda value: None if value is None else decode_datetime(value)
+    return None
+
+
+def get_binary_fields(model, serializer_class):
+    """
+    Returns the fields of the model that are in the JSON export of its table
+    """
+    model_fields = {field.name: field for field in model._meta.concrete_fields + model._meta.many_to_many}
+    return [model_fields[name] for name in serializer_class.Meta.fields if name in model_fields]
+
+
+def get_value(instance, field):
+    if field.many_to_many:
+        return [related.pk for related in getattr(instance, field.name).all()]
+    return getattr(instance, field.attname)
+
+
+def stream_table(packer, key, queryset, fields, chunk_size):
+    yield packer.pack({"table": key, "fields": [field.name for field in fields]})
+    encoders = [get_encoder(field) for field in fields]
+    # The related objects are only needed for their ids
+    many_to_many_fields = [field for field in fields if field.many_to_many]
+    queryset = queryset.prefetch_related(None).prefetch_related(
+        *[Prefetch(field.name, queryset=field.related_model.objects.only("pk")) for field in many_to_many_fields]
+    )
+    rows = []
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        values = [get_value(instance, field) for field in fields]
+        rows.append([value if encode is None else encode(value) for value, encode in zip(values, encoders)])
+        if len(rows) == chunk_size:
+            yield packer.pack(rows)
+            rows = []
+    if rows:
+        yield packer.pack(rows)
+    yield packer.pack([])
+
+
+def stream_board_msgpack(board, tables, chunk_size):
+    """
+    Yields the binary export of a board. tables are the tables of the export as (key, queryset, serializer class),
+    like in the JSON export.
+    """
+    packer = msgpack.Packer()
+    yield packer.pack({"format": FORMAT, "version": FORMAT_VERSION})
+    yield from stream_table(
+        packer, "board", Board.objects.filter(pk=board.pk), get_binary_fields(Board, BoardSerializer), chunk_size
+    )
+    for key, queryset, serializer_class in tables:
+        yield from stream_table(packer, key, queryset, get_binary_fields(queryset.model, serializer_class), chunk_size)
+
+
+END = object()
+
+
+class BinaryExportReader:
+    def __init__(self, file):
+        self.unpacker = msgpack.Unpacker(file, raw=False, max_buffer_size=16 * 1024 * 1024)
+
+    def next_object(self):
+        """
+        Returns the next object of the file, or END at the end of the file
+        """
+        try:
+            return next(self.unpacker)
+        except StopIteration:
+            return END
+        except (ValueError, msgpack.UnpackException) as error:
+            raise BoardImportError(f"Invalid export: {error}") from error
+
+    def read_row_chunks(self):
+        while True:
+            rows = self.next_object()
+            if rows is END:
+                raise BoardImportError("Invalid export: the file ends in the middle of a table")
+            if not isinstance(rows, list):
+                raise BoardImportError("Invalid export: rows must be in arrays")
+            if not rows:
+                return
+            yield rows
+
+    def read_rows(self, model, names):
+        model_fields = {field.name: field for field in model._meta.concrete_fields + model._meta.many_to_many}
+        decoders = [get_decoder(model_fields[name]) if name in model_fields else None for name in names]
+        for rows in self.read_row_chunks():
+            for row in rows:
+                if not isinstance(row, list) or len(row) != len(names):
+                    raise BoardImportError("Invalid export: a row doesn't match the fields of its table")
+                try:
+                    yield {
+                        name: value if decode is None else decode(value)
+                        for name, value, decode in zip(names, row, decoders)
+                    }
+                except (TypeError, ValueError) as error:
+                    raise BoardImportError(f"Invalid export: {error}") from error
+
+    def read_sections(self):
+        header = self.next_object()
+        if not isinstance(header, dict) or header.get("format") != FORMAT:
+            raise BoardImportError("The file is not a board export")
+        if header.get("version") != FORMAT_VERSION:
+            raise BoardImportError(f"Unsupported export version {header.get('version')}")
+
+        while (table := self.next_object()) is not END:
+            if not isinstance(table, dict) or not isinstance(table.get("fields"), list):
+                raise BoardImportError("Invalid export: expected the header of a table")
+
+            key = table.get("table")
+            model = Board if key == "board" else IMPORT_TABLES.get(key)
+            if model is None:
+                # Tables that are not imported are skipped
+                for _ in self.read_row_chunks():
+                    pass
+                continue
+
+            rows = self.read_rows(model, table["fields"])
+            if key == "board":
+                boards = list(rows)
+                if len(boards) != 1:
+                    raise BoardImportError("The export must have one board")
+                yield key, boards[0]
+            else:
+                yield key, rows
+                # Skip the rows that were not read
+                for _ in rows:
+                    pass
+
+
+def read_binary_export_sections(file):
+    """
+    Returns an iterator of the keys and values of the binary export in a file, in the same form as
+    export_reader.read_export_sections
+    """
+    return BinaryExportReader(file).read_sections()
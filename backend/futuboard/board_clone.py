@@ -0,0 +1,184 @@
+"""
+Copies of boards made inside the database.
+
+A board is copied with one INSERT ... SELECT statement per table, so the rows never leave the database. First every id of
+the board is given a new id in a temporary table of (old id, new id) pairs, then each table is copied from the rows whose
+ids are in the id table, with the primary key and the foreign keys replaced by joining them to it. References without
+a database constraint, like the tickets and columns of events, can point to rows that have been deleted, and those keep
+their old id. The rows of the many-to-many tables are copied the same way. The statements are generated from the models,
+and the whole copy runs in one transaction.
+"""
+
+import uuid
+
+from django.db import NotSupportedError, connection, transaction
+from django.db.models import UUIDField
+from django.utils import timezone
+
+from .chart_cache import rebuild_board_aggregates
+from .models import Action, Board, Column, ColumnSizeAggregate, Scope, Swimlanecolumn, Ticket, TicketEvent, User
+
+ID_TABLE = "board_clone_ids"
+
+# SQL that generates a new version 4 id, in the format the database stores UUIDField values in. SQLite stores them as
+# 32 hex digits, with the version digit set to 4 and the variant digit to one of 8, 9, a or b
+NEW_ID_SQL = {
+    "postgresql": "gen_random_uuid()",
+    "sqlite": (
+        "lower(hex(randomblob(4)) || hex(randomblob(2)) || '4' || substr(hex(randomblob(2)), 2) || "
+        "substr('89ab', 1 + (random() & 3), 1) || substr(hex(randomblob(2)), 2) || hex(randomblob(6)))"
+    ),
+}
+
+# Tables that are copied with their board, and the lookup from their rows to the board, in the order they are copied
+CLONE_TABLES = [
+    (Column, "boardid"),
+    (Swimlanecolumn, "columnid__boardid"),
+    (Ticket, "columnid__boardid"),
+    (Action, "ticketid__columnid__boardid"),
+    (Scope, "boardid"),
+    (User, "boardid"),
+]
+HISTORY_TABLES = [
+    (TicketEvent, "boardid"),
+    (ColumnSizeAggregate, "boardid"),
+]
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+def map_ids(cursor, model, lookup, board_id):
+    """
+    Gives new ids to the rows of the model that belong to the board
+    """
+    sql, params = model.objects.filter(**{lookup: board_id}).values("pk").query.sql_with_params()
+    cursor.execute(
+        f"INSERT INTO {ID_TABLE} (old_id, new_id) SELECT ids.{quote(model._meta.pk.column)}, "
+        f"{NEW_ID_SQL[connection.vendor]} FROM ({sql}) ids",
+        params,
+    )
+
+
+def copy_rows(cursor, model, values):
+    """
+    Copies the rows of the model whose ids are in the id table. values are SQL values with their parameters that
+    replace the values of some of the fields, by field name.
+    """
+    table = quote(model._meta.db_table)
+    columns = []
+    selects = []
+    joins = [f"JOIN {ID_TABLE} ids ON ids.old_id = rows.{quote(model._meta.pk.column)}"]
+    params = []
+    for i, field in enumerate(model._meta.concrete_fields):
+        columns.append(quote(field.column))
+        if field.primary_key:
+            selects.append("ids.new_id")
+        elif field.name in values:
+            sql, value = values[field.name]
+            selects.append(sql)
+            params.append(value)
+        elif field.is_relation:
+            joins.append(f"LEFT JOIN {ID_TABLE} ids{i} ON ids{i}.old_id = rows.{quote(field.column)}")
+            if field.db_constraint:
+                # Foreign keys to rows that are not copied are left empty
+                selects.append(f"ids{i}.new_id")
+            else:
+                # References without a constraint may point to deleted rows, e.g. the ticket of an event of a deleted
+                # ticket, and keep their old id
+                selects.append(f"COALESCE(ids{i}.new_id, rows.{quote(field.column)})")
+        else:
+            selects.append(f"rows.{quote(field.column)}")
+
+    cursor.execute(
+        f"INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join(selects)} FROM {table} rows {' '.join(joins)}",
+        params,
+    )
+
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        source = quote(through._meta.get_field(field.m2m_field_name()).column)
+        target = quote(through._meta.get_field(field.m2m_reverse_field_name()).column)
+        through_table = quote(through._meta.db_table)
+        cursor.execute(
+            f"INSERT INTO {through_table} ({source}, {target}) SELECT sources.new_id, targets.new_id "
+            f"FROM {through_table} rows JOIN {ID_TABLE} sources ON sources.old_id = rows.{source} "
+            f"JOIN {ID_TABLE} targets ON targets.old_id = rows.{target}"
+        )
+
+
+def add_creation_events(board_id, now):
+    """
+    Adds a CREATE event for every ticket of a board that has no history, with the ticket's current column, size and
+    scopes
+    """
+    tickets = Ticket.objects.filter(columnid__boardid=board_id).only("ticketid", "columnid", "size", "title")
+    events = {
+        ticket.ticketid: TicketEvent(
+            ticketid_id=ticket.ticketid,
+            boardid_id=board_id,
+            event_time=now,
+            event_type=TicketEvent.CREATE,
+            new_columnid_id=ticket.columnid_id,
+            old_size=0,
+            new_size=ticket.size,
+            title=ticket.title,
+        )
+        for ticket in tickets.iterator()
+    }
+    TicketEvent.objects.bulk_create(events.values())
+    new_scopes_through = TicketEvent.new_scopes.through
+    new_scopes_through.objects.bulk_create(
+        new_scopes_through(ticketevent_id=events[ticket_id].ticketeventid, scope_id=scope_id)
+        for ticket_id, scope_id in Scope.tickets.through.objects.filter(ticket__in=tickets).values_list(
+            "ticket_id", "scope_id"
+        )
+    )
+
+
+def clone_board(board_id, board_values, copy_history=True):
+    """
+    Copies a board with all of its tables, and returns the new board. board_values replace values of the board, e.g.
+    its title. The creation dates of the copied rows are set to the current time.
+
+    If copy_history is False, the ticket events of the board are not copied, and the new board's history starts with
+    a CREATE event for each of its tickets.
+    """
+    if connection.vendor not in NEW_ID_SQL:
+        raise NotSupportedError(f"Copying boards is not supported on {connection.vendor}")
+
+    now = timezone.now()
+    new_board_id = uuid.uuid4()
+    id_type = UUIDField().db_type(connection)
+    pk_field = Board._meta.pk
+    tables = CLONE_TABLES + (HISTORY_TABLES if copy_history else [])
+
+    creation_date = ("%s", Board._meta.get_field("creation_date").get_db_prep_save(now, connection))
+    new_board_values = {"creation_date": creation_date}
+    # A copy of a template's frozen board is an ordinary board, unless board_values say otherwise
+    for name, value in {"snapshot_templateid": None, **board_values, "revision": 0}.items():
+        new_board_values[name] = ("%s", Board._meta.get_field(name).get_db_prep_save(value, connection))
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {ID_TABLE}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {ID_TABLE} (old_id {id_type} PRIMARY KEY, new_id {id_type} NOT NULL)")
+        cursor.execute(
+            f"INSERT INTO {ID_TABLE} (old_id, new_id) VALUES (%s, %s)",
+            [pk_field.get_db_prep_value(board_id, connection), pk_field.get_db_prep_value(new_board_id, connection)],
+        )
+        for model, lookup in tables:
+            map_ids(cursor, model, lookup, board_id)
+
+        copy_rows(cursor, Board, new_board_values)
+        for model, _ in tables:
+            has_creation_date = any(field.name == "creation_date" for field in model._meta.concrete_fields)
+            copy_rows(cursor, model, {"creation_date": creation_date} if has_creation_date else {})
+
+        cursor.execute(f"DROP TABLE {ID_TABLE}")
+
+        if not copy_history:
+            add_creation_events(new_board_id, now)
+            rebuild_board_aggregates(new_board_id)
+
+    return Board.objects.get(pk=new_board_id)
@@ -0,0 +1,297 @@
+"""
+Change events sent to the websocket clients of a board.
+
+The write paths publish a typed event for every change they make, e.g. ticket_moved with the moved ticket's new row,
+so that clients can apply the change to their cached data instead of refetching whole columns. Events are sent to the
+board's channel group once the transaction that made the change has been committed.
+
+Every event is a JSON object with the fields:
+    type: one of the event types below
+    boardid: the board the change was made on
+    origin: client id from the X-Client-Id header of the request that made the change, so that clients can skip their
+        own changes, which they have already applied
+    data: the new row of the changed object, or the ids of a deleted object
+
+Events are not sent right away. The events of each board are collected for BOARD_EVENT_COALESCE_WINDOW seconds, so
+that e.g. the several requests of one drag and drop go out together. Within the window, an event that only carries the
+new state of an object replaces the earlier events of the same object from the same client. The remaining events are
+then encoded to JSON once and sent to the group as a single message, and the consumers send each of them to their
+client as a separate frame.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .revisions import bump_board_revision
+
+logger = logging.getLogger(__name__)
+
+BOARD_UPDATED = "board_updated"
+BOARD_DELETED = "board_deleted"
+COLUMN_CREATED = "column_created"
+COLUMN_UPDATED = "column_updated"
+COLUMN_DELETED = "column_deleted"
+COLUMNS_REORDERED = "columns_reordered"
+TICKET_CREATED = "ticket_created"
+TICKET_UPDATED = "ticket_updated"
+TICKET_MOVED = "ticket_moved"
+TICKET_DELETED = "ticket_deleted"
+SWIMLANECOLUMN_CREATED = "swimlanecolumn_created"
+SWIMLANECOLUMN_UPDATED = "swimlanecolumn_updated"
+ACTION_CREATED = "action_created"
+ACTION_UPDATED = "action_updated"
+ACTION_MOVED = "action_moved"
+ACTION_DELETED = "action_deleted"
+USER_CREATED = "user_created"
+USER_UPDATED = "user_updated"
+USER_DELETED = "user_deleted"
+SCOPE_CREATED = "scope_created"
+SCOPE_UPDATED = "scope_updated"
+SCOPE_DELETED = "scope_deleted"
+# Sent by a consumer instead of the events that its client fell too far behind to receive, see consumers.py
+RESYNC = "resync"
+
+CLIENT_ID_HEADER = "X-Client-Id"
+
+
+# Events that carry the whole new state of an object, by the field of the object's id in the event data. An event like
+# this replaces the earlier events of the same object in the coalescing window, deletions are never merged.
+STATE_EVENT_ID_FIELDS = {
+    BOARD_UPDATED: "boardid",
+    COLUMN_UPDATED: "columnid",
+    TICKET_CREATED: "ticketid",
+    TICKET_UPDATED: "ticketid",
+    TICKET_MOVED: "ticketid",
+    SWIMLANECOLUMN_UPDATED: "swimlanecolumnid",
+    ACTION_CREATED: "actionid",
+    ACTION_UPDATED: "actionid",
+    ACTION_MOVED: "actionid",
+    USER_CREATED: "userid",
+    USER_UPDATED: "userid",
+    SCOPE_UPDATED: "scopeid",
+}
+
+# When events of the same object are merged, the merged event gets the type that ranks highest here. A client applies
+# an event of a created object the same way as an update, and a move also removes the object from its old column.
+MERGED_EVENT_TYPE_RANKS = {
+    TICKET_CREATED: 2,
+    TICKET_MOVED: 1,
+    ACTION_CREATED: 2,
+    ACTION_MOVED: 1,
+    USER_CREATED: 1,
+}
+
+
+def get_group_name(board_id):
+    return str(board_id)
+
+
+def encode_board_event(board_id, event):
+    return json.dumps(
+        {"type": event["type"], "boardid": str(board_id), "origin": event["origin"], "data": event["data"]},
+        cls=DjangoJSONEncoder,
+    )
+
+
+def encode_resync_event(board_id):
+    return encode_board_event(board_id, {"type": RESYNC, "origin": None, "data": None})
+
+
+# Counters of each board in this process:
+#     events_published: events published by the views
+#     events_coalesced: events that were merged into a later event of the same object
+#     messages_sent: group messages sent to the channel layer
+#     frames_sent: frames sent by the consumers of this process to their clients
+#     frames_dropped: frames that the consumers of this process dropped because their client fell behind
+#     resyncs_sent: resync frames sent instead of the dropped frames
+board_event_metrics = defaultdict(Counter)
+metrics_lock = threading.Lock()
+
+
+def count_board_event_metric(board_id, name, count=1):
+    with metrics_lock:
+        board_event_metrics[str(board_id)][name] += count
+
+
+def get_board_event_metrics(board_id):
+    with metrics_lock:
+        metrics = board_event_metrics.get(str(board_id), Counter())
+        return {
+            name: metrics[name]
+            for name in [
+                "events_published",
+                "events_coalesced",
+                "messages_sent",
+                "frames_sent",
+                "frames_dropped",
+                "resyncs_sent",
+            ]
+        }
+
+
+async def send_to_board_async(board_id, texts):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    try:
+        await channel_layer.group_send(get_group_name(board_id), {"type": "board_event", "texts": texts})
+        count_board_event_metric(board_id, "messages_sent")
+    except Exception:
+        # The change has been saved already, a client that misses the event catches up when it reconnects
+        logger.exception("Sending board events failed")
+
+
+def send_to_board(board_id, texts):
+    async_to_sync(send_to_board_async)(board_id, texts)
+
+
+async def get_running_loop():
+    return asyncio.get_running_loop()
+
+
+def get_server_event_loop():
+    """
+    Returns the event loop of the ASGI server, also when called from a sync view that the server runs in a thread, or
+    None when there is no server loop, e.g. under WSGI or in management commands
+    """
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    loop = async_to_sync(get_running_loop)()
+    # Without a server loop, async_to_sync runs the coroutine in a loop of its own, which is closed by now
+    return None if loop.is_closed() else loop
+
+
+def merge_board_events(earlier, later):
+    merged_type = max(
+        earlier["type"], later["type"], key=lambda event_type: MERGED_EVENT_TYPE_RANKS.get(event_type, 0)
+    )
+    merged_data = {**earlier["data"], **later["data"]}
+    if merged_type == TICKET_MOVED and "old_columnid" in earlier["data"]:
+        # The client still has the ticket in the column it was in before the first move
+        merged_data["old_columnid"] = earlier["data"]["old_columnid"]
+    elif merged_type != TICKET_MOVED:
+        merged_data.pop("old_columnid", None)
+    return {**later, "type": merged_type, "data": merged_data}
+
+
+class BoardEventBuffer:
+    """
+    Collects the events of each board for a short window and sends them to the board's group in one message.
+
+    The window is timed on the event loop of the server, and the events are sent from that loop. The channel layer
+    wakes up the consumers waiting on it only from their own loop, so events sent from another thread would wait for
+    whatever wakes up the consumers next. Without a server loop, the window is timed by a timer thread instead.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # The events waiting to be sent, by board and by the key of the object that they are about
+        self.pending_events = {}
+        # Boards whose events are waiting for their window to end
+        self.scheduled_boards = set()
+        # Running flushes, so that their tasks are not garbage collected before they finish
+        self.flush_tasks = set()
+
+    def get_event_key(self, event):
+        id_field = STATE_EVENT_ID_FIELDS.get(event["type"])
+        if id_field is None or id_field not in event["data"]:
+            # Every event that can't be merged gets its own key
+            return object()
+        entity = event["type"].rsplit("_", 1)[0]
+        return (event["origin"], entity, str(event["data"][id_field]))
+
+    def add(self, board_id, events, window):
+        board_id = str(board_id)
+        coalesced_count = 0
+        with self.lock:
+            pending_events = self.pending_events.setdefault(board_id, {})
+            for event in events:
+                key = self.get_event_key(event)
+                earlier = pending_events.pop(key, None)
+                if earlier is not None:
+                    # The merged event takes the place of the later event, so that it comes after everything that
+                    # happened before it
+                    event = merge_board_events(earlier, event)
+                    coalesced_count += 1
+                pending_events[key] = event
+
+            schedule_flush = window > 0 and board_id not in self.scheduled_boards
+            if schedule_flush:
+                self.scheduled_boards.add(board_id)
+
+        count_board_event_metric(board_id, "events_published", len(events))
+        count_board_event_metric(board_id, "events_coalesced", coalesced_count)
+        if window <= 0:
+            self.flush(board_id)
+        elif schedule_flush:
+            self.schedule_flush(board_id, window)
+
+    def schedule_flush(self, board_id, window):
+        loop = get_server_event_loop()
+        if loop is None:
+            timer = threading.Timer(window, self.flush, args=[board_id])
+            timer.daemon = True
+            timer.start()
+        else:
+            loop.call_soon_threadsafe(loop.call_later, window, self.start_flush_task, loop, board_id)
+
+    def start_flush_task(self, loop, board_id):
+        task = loop.create_task(self.flush_async(board_id))
+        self.flush_tasks.add(task)
+        task.add_done_callback(self.flush_tasks.discard)
+
+    def pop_texts(self, board_id):
+        with self.lock:
+            events = self.pending_events.pop(board_id, {})
+            self.scheduled_boards.discard(board_id)
+        return [encode_board_event(board_id, event) for event in events.values()]
+
+    def flush(self, board_id):
+        texts = self.pop_texts(str(board_id))
+        if texts:
+            send_to_board(board_id, texts)
+
+    async def flush_async(self, board_id):
+        texts = self.pop_texts(str(board_id))
+        if texts:
+            await send_to_board_async(board_id, texts)
+
+    def flush_all(self):
+        with self.lock:
+            board_ids = list(self.pending_events)
+        for board_id in board_ids:
+            self.flush(board_id)
+
+
+board_event_buffer = BoardEventBuffer()
+
+
+def publish_board_events(request, board_id, events):
+    """
+    Sends change events to the websocket clients of a board after the current transaction has been committed.
+    The events are given as (event_type, data) pairs, and are coalesced with the other events of the board that are
+    published within BOARD_EVENT_COALESCE_WINDOW seconds. Also increases the revision of the board, in the transaction
+    of the change.
+    """
+    origin = request.headers.get(CLIENT_ID_HEADER)
+    events = [{"type": event_type, "origin": origin, "data": data} for event_type, data in events]
+    if events:
+        bump_board_revision(board_id)
+        window = getattr(settings, "BOARD_EVENT_COALESCE_WINDOW", 0)
+        transaction.on_commit(lambda: board_event_buffer.add(board_id, events, window))
+
+
+def publish_board_event(request, board_id, event_type, data):
+    publish_board_events(request, board_id, [(event_type, data)])
@@ -0,0 +1,161 @@
+"""
+Bulk insert of the board data of an export.
+
+The ids of the export are replaced with new ones, so the same export can be imported many times. The tables and fields
+that hold ids are known from the models, so only those are replaced, in one pass over the rows.
+
+The sections of the export are imported in the order they are read, batch_size rows at a time, so a whole export never
+has to be in memory, see export_reader.py. Foreign keys are set by id, without loading the related rows, and the
+many-to-many values of a batch are inserted into the through tables in bulk. The foreign key constraints are checked at
+the end of the transaction the whole import runs in, so the sections can come in any order, and a board that fails to
+import leaves nothing behind.
+"""
+
+import uuid
+from collections.abc import Iterator
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from .chart_cache import rebuild_board_aggregates
+from .export_reader import BoardImportError
+from .models import Action, Board, Column, Scope, Swimlanecolumn, Ticket, TicketEvent, User
+
+# Key of the table in the export -> model
+IMPORT_TABLES = {
+    "columns": Column,
+    "swimlanecolumns": Swimlanecolumn,
+    "tickets": Ticket,
+    "actions": Action,
+    "scopes": Scope,
+    "ticketEvents": TicketEvent,
+    "users": User,
+}
+
+
+def get_id_fields(model):
+    """
+    Returns the names of the fields of the model's rows in an export that hold ids, i.e. the primary key and the
+    foreign keys, and the names of the fields that hold lists of ids, i.e. the many-to-many fields
+    """
+    id_fields = [field.name for field in model._meta.concrete_fields if field.primary_key or field.is_relation]
+    id_list_fields = [field.name for field in model._meta.many_to_many]
+    return id_fields, id_list_fields
+
+
+class IdReplacer:
+    """
+    Replaces the ids of the rows of an export with new ids, so that the same old id gets the same new id everywhere.
+    Only the id fields of each table are replaced, other values are copied as they are, even if they look like ids.
+    """
+
+    def __init__(self):
+        self.new_ids = {}
+
+    def get_new_id(self, old_id):
+        if old_id is None:
+            return None
+        old_id = str(old_id)
+        if old_id not in self.new_ids:
+            self.new_ids[old_id] = str(uuid.uuid4())
+        return self.new_ids[old_id]
+
+    def replace_row_ids(self, model, id_fields, id_list_fields, row):
+        if not isinstance(row, dict):
+            raise BoardImportError(f"Rows of {model._meta.db_table} must be objects")
+        if model._meta.pk.name not in row:
+            raise BoardImportError(f"A row of {model._meta.db_table} has no {model._meta.pk.name}")
+        for name in id_fields:
+            if name in row:
+                row[name] = self.get_new_id(row[name])
+        for name in id_list_fields:
+            if row.get(name) is None:
+                continue
+            if not isinstance(row[name], list):
+                raise BoardImportError(f"{name} of {model._meta.db_table} must be a list")
+            row[name] = [self.get_new_id(old_id) for old_id in row[name]]
+
+
+def build_instance(model, row):
+    """
+    Returns an unsaved instance of the model from a row of the export, and the many-to-many values of the row by field.
+    Keys that are not fields of the model are ignored.
+    """
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.name in row:
+            # Foreign keys are set by id, e.g. columnid_id for columnid
+            values[field.attname] = row[field.name]
+    many_to_many_values = {
+        field: row[field.name] for field in model._meta.many_to_many if row.get(field.name) is not None
+    }
+    return model(**values), many_to_many_values
+
+
+def bulk_insert_rows(model, rows, batch_size):
+    """
+    Inserts rows of one table, and the rows of the through tables of its many-to-many fields
+    """
+    instances = []
+    through_rows = {}
+    for row in rows:
+        instance, many_to_many_values = build_instance(model, row)
+        instances.append(instance)
+        for field, related_ids in many_to_many_values.items():
+            through = field.remote_field.through
+            source_attname = through._meta.get_field(field.m2m_field_name()).attname
+            target_attname = through._meta.get_field(field.m2m_reverse_field_name()).attname
+            through_rows.setdefault(through, []).extend(
+                through(**{source_attname: instance.pk, target_attname: related_id}) for related_id in related_ids
+            )
+
+    model.objects.bulk_create(instances, batch_size=batch_size)
+    for through, through_instances in through_rows.items():
+        through.objects.bulk_create(through_instances, batch_size=batch_size)
+
+
+def import_board(sections, board_values):
+    """
+    Imports a board from the sections of an export, given as (key, value) pairs. The value of the board section is the
+    row of the board, and the values of the tables are lists or iterators of rows. Sections that are not imported are
+    skipped. board_values replace values of the board row, e.g. its title.
+
+    Returns the new board. Raises BoardImportError if the sections are not a valid export, in which case nothing is
+    imported.
+    """
+    batch_size = getattr(settings, "IMPORT_BATCH_SIZE", 1000)
+    id_replacer = IdReplacer()
+    board = None
+    with transaction.atomic():
+        for key, value in sections:
+            if key == "board":
+                if board is not None:
+                    raise BoardImportError("The export has more than one board")
+                id_replacer.replace_row_ids(Board, *get_id_fields(Board), value)
+                board, _ = build_instance(Board, {**value, **board_values})
+                board.save(force_insert=True)
+            elif key in IMPORT_TABLES:
+                model = IMPORT_TABLES[key]
+                if not isinstance(value, (list, Iterator)):
+                    raise BoardImportError(f"{key} must be a list")
+                id_fields, id_list_fields = get_id_fields(model)
+                # Exports from before ticket events had a board don't have one in their events
+                board_fields = [
+                    field.name
+                    for field in model._meta.concrete_fields
+                    if field.is_relation and field.related_model is Board
+                ]
+                rows = iter(value)
+                while batch := list(islice(rows, batch_size)):
+                    for row in batch:
+                        id_replacer.replace_row_ids(model, id_fields, id_list_fields, row)
+                        for name in board_fields:
+                            if row.get(name) is None and board is not None:
+                                row[name] = board.boardid
+                    bulk_insert_rows(model, batch, batch_size)
+
+        if board is None:
+            raise BoardImportError("The export has no board")
+        rebuild_board_aggregates(board.boardid)
+    return board
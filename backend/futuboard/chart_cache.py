@@ -0,0 +1,198 @@
+"""
+Pre-aggregated column sizes for the cumulative flow chart.
+
+Every TicketEvent changes the size and ticket count of one or two columns. Those changes are summed into
+ColumnSizeAggregate rows per column and day, week and month when the event is written, so the cumulative flow
+chart only has to read one row per column and time bucket instead of replaying the whole event history.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Column, ColumnSizeAggregate, TicketEvent
+from .time_buckets import DATE_TIME_FORMAT, get_time_delta, round_time
+
+AGGREGATED_TIME_UNITS = [ColumnSizeAggregate.DAY, ColumnSizeAggregate.WEEK, ColumnSizeAggregate.MONTH]
+
+# Chart time units that can be read from the aggregates, and the aggregated time unit they are read from
+CACHED_TIME_UNITS = {"day": "day", "week": "week", "month": "month", "year": "month"}
+
+
+def get_column_changes(event):
+    """
+    Returns (columnid, size change, count change) for every column the event touches. A column is listed even if
+    its size doesn't change, so that the earliest event of every column can be found from the aggregates.
+    """
+    old_size = int(event.old_size)
+    new_size = int(event.new_size)
+
+    if event.event_type in (TicketEvent.CREATE, TicketEvent.SNAPSHOT):
+        return [(event.new_columnid_id, new_size, 1)]
+    if event.event_type == TicketEvent.DELETE:
+        return [(event.old_columnid_id, -old_size, -1)]
+    if event.event_type == TicketEvent.MOVE:
+        return [(event.old_columnid_id, -old_size, -1), (event.new_columnid_id, new_size, 1)]
+    if event.event_type == TicketEvent.UPDATE:
+        return [(event.new_columnid_id, new_size - old_size, 0)]
+
+    # Scope changes don't change column sizes
+    column_ids = {event.old_columnid_id, event.new_columnid_id}
+    return [(column_id, 0, 0) for column_id in column_ids if column_id is not None]
+
+
+def get_aggregate_changes(events):
+    """
+    Sums the column changes of the events into a dict of (columnid, time_unit, bucket) -> [size change, count change]
+    """
+    changes = defaultdict(lambda: [0, 0])
+
+    for event in events:
+        for column_id, size_change, count_change in get_column_changes(event):
+            keys = [
+                (column_id, time_unit, round_time(event.event_time, time_unit)) for time_unit in AGGREGATED_TIME_UNITS
+            ]
+            keys.append((column_id, ColumnSizeAggregate.CURRENT, ColumnSizeAggregate.CURRENT_BUCKET))
+
+            for key in keys:
+                changes[key][0] += size_change
+                changes[key][1] += count_change
+
+    return changes
+
+
+def add_to_aggregate(board_id, column_id, time_unit, bucket, size_change, count_change):
+    """
+    Adds the changes to an aggregate row, and creates the row if it doesn't exist yet
+    """
+    aggregates = ColumnSizeAggregate.objects.filter(columnid=column_id, time_unit=time_unit, bucket=bucket)
+    increments = {"size_change": F("size_change") + size_change, "count_change": F("count_change") + count_change}
+    if aggregates.update(**increments):
+        return
+
+    try:
+        with transaction.atomic():
+            ColumnSizeAggregate.objects.create(
+                boardid_id=board_id,
+                columnid_id=column_id,
+                time_unit=time_unit,
+                bucket=bucket,
+                size_change=size_change,
+                count_change=count_change,
+            )
+    except IntegrityError:
+        # Another writer created the row after the update didn't find it
+        aggregates.update(**increments)
+
+
+def record_ticket_events(events):
+    """
+    Adds the changes of newly saved events to the aggregates of their columns
+    """
+    changes = get_aggregate_changes(events)
+    board_ids = {
+        column_id: event.boardid_id
+        for event in events
+        for column_id in [event.old_columnid_id, event.new_columnid_id]
+        if column_id is not None
+    }
+
+    with transaction.atomic():
+        for (column_id, time_unit, bucket), (size_change, count_change) in changes.items():
+            add_to_aggregate(board_ids[column_id], column_id, time_unit, bucket, size_change, count_change)
+
+
+def rebuild_board_aggregates(board_id):
+    """
+    Recomputes the aggregates of a board from its whole event history. Used when events are added in bulk, e.g. when
+    importing a board, or when events are removed.
+    """
+    ticket_events = TicketEvent.objects.filter(boardid=board_id).only(
+        "event_time", "event_type", "old_columnid", "new_columnid", "old_size", "new_size"
+    )
+    changes = get_aggregate_changes(ticket_events.iterator())
+    # Events of deleted columns are kept, but the columns have no aggregates
+    column_ids = set(Column.objects.filter(boardid=board_id).values_list("columnid", flat=True))
+
+    with transaction.atomic():
+        ColumnSizeAggregate.objects.filter(boardid=board_id).delete()
+        ColumnSizeAggregate.objects.bulk_create(
+            ColumnSizeAggregate(
+                boardid_id=board_id,
+                columnid_id=column_id,
+                time_unit=time_unit,
+                bucket=bucket,
+                size_change=size_change,
+                count_change=count_change,
+            )
+            for (column_id, time_unit, bucket), (size_change, count_change) in changes.items()
+            if column_id in column_ids
+        )
+
+
+def get_column_sizes_from_aggregates(columns, time_unit, count_unit, start_time=None, end_time=None):
+    """
+    Same as chartViews.get_column_sizes_at_times, but computed from the aggregates.
+    Only reads the aggregate rows from the start time onwards, so the cost depends on the number of time buckets
+    between the start time and now, not on the length of the board's history.
+    """
+    change_field = "size_change" if count_unit == "size" else "count_change"
+    aggregates = ColumnSizeAggregate.objects.filter(columnid__in=columns)
+
+    current_sizes = dict(
+        aggregates.filter(time_unit=ColumnSizeAggregate.CURRENT).values_list("columnid", change_field)
+    )
+    if len(current_sizes) == 0:
+        return []
+
+    bucket_aggregates = aggregates.filter(time_unit=CACHED_TIME_UNITS[time_unit])
+
+    earliest_bucket = bucket_aggregates.order_by("bucket").values_list("bucket", flat=True).first()
+    earliest_event_time = round_time(earliest_bucket.replace(tzinfo=None), time_unit)
+
+    if start_time is None:
+        start_time = earliest_event_time
+    else:
+        start_time = datetime.fromisoformat(start_time)
+
+    start_time = round_time(start_time, time_unit)
+
+    if end_time is None:
+        end_time = datetime.now()
+    else:
+        end_time = datetime.fromisoformat(end_time)
+
+    end_time = round_time(end_time, time_unit)
+
+    # Changes from the start time onwards, by timestamp of the time bucket
+    changes_by_time = defaultdict(lambda: defaultdict(int))
+    column_sizes = {str(column.columnid): 0 for column in columns}
+    for column_id, size in current_sizes.items():
+        column_sizes[str(column_id)] = size
+
+    bucket_rows = bucket_aggregates.filter(bucket__gte=start_time.replace(tzinfo=timezone.utc)).values_list(
+        "columnid", "bucket", change_field
+    )
+    for column_id, bucket, change in bucket_rows:
+        timestamp = round_time(bucket, time_unit).strftime(DATE_TIME_FORMAT)
+        changes_by_time[timestamp][str(column_id)] += change
+        # The current sizes minus all changes from the start time onwards are the sizes before the start time
+        column_sizes[str(column_id)] -= change
+
+    final_data = []
+    time = start_time
+    time_delta = get_time_delta(time_unit)
+
+    while time <= end_time:
+        timestamp = time.strftime(DATE_TIME_FORMAT)
+        column_sizes = column_sizes.copy()
+
+        for column_id, change in changes_by_time.get(timestamp, {}).items():
+            column_sizes[column_id] += change
+
+        time += time_delta
+        final_data.append((timestamp, column_sizes))
+
+    return final_data
@@ -1,30 +1,74 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-import json
+from django.conf import settings
+
+from .board_events import count_board_event_metric, encode_resync_event, get_group_name
+from .presence import MESSAGES, get_presence_registry
 
 
 class BoardConsumer(AsyncWebsocketConsumer):
+    """
+    Sends the change events of a board to a client. The events are published by the views that make the changes
+    (see board_events.py), messages sent by clients are ignored.
+
+    Events are put in a bounded queue of the connection and sent from there by a separate task, so that sending
+    doesn't hold up receiving from the channel layer. If the queue would overflow, the connection has fallen too far
+    behind to catch up with the events: the queued events are dropped, and the client gets a single resync frame
+    instead, telling it to fetch the board again.
+
+    The queue only fills up when self.send is slower than the events arrive. ASGI servers like daphne don't make send
+    wait for a client's socket: the frames are buffered by the server, and the consumer can't see how much is waiting
+    there. So the queue guards against a connection whose task falls behind, e.g. on a busy event loop, but it doesn't
+    detect a client on a slow network, whose frames pile up in the server's write buffer instead.
+
+    The connection is registered in the presence registry of the board for as long as it is open, see presence.py.
+    """
+
     async def connect(self):
         self.board_id = self.scope["url_route"]["kwargs"]["board_id"]
+        self.frame_queue = asyncio.Queue(maxsize=getattr(settings, "BOARD_EVENT_QUEUE_SIZE", 100))
+        self.presence = get_presence_registry()
 
-        await self.channel_layer.group_add(str(self.board_id), self.channel_name)
+        await self.channel_layer.group_add(get_group_name(self.board_id), self.channel_name)
+        # Registered before accepting, so that the connection is counted as soon as the client sees it open
+        await sync_to_async(self.presence.add_connection)(self.board_id, self.channel_name)
+        self.registered = True
         await self.accept()
+        self.tasks = [asyncio.create_task(self.send_frames()), asyncio.create_task(self.send_heartbeats())]
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(str(self.board_id), self.channel_name)
-
-    async def receive(self, text_data):
-        message = text_data
-
-        await self.channel_layer.group_send(
-            str(self.board_id),
-            {
-                "type": "board_update",
-                "message": message,
-            },
-        )
-
-    async def board_update(self, event):
-        # Extract the message from the event
-        message = event["message"]
-        # Send the message to the WebSocket
-        await self.send(text_data=json.dumps(message))
+        for task in getattr(self, "tasks", []):
+            task.cancel()
+        await self.channel_layer.group_discard(get_group_name(self.board_id), self.channel_name)
+        if getattr(self, "registered", False):
+            await sync_to_async(self.presence.remove_connection)(self.board_id, self.channel_name)
+
+    async def send_frames(self):
+        while True:
+            text = await self.frame_queue.get()
+            count_board_event_metric(self.board_id, "frames_sent")
+            self.presence.count(self.board_id, MESSAGES)
+            await self.send(text_data=text)
+
+    async def send_heartbeats(self):
+        while True:
+            await asyncio.sleep(self.presence.heartbeat_interval)
+            await sync_to_async(self.presence.refresh_connection)(self.board_id, self.channel_name)
+
+    async def board_event(self, event):
+        # The events are already encoded to JSON by the view that published them
+        texts = event["texts"]
+        if self.frame_queue.qsize() + len(texts) > self.frame_queue.maxsize:
+            dropped_count = len(texts)
+            while not self.frame_queue.empty():
+                self.frame_queue.get_nowait()
+                dropped_count += 1
+            self.frame_queue.put_nowait(encode_resync_event(self.board_id))
+            count_board_event_metric(self.board_id, "frames_dropped", dropped_count)
+            count_board_event_metric(self.board_id, "resyncs_sent")
+            return
+
+        for text in texts:
+            self.frame_queue.put_nowait(text)
@@ -0,0 +1,108 @@
+"""
+Compaction of old ticket history.
+
+Every change of a ticket adds a TicketEvent, so the table only grows, and replaying a board's history gets slower as the
+board ages. compact_board_events moves the events of a board from before a cutoff time to the ArchivedTicketEvent table,
+and replaces them with one SNAPSHOT event per ticket that existed at the cutoff time, with the column, size and scopes
+the ticket had then. The charts replay a SNAPSHOT like a CREATE, so their values from the cutoff time onwards don't
+change, while the event table only holds the snapshots and the events after them. The archive keeps the whole history.
+
+The column size aggregates are not touched, as they already sum the history into time buckets, see chart_cache.py.
+Snapshots from an earlier compaction are older than a later cutoff time, so they are replaced by the new snapshots
+instead of being archived.
+"""
+
+from django.db import transaction
+
+from .models import ArchivedTicketEvent, TicketEvent
+
+
+def get_scope_ids_by_event(scopes_field, events):
+    scope_ids = {}
+    rows = scopes_field.through.objects.filter(ticketevent__in=events).values_list("ticketevent_id", "scope_id")
+    for event_id, scope_id in rows.iterator():
+        scope_ids.setdefault(event_id, []).append(scope_id)
+    return scope_ids
+
+
+def archive_events(events, batch_size):
+    """
+    Copies the events to the archive, except for snapshots, and deletes them. Returns the number of archived events.
+    """
+    old_scope_ids = get_scope_ids_by_event(TicketEvent.old_scopes, events)
+    new_scope_ids = get_scope_ids_by_event(TicketEvent.new_scopes, events)
+    archived = ArchivedTicketEvent.objects.bulk_create(
+        (
+            ArchivedTicketEvent(
+                ticketeventid=event.ticketeventid,
+                ticketid=event.ticketid_id,
+                boardid_id=event.boardid_id,
+                event_time=event.event_time,
+                event_type=event.event_type,
+                old_columnid=event.old_columnid_id,
+                new_columnid=event.new_columnid_id,
+                old_size=event.old_size,
+                new_size=event.new_size,
+                old_scopes=[str(scope_id) for scope_id in old_scope_ids.get(event.ticketeventid, [])],
+                new_scopes=[str(scope_id) for scope_id in new_scope_ids.get(event.ticketeventid, [])],
+                title=event.title,
+            )
+            for event in events.exclude(event_type=TicketEvent.SNAPSHOT).iterator(chunk_size=batch_size)
+        ),
+        batch_size=batch_size,
+    )
+    events.delete()
+    return len(archived)
+
+
+def get_ticket_states(events):
+    """
+    Replays the events of tickets, and returns the last event of every ticket that wasn't deleted, with the scopes the
+    ticket had after it, by ticket id
+    """
+    last_events = {}
+    for event in events.order_by("event_time").iterator():
+        if event.event_type == TicketEvent.DELETE:
+            last_events.pop(event.ticketid_id, None)
+        else:
+            last_events[event.ticketid_id] = event
+    scope_ids = get_scope_ids_by_event(TicketEvent.new_scopes, events)
+    return {ticket_id: (event, scope_ids.get(event.ticketeventid, [])) for ticket_id, event in last_events.items()}
+
+
+def compact_board_events(board_id, cutoff_time, batch_size=1000):
+    """
+    Archives the events of the board from before the cutoff time, and adds a snapshot of every ticket at the cutoff time
+    in their place. Returns the number of archived events and the number of snapshots.
+    """
+    events = TicketEvent.objects.filter(boardid=board_id, event_time__lt=cutoff_time)
+
+    with transaction.atomic():
+        ticket_states = get_ticket_states(events)
+        snapshots = [
+            TicketEvent(
+                ticketid_id=ticket_id,
+                boardid_id=board_id,
+                event_time=cutoff_time,
+                event_type=TicketEvent.SNAPSHOT,
+                new_columnid_id=event.new_columnid_id,
+                old_size=0,
+                new_size=event.new_size,
+                title=event.title,
+            )
+            for ticket_id, (event, _) in ticket_states.items()
+        ]
+        archived = archive_events(events, batch_size)
+
+        TicketEvent.objects.bulk_create(snapshots, batch_size=batch_size)
+        new_scopes_through = TicketEvent.new_scopes.through
+        new_scopes_through.objects.bulk_create(
+            (
+                new_scopes_through(ticketevent_id=snapshot.ticketeventid, scope_id=scope_id)
+                for snapshot, (_, scope_ids) in zip(snapshots, ticket_states.values())
+                for scope_id in scope_ids
+            ),
+            batch_size=batch_size,
+        )
+
+    return archived, len(snapshots)
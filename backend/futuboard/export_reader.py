@@ -0,0 +1,127 @@
+"""
+Incremental reader of board export files.
+
+An export is a JSON object whose values are the board and the lists of rows of each table. The reader reads the file a
+chunk at a time and decodes one value at a time, so only the current chunk and row are in memory, however large the
+file is. The values of the lists are yielded row by row as they are read. A value that is still not valid JSON after
+max_value_size characters is rejected without reading the rest of the file.
+"""
+
+import codecs
+import json
+
+WHITESPACE = " \t\n\r"
+
+
+class BoardImportError(ValueError):
+    """
+    Raised when a file is not a valid board export
+    """
+
+
+class ExportReader:
+    def __init__(self, file, chunk_size=64 * 1024, max_value_size=16 * 1024 * 1024):
+        self.max_value_size = max_value_size
+        self.chunks = iter(lambda: file.read(chunk_size), b"")
+        self.text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+
+    def read_more(self):
+        """
+        Adds the next chunk of the file to the buffer, dropping the part that has been read. Returns False at the end of
+        the file.
+        """
+        chunk = next(self.chunks, None)
+        try:
+            text = self.text_decoder.decode(chunk or b"", final=chunk is None)
+        except UnicodeDecodeError as error:
+            raise BoardImportError("Invalid JSON: the file is not UTF-8") from error
+        if chunk is None:
+            return False
+        self.buffer = self.buffer[self.position :] + text
+        self.position = 0
+        return True
+
+    def peek(self):
+        """
+        Returns the next character that is not whitespace, or an empty string at the end of the file
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_more():
+                return ""
+
+    def expect(self, characters):
+        character = self.peek()
+        if not character or character not in characters:
+            found = f"'{character}'" if character else "the end of the file"
+            raise BoardImportError(f"Invalid JSON: expected one of '{characters}', found {found}")
+        self.position += 1
+        return character
+
+    def decode_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as error:
+                # The value may continue in the next chunk, but a single row can't take up most of the memory
+                if len(self.buffer) - self.position > self.max_value_size:
+                    raise BoardImportError(f"Invalid JSON: {error.msg}, or a value is too large") from error
+                if self.read_more():
+                    continue
+                raise BoardImportError(f"Invalid JSON: {error.msg}") from error
+            # A number at the end of the buffer may also continue in the next chunk
+            if end == len(self.buffer) and self.read_more():
+                continue
+            self.position = end
+            return value
+
+    def read_list(self):
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.decode_value()
+            if self.expect(",]") == "]":
+                return
+
+    def read_sections(self):
+        """
+        Yields the keys and values of the export. The values that are lists are yielded as iterators of their rows,
+        which have to be read before the next section.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+        else:
+            while True:
+                key = self.decode_value()
+                if not isinstance(key, str):
+                    raise BoardImportError("Invalid JSON: keys must be strings")
+                self.expect(":")
+                if self.peek() == "[":
+                    self.position += 1
+                    rows = self.read_list()
+                    yield key, rows
+                    # Skip the rows that were not read, e.g. of sections that are not imported
+                    for _ in rows:
+                        pass
+                else:
+                    yield key, self.decode_value()
+                if self.expect(",}") == "}":
+                    break
+        if self.peek():
+            raise BoardImportError("Invalid JSON: extra data after the export")
+
+
+def read_export_sections(file, chunk_size=64 * 1024):
+    """
+    Returns an iterator of the keys and values of the export in a binary file
+    """
+    return ExportReader(file, chunk_size).read_sections()
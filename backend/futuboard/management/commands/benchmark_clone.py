@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from futuboard.board_clone import clone_board
+from futuboard.management.commands.benchmark_import import make_synthetic_board_data
+from futuboard.models import Board, BoardTemplate
+from futuboard.template_snapshots import create_board_from_snapshot, take_snapshot
+from futuboard.views.import_export_views import create_board_from_data_dict, create_data_dict_from_board
+
+BOARD_VALUES = {"title": "Benchmark copy", "passwordhash": "", "has_password": False}
+
+
+def copy_by_export(board_id):
+    data = create_data_dict_from_board(board_id)
+    return create_board_from_data_dict(data, "Benchmark copy", "")["boardid"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies a synthetic board with the given number of ticket events by exporting and importing it, inside the "
+        "database with and without its history, and from a template snapshot, and reports how long each copy took. "
+        "The boards are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=100000)
+        parser.add_argument("--tickets", type=int, default=1000)
+        parser.add_argument("--columns", type=int, default=10)
+        parser.add_argument("--users", type=int, default=10)
+
+    def handle(self, *args, **options):
+        data = make_synthetic_board_data(options["columns"], options["tickets"], options["events"], options["users"])
+        board_id = create_board_from_data_dict(data, "Benchmark", "")["boardid"]
+        template = BoardTemplate(boardid_id=board_id, title="Benchmark", description="")
+        take_snapshot(template)
+
+        copies = [
+            ("Export and import", lambda: copy_by_export(board_id)),
+            ("In the database", lambda: clone_board(board_id, BOARD_VALUES).boardid),
+            ("In the database without history", lambda: clone_board(board_id, BOARD_VALUES, False).boardid),
+            ("From a template snapshot", lambda: create_board_from_snapshot(template, BOARD_VALUES).boardid),
+        ]
+        for name, copy in copies:
+            start = time.perf_counter()
+            new_board_id = copy()
+            elapsed = time.perf_counter() - start
+            Board.objects.filter(pk=new_board_id).delete()
+            self.stdout.write(f"{name}: copied {options['events']} events in {elapsed:.2f}s")
+
+        # Also deletes the template and its frozen board
+        Board.objects.filter(pk=board_id).delete()
@@ -0,0 +1,127 @@
+import gzip
+import random
+import time
+import uuid
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from futuboard.binary_export import read_binary_export_sections, stream_board_msgpack
+from futuboard.board_import import import_board
+from futuboard.export_reader import read_export_sections
+from futuboard.models import Board
+from futuboard.views.import_export_views import create_board_from_data_dict, get_export_tables, stream_board_json
+
+
+def make_synthetic_board_data(n_columns, n_tickets, n_events, n_users):
+    """
+    Returns the data of an export of a board with random tickets, users and ticket events
+    """
+    now = timezone.now().isoformat()
+    board_id = str(uuid.uuid4())
+    column_ids = [str(uuid.uuid4()) for _ in range(n_columns)]
+    ticket_ids = [str(uuid.uuid4()) for _ in range(n_tickets)]
+    scope_id = str(uuid.uuid4())
+
+    data = {"board": {"boardid": board_id, "title": "Benchmark", "description": "", "creation_date": now}}
+    data["columns"] = [
+        {"columnid": column_id, "boardid": board_id, "title": f"column{i}", "ordernum": i, "swimlane": False}
+        for i, column_id in enumerate(column_ids)
+    ]
+    data["swimlanecolumns"] = []
+    data["tickets"] = [
+        {"ticketid": ticket_id, "columnid": random.choice(column_ids), "title": f"ticket{i}", "size": 1, "order": i}
+        for i, ticket_id in enumerate(ticket_ids)
+    ]
+    data["actions"] = []
+    data["scopes"] = [
+        {"scopeid": scope_id, "boardid": board_id, "title": "scope", "tickets": list(ticket_ids), "done_columns": []}
+    ]
+    data["ticketEvents"] = [
+        {
+            "ticketeventid": str(uuid.uuid4()),
+            "ticketid": ticket_ids[i % n_tickets],
+            "event_time": now,
+            "event_type": "MOVE",
+            "old_columnid": random.choice(column_ids),
+            "new_columnid": random.choice(column_ids),
+            "old_size": 1,
+            "new_size": 1,
+            "old_scopes": [scope_id],
+            "new_scopes": [scope_id],
+            "title": f"ticket{i % n_tickets}",
+        }
+        for i in range(n_events)
+    ]
+    data["users"] = [
+        {
+            "userid": str(uuid.uuid4()),
+            "boardid": board_id,
+            "name": f"user{i}",
+            "tickets": list(ticket_ids),
+            "actions": [],
+        }
+        for i in range(n_users)
+    ]
+    return data
+
+
+def time_export(stream):
+    start = time.perf_counter()
+    content = b"".join(part.encode("UTF-8") if isinstance(part, str) else part for part in stream)
+    return content, time.perf_counter() - start
+
+
+def time_import(sections):
+    start = time.perf_counter()
+    board = import_board(sections, {"title": "Benchmark"})
+    elapsed = time.perf_counter() - start
+    board.delete()
+    return elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports a synthetic board with the given number of ticket events, and reports how long the import took. "
+        "Then exports the board in the JSON and in the binary format, and reports the sizes of the exports and how "
+        "long exporting and importing them took. The boards are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=100000)
+        parser.add_argument("--tickets", type=int, default=1000)
+        parser.add_argument("--columns", type=int, default=10)
+        parser.add_argument("--users", type=int, default=10)
+
+    def handle(self, *args, **options):
+        data = make_synthetic_board_data(options["columns"], options["tickets"], options["events"], options["users"])
+        row_count = sum(len(rows) for key, rows in data.items() if key != "board")
+
+        start = time.perf_counter()
+        board_data = create_board_from_data_dict(data, "Benchmark", "")
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Imported {options['events']} events and {row_count} rows in total in {elapsed:.2f}s "
+            f"({row_count / elapsed:.0f} rows/s)"
+        )
+
+        board = Board.objects.get(pk=board_data["boardid"])
+        chunk_size = getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+        json_content, json_export_time = time_export(stream_board_json(board, chunk_size))
+        binary_content, binary_export_time = time_export(
+            stream_board_msgpack(board, get_export_tables(board.boardid), chunk_size)
+        )
+        json_import_time = time_import(read_export_sections(BytesIO(json_content)))
+        binary_import_time = time_import(read_binary_export_sections(BytesIO(binary_content)))
+        board.delete()
+
+        for name, content, export_time, import_time in [
+            ("JSON", json_content, json_export_time, json_import_time),
+            ("msgpack", binary_content, binary_export_time, binary_import_time),
+        ]:
+            self.stdout.write(
+                f"{name}: {len(content) / 1024 / 1024:.1f} MB, {len(gzip.compress(content)) / 1024 / 1024:.1f} MB "
+                f"gzipped, exported in {export_time:.2f}s, imported in {import_time:.2f}s"
+            )
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from futuboard.event_archive import compact_board_events
+from futuboard.models import Board, TicketEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves the ticket events that are older than the given number of days to the archive table, and replaces them "
+        "with a snapshot of every ticket at that time, so that charts and exports only read recent history. Meant to "
+        "be run periodically, e.g. once a month."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=365, help="Archive events older than this many days")
+        parser.add_argument("--board", help="Only compact the events of this board")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff_time = timezone.now() - timedelta(days=options["days"])
+        board_ids = [options["board"]] if options["board"] else Board.objects.values_list("boardid", flat=True)
+
+        total_archived = 0
+        for board_id in board_ids:
+            if not TicketEvent.objects.filter(boardid=board_id, event_time__lt=cutoff_time).exists():
+                continue
+            archived, snapshots = compact_board_events(board_id, cutoff_time, options["batch_size"])
+            total_archived += archived
+            self.stdout.write(f"{board_id}: archived {archived} events, kept {snapshots} ticket snapshots")
+        self.stdout.write(f"Archived {total_archived} events from before {cutoff_time.isoformat()}")
@@ -0,0 +1,27 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from futuboard.models import Board
+from futuboard.ordering import ORDERED_MODELS, rebalance_order
+
+
+class Command(BaseCommand):
+    help = (
+        "Renumbers the order values of columns, swimlanecolumns, tickets and actions in lists that are running out of "
+        "space between their values. Meant to be run periodically, e.g. once a day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Renumber every list, not only crowded ones")
+
+    def handle(self, *args, **options):
+        for model_name in ORDERED_MODELS:
+            model = apps.get_model("futuboard", model_name)
+            with transaction.atomic():
+                updated = rebalance_order(model, force=options["all"])
+                if updated:
+                    # The lists of the boards contain the order values, so cached lists are out of date
+                    Board.objects.update(revision=F("revision") + 1)
+            self.stdout.write(f"{model_name}: renumbered {updated} rows")
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.9 on 2026-10-18 11:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("futuboard", "0017_board_notes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ColumnSizeAggregate",
+            fields=[
+                (
+                    "aggregateid",
+                    models.UUIDField(db_column="aggregateID", default=uuid.uuid4, primary_key=True, serialize=False),
+                ),
+                (
+                    "time_unit",
+                    models.CharField(
+                        choices=[("day", "day"), ("week", "week"), ("month", "month"), ("current", "current")],
+                        max_length=7,
+                    ),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("size_change", models.IntegerField(default=0)),
+                ("count_change", models.IntegerField(default=0)),
+                (
+                    "boardid",
+                    models.ForeignKey(
+                        db_column="boardID", on_delete=django.db.models.deletion.CASCADE, to="futuboard.board"
+                    ),
+                ),
+                (
+                    "columnid",
+                    models.ForeignKey(
+                        db_column="columnID", on_delete=django.db.models.deletion.CASCADE, to="futuboard.column"
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "ColumnSizeAggregate",
+                "indexes": [
+                    models.Index(fields=["boardid", "time_unit", "bucket"], name="aggregate_board_bucket_idx")
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="columnsizeaggregate",
+            constraint=models.UniqueConstraint(
+                fields=("columnid", "time_unit", "bucket"), name="unique_column_bucket"
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from django.db import migrations
+from django.db.models import Q
+
+# Bucket of the CURRENT rows, which hold the sum of all changes of a column
+CURRENT_BUCKET = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("futuboard", "0018_columnsizeaggregate"),
+    ]
+
+    def fill_column_size_aggregates(apps, schema_editor):
+        Board = apps.get_model("futuboard", "Board")
+        Column = apps.get_model("futuboard", "Column")
+        TicketEvent = apps.get_model("futuboard", "TicketEvent")
+        ColumnSizeAggregate = apps.get_model("futuboard", "ColumnSizeAggregate")
+
+        # The aggregation of chart_cache.py as it was when the aggregates were added, so that later changes to it
+        # don't change this migration
+        def get_buckets(event_time):
+            day = event_time.replace(hour=0, minute=0, second=0, microsecond=0)
+            return {"day": day, "week": day - timedelta(days=day.weekday()), "month": day.replace(day=1)}
+
+        def get_column_changes(event):
+            old_size = int(event.old_size)
+            new_size = int(event.new_size)
+            if event.event_type == "CREATE":
+                return [(event.new_columnid_id, new_size, 1)]
+            if event.event_type == "DELETE":
+                return [(event.old_columnid_id, -old_size, -1)]
+            if event.event_type == "MOVE":
+                return [(event.old_columnid_id, -old_size, -1), (event.new_columnid_id, new_size, 1)]
+            if event.event_type == "UPDATE":
+                return [(event.new_columnid_id, new_size - old_size, 0)]
+            column_ids = {event.old_columnid_id, event.new_columnid_id}
+            return [(column_id, 0, 0) for column_id in column_ids if column_id is not None]
+
+        for board_id in Board.objects.values_list("boardid", flat=True):
+            columns = Column.objects.filter(boardid=board_id)
+            ticket_events = TicketEvent.objects.filter(Q(old_columnid__in=columns) | Q(new_columnid__in=columns))
+
+            changes = defaultdict(lambda: [0, 0])
+            for event in ticket_events.distinct().iterator():
+                keys = [("current", CURRENT_BUCKET)] + list(get_buckets(event.event_time).items())
+                for column_id, size_change, count_change in get_column_changes(event):
+                    for time_unit, bucket in keys:
+                        changes[(column_id, time_unit, bucket)][0] += size_change
+                        changes[(column_id, time_unit, bucket)][1] += count_change
+
+            ColumnSizeAggregate.objects.bulk_create(
+                ColumnSizeAggregate(
+                    boardid_id=board_id,
+                    columnid_id=column_id,
+                    time_unit=time_unit,
+                    bucket=bucket,
+                    size_change=size_change,
+                    count_change=count_change,
+                )
+                for (column_id, time_unit, bucket), (size_change, count_change) in changes.items()
+            )
+
+    operations = [migrations.RunPython(fill_column_size_aggregates, migrations.RunPython.noop)]
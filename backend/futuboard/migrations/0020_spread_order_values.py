@@ -0,0 +1,39 @@
+from django.db import migrations
+
+ORDER_GAP = 1024
+
+# Model -> (order field, fields that define the list a row belongs to), as in ordering.py when this migration was added
+ORDERED_MODELS = {
+    "Column": ("ordernum", ["boardid"]),
+    "Swimlanecolumn": ("ordernum", ["columnid"]),
+    "Ticket": ("order", ["columnid"]),
+    "Action": ("order", ["ticketid", "swimlanecolumnid"]),
+}
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("futuboard", "0019_fill_column_size_aggregates"),
+    ]
+
+    def spread_order_values(apps, schema_editor):
+        # Existing lists are numbered 0, 1, 2, ... Space them ORDER_GAP apart so rows can be moved between them
+        for model_name, (order_field, group_fields) in ORDERED_MODELS.items():
+            model = apps.get_model("futuboard", model_name)
+            group_fields = [field + "_id" for field in group_fields]
+            pk_field = model._meta.pk.attname
+            rows = model.objects.order_by(*group_fields, order_field, pk_field).values_list(
+                pk_field, order_field, *group_fields
+            )
+
+            updated = []
+            index, group_key = 0, None
+            for pk, order, *key in rows.iterator(chunk_size=1000):
+                if key != group_key:
+                    index, group_key = 0, key
+                if order != index * ORDER_GAP:
+                    updated.append(model(**{pk_field: pk, order_field: index * ORDER_GAP}))
+                index += 1
+            model.objects.bulk_update(updated, [order_field], batch_size=1000)
+
+    operations = [migrations.RunPython(spread_order_values, migrations.RunPython.noop)]
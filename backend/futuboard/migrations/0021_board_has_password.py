@@ -0,0 +1,36 @@
+# Generated by Django 4.2.9 on 2026-10-18 11:32
+
+import argon2
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("futuboard", "0020_spread_order_values"),
+    ]
+
+    def fill_has_password(apps, schema_editor):
+        Board = apps.get_model("futuboard", "Board")
+
+        # A board has no password if its hash is empty or the hash of an empty password
+        def check_if_password_hash_is_empty(password_hash):
+            if password_hash == "":
+                return True
+            try:
+                return argon2.PasswordHasher().verify(password_hash, "")
+            except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+                return False
+
+        boards = list(Board.objects.only("passwordhash"))
+        for board in boards:
+            board.has_password = not check_if_password_hash_is_empty(board.passwordhash)
+        Board.objects.bulk_update(boards, ["has_password"], batch_size=1000)
+
+    operations = [
+        migrations.AddField(
+            model_name="board",
+            name="has_password",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(fill_has_password, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.9 on 2026-10-18 12:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("futuboard", "0022_board_revision"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="boardtemplate",
+            name="snapshot_date",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="board",
+            name="snapshot_templateid",
+            field=models.ForeignKey(
+                db_column="snapshotTemplateID",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="snapshot_boards",
+                to="futuboard.boardtemplate",
+            ),
+        ),
+    ]
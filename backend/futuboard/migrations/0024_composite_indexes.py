@@ -0,0 +1,103 @@
+# Generated by Django 4.2.9 on 2026-10-18 12:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("futuboard", "0023_boardtemplate_snapshot"),
+    ]
+
+    # The composite indexes are created before the foreign key indexes they replace are dropped
+    operations = [
+        migrations.AddIndex(
+            model_name="action",
+            index=models.Index(fields=["ticketid", "swimlanecolumnid", "order"], name="action_ticket_lane_order_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="column",
+            index=models.Index(fields=["boardid", "ordernum"], name="column_board_order_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="swimlanecolumn",
+            index=models.Index(fields=["columnid", "ordernum"], name="swimlane_column_order_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ticket",
+            index=models.Index(fields=["columnid", "order"], name="ticket_column_order_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ticketevent",
+            index=models.Index(fields=["old_columnid", "event_time"], name="event_old_column_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ticketevent",
+            index=models.Index(fields=["new_columnid", "event_time"], name="event_new_column_time_idx"),
+        ),
+        migrations.AlterField(
+            model_name="action",
+            name="ticketid",
+            field=models.ForeignKey(
+                blank=True,
+                db_column="ticketID",
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="futuboard.ticket",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="column",
+            name="boardid",
+            field=models.ForeignKey(
+                db_column="boardID", db_index=False, on_delete=django.db.models.deletion.CASCADE, to="futuboard.board"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="swimlanecolumn",
+            name="columnid",
+            field=models.ForeignKey(
+                blank=True,
+                db_column="columnID",
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="futuboard.column",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ticket",
+            name="columnid",
+            field=models.ForeignKey(
+                db_column="columnID",
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="futuboard.column",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ticketevent",
+            name="new_columnid",
+            field=models.ForeignKey(
+                db_column="newColumnId",
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="new_columnid",
+                to="futuboard.column",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ticketevent",
+            name="old_columnid",
+            field=models.ForeignKey(
+                db_column="oldColumnId",
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="old_columnid",
+                to="futuboard.column",
+            ),
+        ),
+    ]
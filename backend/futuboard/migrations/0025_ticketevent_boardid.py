@@ -0,0 +1,63 @@
+# Generated by Django 4.2.9 on 2026-10-18 13:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("futuboard", "0024_composite_indexes"),
+    ]
+
+    def fill_ticket_event_boards(apps, schema_editor):
+        Column = apps.get_model("futuboard", "Column")
+        TicketEvent = apps.get_model("futuboard", "TicketEvent")
+
+        # Every event has a column, because the events of deleted columns were deleted with them until now
+        column_boards = Column.objects.filter(pk=Coalesce(OuterRef("new_columnid"), OuterRef("old_columnid")))
+        TicketEvent.objects.filter(boardid=None).update(boardid=Subquery(column_boards.values("boardid")[:1]))
+
+    # The board is filled in here and made required in the next migration, because PostgreSQL doesn't allow altering
+    # a table with pending foreign key checks in the same transaction
+    operations = [
+        migrations.AlterField(
+            model_name="ticketevent",
+            name="new_columnid",
+            field=models.ForeignKey(
+                db_column="newColumnId",
+                db_constraint=False,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="new_columnid",
+                to="futuboard.column",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ticketevent",
+            name="old_columnid",
+            field=models.ForeignKey(
+                db_column="oldColumnId",
+                db_constraint=False,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="old_columnid",
+                to="futuboard.column",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticketevent",
+            name="boardid",
+            field=models.ForeignKey(
+                db_column="boardID",
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="futuboard.board",
+            ),
+        ),
+        migrations.RunPython(fill_ticket_event_boards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.9 on 2026-10-18 13:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("futuboard", "0025_ticketevent_boardid"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ticketevent",
+            name="boardid",
+            field=models.ForeignKey(
+                db_column="boardID", db_index=False, on_delete=django.db.models.deletion.CASCADE, to="futuboard.board"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ticketevent",
+            index=models.Index(fields=["boardid", "event_time"], name="event_board_time_idx"),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.9 on 2026-10-18 12:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("futuboard", "0026_ticketevent_boardid_required"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ticketevent",
+            name="event_type",
+            field=models.CharField(
+                choices=[
+                    ("CREATE", "CREATE"),
+                    ("DELETE", "DELETE"),
+                    ("UPDATE", "UPDATE"),
+                    ("MOVE", "MOVE"),
+                    ("SCOPE", "SCOPE"),
+                    ("SNAPSHOT", "SNAPSHOT"),
+                ],
+                max_length=8,
+            ),
+        ),
+        migrations.CreateModel(
+            name="ArchivedTicketEvent",
+            fields=[
+                ("ticketeventid", models.UUIDField(db_column="ticketEventID", primary_key=True, serialize=False)),
+                ("ticketid", models.UUIDField(db_column="ticketID")),
+                ("event_time", models.DateTimeField()),
+                (
+                    "event_type",
+                    models.CharField(
+                        choices=[
+                            ("CREATE", "CREATE"),
+                            ("DELETE", "DELETE"),
+                            ("UPDATE", "UPDATE"),
+                            ("MOVE", "MOVE"),
+                            ("SCOPE", "SCOPE"),
+                            ("SNAPSHOT", "SNAPSHOT"),
+                        ],
+                        max_length=8,
+                    ),
+                ),
+                ("old_columnid", models.UUIDField(db_column="oldColumnId", null=True)),
+                ("new_columnid", models.UUIDField(db_column="newColumnId", null=True)),
+                ("old_size", models.IntegerField()),
+                ("new_size", models.IntegerField()),
+                ("old_scopes", models.JSONField(default=list)),
+                ("new_scopes", models.JSONField(default=list)),
+                ("title", models.TextField()),
+                (
+                    "boardid",
+                    models.ForeignKey(
+                        db_column="boardID",
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="futuboard.board",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "ArchivedTicketEvent",
+                "indexes": [models.Index(fields=["boardid", "event_time"], name="archived_event_board_time_idx")],
+            },
+        ),
+    ]
@@ -1,11 +1,13 @@
 from django.db import models
 import uuid
+from datetime import datetime, timezone
 from django.utils.timezone import now
 
 
 class Action(models.Model):
     actionid = models.UUIDField(db_column="actionID", primary_key=True)
-    ticketid = models.ForeignKey("Ticket", models.CASCADE, db_column="ticketID", blank=True, null=True)
+    # Indexed together with swimlanecolumnid and order, see Meta.indexes
+    ticketid = models.ForeignKey("Ticket", models.CASCADE, db_column="ticketID", blank=True, null=True, db_index=False)
     swimlanecolumnid = models.ForeignKey(
         "Swimlanecolumn", models.CASCADE, db_column="swimlaneColumnID", blank=True, null=True
     )
@@ -15,6 +17,7 @@ class Action(models.Model):
 
     class Meta:
         db_table = "Action"
+        indexes = [models.Index(fields=["ticketid", "swimlanecolumnid", "order"], name="action_ticket_lane_order_idx")]
 
 
 class Board(models.Model):
@@ -24,6 +27,8 @@ class Board(models.Model):
     background_color = models.TextField(default="#ffffff")
     creation_date = models.DateTimeField(default=now)
     passwordhash = models.TextField(db_column="passwordHash")
+    # Kept up to date with passwordhash, so checking if a board needs a password doesn't need an Argon2 verification
+    has_password = models.BooleanField(default=True)
     salt = models.TextField()
     default_ticket_title = models.TextField(blank=True, null=True)
     default_ticket_description = models.TextField(blank=True, null=True)
@@ -31,6 +36,12 @@ class Board(models.Model):
     default_ticket_size = models.IntegerField(blank=True, null=True)
     default_ticket_cornernote = models.TextField(blank=True, null=True)
     notes = models.TextField(default="")
+    # Increased by every change made on the board, used as the ETag of the board's lists, see revisions.py
+    revision = models.BigIntegerField(default=0)
+    # Set on the frozen copy of a template's board that boards are created from, see template_snapshots.py
+    snapshot_templateid = models.ForeignKey(
+        "BoardTemplate", models.CASCADE, db_column="snapshotTemplateID", null=True, related_name="snapshot_boards"
+    )
 
     class Meta:
         db_table = "Board"
@@ -38,7 +49,8 @@ class Board(models.Model):
 
 class Column(models.Model):
     columnid = models.UUIDField(db_column="columnID", primary_key=True)
-    boardid = models.ForeignKey(Board, models.CASCADE, db_column="boardID")
+    # Indexed together with ordernum, see Meta.indexes
+    boardid = models.ForeignKey(Board, models.CASCADE, db_column="boardID", db_index=False)
     wip_limit = models.IntegerField(blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     title = models.TextField(default="")
@@ -49,21 +61,25 @@ class Column(models.Model):
 
     class Meta:
         db_table = "Column"
+        indexes = [models.Index(fields=["boardid", "ordernum"], name="column_board_order_idx")]
 
 
 class Swimlanecolumn(models.Model):
     swimlanecolumnid = models.UUIDField(db_column="swimlaneColumnID", default=uuid.uuid4, primary_key=True)
-    columnid = models.ForeignKey(Column, models.CASCADE, db_column="columnID", blank=True, null=True)
+    # Indexed together with ordernum, see Meta.indexes
+    columnid = models.ForeignKey(Column, models.CASCADE, db_column="columnID", blank=True, null=True, db_index=False)
     title = models.TextField(blank=True, null=True)
     ordernum = models.IntegerField(db_column="orderNum")
 
     class Meta:
         db_table = "SwimlaneColumn"
+        indexes = [models.Index(fields=["columnid", "ordernum"], name="swimlane_column_order_idx")]
 
 
 class Ticket(models.Model):
     ticketid = models.UUIDField(db_column="ticketID", primary_key=True)
-    columnid = models.ForeignKey(Column, models.CASCADE, db_column="columnID")
+    # Indexed together with order, see Meta.indexes
+    columnid = models.ForeignKey(Column, models.CASCADE, db_column="columnID", db_index=False)
     title = models.TextField(default="")
     description = models.TextField(default="")
     color = models.TextField(blank=True, null=True)
@@ -74,6 +90,7 @@ class Ticket(models.Model):
 
     class Meta:
         db_table = "Ticket"
+        indexes = [models.Index(fields=["columnid", "order"], name="ticket_column_order_idx")]
 
 
 class User(models.Model):
@@ -94,6 +111,8 @@ class BoardTemplate(models.Model):
     )  # If board is deleted, templates referecing it are also deleted
     title = models.TextField()
     description = models.TextField()
+    # When the frozen copy of the board that boards are created from was taken, see template_snapshots.py
+    snapshot_date = models.DateTimeField(null=True)
 
     class Meta:
         db_table = "BoardTemplate"
@@ -105,12 +124,15 @@ class TicketEvent(models.Model):
     UPDATE = "UPDATE"
     MOVE = "MOVE"
     SCOPE_CHANGE = "SCOPE"
+    # State of a ticket at the time its older events were archived, replayed like a CREATE, see event_archive.py
+    SNAPSHOT = "SNAPSHOT"
     EVENT_TYPES = [
         (CREATE, "CREATE"),
         (DELETE, "DELETE"),
         (UPDATE, "UPDATE"),
         (MOVE, "MOVE"),
         (SCOPE_CHANGE, "SCOPE"),
+        (SNAPSHOT, "SNAPSHOT"),
     ]
 
     ticketeventid = models.UUIDField(db_column="ticketEventID", default=uuid.uuid4, primary_key=True)
@@ -119,14 +141,31 @@ class TicketEvent(models.Model):
     ticketid = models.ForeignKey(Ticket, models.DO_NOTHING, db_column="ticketID", db_constraint=False)
 
     event_time = models.DateTimeField(default=now)
-    event_type = models.CharField(choices=EVENT_TYPES, max_length=6)
+    event_type = models.CharField(choices=EVENT_TYPES, max_length=8)
 
-    # If column is deleted, all events related to that column are also deleted. This also happens when a board is deleted
+    # The board of the event, so that the events of a board are read with one index range scan, see Meta.indexes.
+    # If board is deleted, its events are also deleted
+    boardid = models.ForeignKey(Board, models.CASCADE, db_column="boardID", db_index=False)
+
+    # Can't enforce foreign key integrity, because the column might have been deleted. The events of a deleted column
+    # stay in the history of the board. The columns are indexed together with event_time, see Meta.indexes
     old_columnid = models.ForeignKey(
-        Column, models.CASCADE, db_column="oldColumnId", null=True, related_name="old_columnid"
+        Column,
+        models.DO_NOTHING,
+        db_column="oldColumnId",
+        null=True,
+        related_name="old_columnid",
+        db_constraint=False,
+        db_index=False,
     )
     new_columnid = models.ForeignKey(
-        Column, models.CASCADE, db_column="newColumnId", null=True, related_name="new_columnid"
+        Column,
+        models.DO_NOTHING,
+        db_column="newColumnId",
+        null=True,
+        related_name="new_columnid",
+        db_constraint=False,
+        db_index=False,
     )
 
     old_size = models.IntegerField()
@@ -139,6 +178,37 @@ class TicketEvent(models.Model):
 
     class Meta:
         db_table = "TicketEvent"
+        # Events are read by board or by column in time order
+        indexes = [
+            models.Index(fields=["boardid", "event_time"], name="event_board_time_idx"),
+            models.Index(fields=["old_columnid", "event_time"], name="event_old_column_time_idx"),
+            models.Index(fields=["new_columnid", "event_time"], name="event_new_column_time_idx"),
+        ]
+
+
+class ArchivedTicketEvent(models.Model):
+    """
+    A TicketEvent that was moved out of the TicketEvent table by the compact_ticket_events command, so that the table
+    only holds recent history. The scopes are stored as lists of ids instead of in many-to-many tables, and the ticket
+    and columns as plain ids, as they might have been deleted.
+    """
+
+    ticketeventid = models.UUIDField(db_column="ticketEventID", primary_key=True)
+    ticketid = models.UUIDField(db_column="ticketID")
+    boardid = models.ForeignKey(Board, models.CASCADE, db_column="boardID", db_index=False)
+    event_time = models.DateTimeField()
+    event_type = models.CharField(choices=TicketEvent.EVENT_TYPES, max_length=8)
+    old_columnid = models.UUIDField(db_column="oldColumnId", null=True)
+    new_columnid = models.UUIDField(db_column="newColumnId", null=True)
+    old_size = models.IntegerField()
+    new_size = models.IntegerField()
+    old_scopes = models.JSONField(default=list)
+    new_scopes = models.JSONField(default=list)
+    title = models.TextField()
+
+    class Meta:
+        db_table = "ArchivedTicketEvent"
+        indexes = [models.Index(fields=["boardid", "event_time"], name="archived_event_board_time_idx")]
 
 
 class Scope(models.Model):
@@ -154,3 +224,39 @@ class Scope(models.Model):
 
     class Meta:
         db_table = "Scope"
+
+
+class ColumnSizeAggregate(models.Model):
+    """
+    Change of a column's size and ticket count during one time bucket, aggregated from TicketEvents as they are written.
+    Cumulative flow is computed from these instead of replaying every event of the board.
+    The CURRENT row of a column has the bucket CURRENT_BUCKET and holds the sum of all changes, i.e. the current state
+    of the column. The bucket is never empty, so that the unique constraint also covers the CURRENT rows.
+    """
+
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+    CURRENT = "current"
+    TIME_UNITS = [
+        (DAY, "day"),
+        (WEEK, "week"),
+        (MONTH, "month"),
+        (CURRENT, "current"),
+    ]
+    CURRENT_BUCKET = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    aggregateid = models.UUIDField(db_column="aggregateID", default=uuid.uuid4, primary_key=True)
+    boardid = models.ForeignKey(Board, models.CASCADE, db_column="boardID")
+    columnid = models.ForeignKey(Column, models.CASCADE, db_column="columnID")
+    time_unit = models.CharField(choices=TIME_UNITS, max_length=7)
+    bucket = models.DateTimeField()  # Start of the time bucket, CURRENT_BUCKET for the CURRENT row
+    size_change = models.IntegerField(default=0)
+    count_change = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "ColumnSizeAggregate"
+        constraints = [
+            models.UniqueConstraint(fields=["columnid", "time_unit", "bucket"], name="unique_column_bucket"),
+        ]
+        indexes = [models.Index(fields=["boardid", "time_unit", "bucket"], name="aggregate_board_bucket_idx")]
@@ -0,0 +1,220 @@
+"""
+Helpers for reordering tickets, columns, swimlanecolumns and actions
+
+Order values are spaced ORDER_GAP apart, so that a row can be inserted or moved between two others by giving it a
+value in the gap between them, without renumbering the rest of the list. When a gap runs out, the list is
+renumbered. rebalance_order renumbers whole lists and is run by the rebalance_ordering management command.
+"""
+
+from uuid import UUID
+
+from django.db.models import Max, Min
+
+ORDER_GAP = 1024
+
+# Order values are stored in 32 bit integer columns
+MAX_ORDER = 2**31 - 1
+MIN_ORDER = -(2**31)
+
+# Lists with a smaller gap between two neighbours than this are renumbered by rebalance_order
+MIN_ORDER_GAP = 16
+
+# Model -> (order field, fields that define the list a row belongs to)
+ORDERED_MODELS = {
+    "Column": ("ordernum", ["boardid"]),
+    "Swimlanecolumn": ("ordernum", ["columnid"]),
+    "Ticket": ("order", ["columnid"]),
+    "Action": ("order", ["ticketid", "swimlanecolumnid"]),
+}
+
+
+def get_in_order(queryset, ids):
+    """
+    Fetches the objects with the given primary keys in one query and returns them in the order of the ids.
+    Raises the model's DoesNotExist if any of them is missing.
+    """
+    ids = [UUID(str(id)) for id in ids]
+    objects = queryset.in_bulk(ids)
+
+    if len(objects) != len(set(ids)):
+        raise queryset.model.DoesNotExist(f"{queryset.model.__name__} not found")
+
+    return [objects[id] for id in ids]
+
+
+def renumber_list(queryset, order_field):
+    """
+    Renumbers the rows of a list to multiples of ORDER_GAP, keeping their order. Returns the number of rows.
+    """
+    objects = list(queryset.order_by(order_field, "pk").only("pk", order_field))
+    for index, obj in enumerate(objects):
+        setattr(obj, order_field, index * ORDER_GAP)
+    queryset.model.objects.bulk_update(objects, [order_field])
+    return len(objects)
+
+
+def get_first_order(queryset, order_field):
+    """
+    Returns an order value that puts a new row before all rows of the queryset. Renumbers the list if there is no
+    room left before its first row.
+    """
+    first = queryset.aggregate(first=Min(order_field))["first"]
+    if first is None:
+        return 0
+    if first - ORDER_GAP < MIN_ORDER:
+        renumber_list(queryset, order_field)
+        first = 0
+    return first - ORDER_GAP
+
+
+def get_last_order(queryset, order_field):
+    """
+    Returns an order value that puts a new row after all rows of the queryset. Renumbers the list if there is no room
+    left after its last row.
+    """
+    last = queryset.aggregate(last=Max(order_field))["last"]
+    if last is None:
+        return 0
+    if last + ORDER_GAP > MAX_ORDER:
+        last = (renumber_list(queryset, order_field) - 1) * ORDER_GAP
+    return last + ORDER_GAP
+
+
+def get_kept_indices(orders):
+    """
+    Returns the indices of the longest strictly increasing subsequence of the order values, skipping None values.
+    The rows at these indices are already in the right order relative to each other and can keep their values.
+    """
+    # tails[k] is the index of the smallest value that ends an increasing subsequence of length k + 1
+    tails = []
+    previous = [None] * len(orders)
+
+    for index, order in enumerate(orders):
+        if order is None:
+            continue
+        low, high = 0, len(tails)
+        while low < high:
+            middle = (low + high) // 2
+            if orders[tails[middle]] < order:
+                low = middle + 1
+            else:
+                high = middle
+        if low > 0:
+            previous[index] = tails[low - 1]
+        if low == len(tails):
+            tails.append(index)
+        else:
+            tails[low] = index
+
+    kept = []
+    index = tails[-1] if tails else None
+    while index is not None:
+        kept.append(index)
+        index = previous[index]
+    return kept[::-1]
+
+
+def get_new_orders(orders):
+    """
+    Returns new order values for a list of rows in their new order, given their current order values (None for rows
+    that are new to the list). As many rows as possible keep their current value, and the others get values spread
+    evenly in the gap between their neighbours. Returns None if some gap is too small.
+    """
+    new_orders = [None] * len(orders)
+    kept = get_kept_indices(orders)
+    for index in kept:
+        new_orders[index] = orders[index]
+
+    # Fill the runs of rows between the kept rows
+    bounds = [-1] + kept + [len(orders)]
+    for start, end in zip(bounds, bounds[1:]):
+        count = end - start - 1
+        if count == 0:
+            continue
+        low = new_orders[start] if start >= 0 else None
+        high = new_orders[end] if end < len(orders) else None
+
+        if low is None and high is None:
+            values = [i * ORDER_GAP for i in range(count)]
+        elif low is None:
+            values = [high - (count - i) * ORDER_GAP for i in range(count)]
+        elif high is None:
+            values = [low + (i + 1) * ORDER_GAP for i in range(count)]
+        else:
+            step = (high - low) // (count + 1)
+            if step < 1:
+                return None
+            values = [low + (i + 1) * step for i in range(count)]
+
+        if values[0] < MIN_ORDER or values[-1] > MAX_ORDER:
+            return None
+        new_orders[start + 1 : end] = values
+
+    return new_orders
+
+
+def set_order(objects, order_field, in_list):
+    """
+    Sets the order values of objects that are in their new order, changing as few of them as possible.
+    in_list tells if an object already belongs to the list, so that its current value can be kept.
+    Renumbers the whole list if it runs out of space. Returns the objects whose order value changed.
+    """
+    orders = [getattr(obj, order_field) if in_list(obj) else None for obj in objects]
+    new_orders = get_new_orders(orders)
+    if new_orders is None:
+        new_orders = [i * ORDER_GAP for i in range(len(objects))]
+
+    changed = []
+    for obj, old_order, new_order in zip(objects, orders, new_orders):
+        if old_order != new_order:
+            setattr(obj, order_field, new_order)
+            changed.append(obj)
+    return changed
+
+
+def needs_rebalancing(orders):
+    """
+    Tells if a sorted list of order values is running out of space between or around its values
+    """
+    if len(orders) == 0:
+        return False
+    if orders[0] < MIN_ORDER + ORDER_GAP or orders[-1] > MAX_ORDER - ORDER_GAP:
+        return True
+    return any(high - low < MIN_ORDER_GAP for low, high in zip(orders, orders[1:]))
+
+
+def rebalance_order(model, force=False, batch_size=1000):
+    """
+    Renumbers the lists of the model that are running out of space, or all lists if force is set, to multiples of
+    ORDER_GAP. Works on historical models in migrations too. Returns the number of updated rows.
+    """
+    order_field, group_fields = ORDERED_MODELS[model.__name__]
+    group_fields = [field + "_id" for field in group_fields]
+    pk_field = model._meta.pk.attname
+
+    rows = (
+        model.objects.order_by(*group_fields, order_field, pk_field)
+        .values_list(pk_field, order_field, *group_fields)
+        .iterator(chunk_size=batch_size)
+    )
+
+    updated = []
+
+    def rebalance_group(group):
+        orders = [order for (_, order) in group]
+        if force or needs_rebalancing(orders):
+            for index, (pk, order) in enumerate(group):
+                if order != index * ORDER_GAP:
+                    updated.append(model(**{pk_field: pk, order_field: index * ORDER_GAP}))
+
+    group = []
+    group_key = None
+    for pk, order, *key in rows:
+        if key != group_key:
+            rebalance_group(group)
+            group, group_key = [], key
+        group.append((pk, order))
+    rebalance_group(group)
+
+    model.objects.bulk_update(updated, [order_field], batch_size=batch_size)
+    return len(updated)
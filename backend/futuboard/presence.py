@@ -0,0 +1,220 @@
+"""
+Registry of the websocket clients connected to each board.
+
+BoardConsumer registers its connection when a client connects, removes it when the client disconnects, and counts the
+frames it sends to the client. The registry keeps the current connections of each board, and counts the connects,
+disconnects and messages of each board by minute, from which it computes per minute rates over the last
+PRESENCE_RATE_WINDOW minutes. This shows which boards are hot, e.g. when deciding how to spread the websocket workers.
+
+Without a broker, the registry is kept in the memory of the process and only knows about the connections of that
+process. When CHANNEL_LAYER_URL is set, the registry is kept in the same Redis compatible broker and covers every
+process. A process that dies can't remove its connections from the broker, so connections refresh their registration
+every PRESENCE_HEARTBEAT_INTERVAL seconds, and connections that haven't been refreshed for two intervals are not counted.
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict
+
+import redis
+from django.conf import settings
+
+CONNECTS = "connects"
+DISCONNECTS = "disconnects"
+MESSAGES = "messages"
+COUNTERS = [CONNECTS, DISCONNECTS, MESSAGES]
+
+
+def get_minute(timestamp):
+    return int(timestamp // 60)
+
+
+def get_rates(counts_by_minute, rate_window):
+    """
+    Returns the per minute rates of the counters from their counts in the last rate_window minutes
+    """
+    return {f"{counter}_per_minute": sum(counts_by_minute[counter]) / rate_window for counter in COUNTERS}
+
+
+class InProcessPresenceRegistry:
+    def __init__(self, heartbeat_interval, rate_window):
+        self.heartbeat_interval = heartbeat_interval
+        self.rate_window = rate_window
+        self.lock = threading.Lock()
+        # Last time each connection of a board was seen, by connection id
+        self.connections = defaultdict(dict)
+        # Counts of each board by counter and minute
+        self.counts = defaultdict(Counter)
+
+    def count(self, board_id, counter, count=1):
+        with self.lock:
+            self.counts[str(board_id)][(counter, get_minute(time.time()))] += count
+
+    def add_connection(self, board_id, connection_id):
+        with self.lock:
+            self.connections[str(board_id)][connection_id] = time.time()
+        self.count(board_id, CONNECTS)
+
+    def refresh_connection(self, board_id, connection_id):
+        with self.lock:
+            self.connections[str(board_id)][connection_id] = time.time()
+
+    def remove_connection(self, board_id, connection_id):
+        with self.lock:
+            self.connections[str(board_id)].pop(connection_id, None)
+        self.count(board_id, DISCONNECTS)
+
+    def get_board_ids(self):
+        with self.lock:
+            return set(self.connections) | set(self.counts)
+
+    def get_board_presence(self, board_id):
+        return self.get_boards_presence([board_id])[str(board_id)]
+
+    def get_boards_presence(self, board_ids):
+        now = time.time()
+        minutes = range(get_minute(now) - self.rate_window + 1, get_minute(now) + 1)
+        presence = {}
+        with self.lock:
+            for board_id in map(str, board_ids):
+                last_seen_times = self.connections.get(board_id, {}).values()
+                connection_count = sum(
+                    1 for last_seen in last_seen_times if last_seen > now - 2 * self.heartbeat_interval
+                )
+                counts = self.counts.get(board_id, Counter())
+                counts_by_minute = {counter: [counts[(counter, minute)] for minute in minutes] for counter in COUNTERS}
+                # Drop the counts that have fallen out of the window, and the boards that have nothing left
+                for key in [key for key in counts if key[1] < minutes[0]]:
+                    del counts[key]
+                if not counts and not last_seen_times:
+                    self.counts.pop(board_id, None)
+                    self.connections.pop(board_id, None)
+                presence[board_id] = {"connections": connection_count, **get_rates(counts_by_minute, self.rate_window)}
+        return presence
+
+
+class RedisPresenceRegistry:
+    def __init__(self, client, heartbeat_interval, rate_window, prefix="futuboard:presence"):
+        self.client = client
+        self.heartbeat_interval = heartbeat_interval
+        self.rate_window = rate_window
+        self.prefix = prefix
+        # Messages are counted for every frame, so they are counted in the process first and written to the broker
+        # with the next heartbeat of a connection
+        self.lock = threading.Lock()
+        self.pending_counts = Counter()
+
+    def get_connections_key(self, board_id):
+        return f"{self.prefix}:connections:{board_id}"
+
+    def get_count_key(self, board_id, counter, minute):
+        return f"{self.prefix}:{counter}:{board_id}:{minute}"
+
+    def add_count(self, pipeline, board_id, counter, minute, count):
+        key = self.get_count_key(board_id, counter, minute)
+        pipeline.incrby(key, count)
+        pipeline.expire(key, (self.rate_window + 1) * 60)
+
+    def count(self, board_id, counter, count=1):
+        with self.lock:
+            self.pending_counts[(str(board_id), counter, get_minute(time.time()))] += count
+
+    def flush_counts(self, pipeline):
+        with self.lock:
+            pending_counts, self.pending_counts = self.pending_counts, Counter()
+        for (board_id, counter, minute), count in pending_counts.items():
+            self.add_count(pipeline, board_id, counter, minute, count)
+
+    def add_connection(self, board_id, connection_id):
+        now = time.time()
+        pipeline = self.client.pipeline()
+        pipeline.zadd(self.get_connections_key(board_id), {connection_id: now})
+        pipeline.sadd(f"{self.prefix}:boards", str(board_id))
+        self.add_count(pipeline, board_id, CONNECTS, get_minute(now), 1)
+        pipeline.execute()
+
+    def refresh_connection(self, board_id, connection_id):
+        pipeline = self.client.pipeline()
+        pipeline.zadd(self.get_connections_key(board_id), {connection_id: time.time()})
+        self.flush_counts(pipeline)
+        pipeline.execute()
+
+    def remove_connection(self, board_id, connection_id):
+        pipeline = self.client.pipeline()
+        pipeline.zrem(self.get_connections_key(board_id), connection_id)
+        self.add_count(pipeline, board_id, DISCONNECTS, get_minute(time.time()), 1)
+        self.flush_counts(pipeline)
+        pipeline.execute()
+
+    def get_board_ids(self):
+        return {board_id.decode() for board_id in self.client.smembers(f"{self.prefix}:boards")}
+
+    def get_board_presence(self, board_id):
+        return self.get_boards_presence([board_id])[str(board_id)]
+
+    def get_boards_presence(self, board_ids):
+        """
+        Returns the presence of each board by board id, read from the broker in one round trip
+        """
+        board_ids = [str(board_id) for board_id in board_ids]
+        now = time.time()
+        minutes = range(get_minute(now) - self.rate_window + 1, get_minute(now) + 1)
+
+        pipeline = self.client.pipeline()
+        for board_id in board_ids:
+            connections_key = self.get_connections_key(board_id)
+            # Connections of processes that died are left behind without heartbeats
+            pipeline.zremrangebyscore(connections_key, "-inf", now - 2 * self.heartbeat_interval)
+            pipeline.zcard(connections_key)
+            for counter in COUNTERS:
+                pipeline.mget([self.get_count_key(board_id, counter, minute) for minute in minutes])
+        results = pipeline.execute()
+
+        presence = {}
+        idle_board_ids = []
+        replies_per_board = 2 + len(COUNTERS)
+        for index, board_id in enumerate(board_ids):
+            _, connection_count, *counts = results[index * replies_per_board : (index + 1) * replies_per_board]
+            counts_by_minute = {
+                counter: [int(count or 0) for count in counter_counts]
+                for counter, counter_counts in zip(COUNTERS, counts)
+            }
+            if connection_count == 0 and not any(sum(counter_counts) for counter_counts in counts_by_minute.values()):
+                idle_board_ids.append(board_id)
+            presence[board_id] = {"connections": connection_count, **get_rates(counts_by_minute, self.rate_window)}
+        if idle_board_ids:
+            self.client.srem(f"{self.prefix}:boards", *idle_board_ids)
+        return presence
+
+
+presence_registries = {}
+
+
+def get_presence_registry():
+    """
+    Returns the registry of the broker set in the settings, or the registry of this process if there is no broker
+    """
+    url = getattr(settings, "PRESENCE_URL", "")
+    heartbeat_interval = getattr(settings, "PRESENCE_HEARTBEAT_INTERVAL", 30)
+    rate_window = getattr(settings, "PRESENCE_RATE_WINDOW", 5)
+    key = (url, heartbeat_interval, rate_window)
+    if key not in presence_registries:
+        if url:
+            presence_registries[key] = RedisPresenceRegistry(
+                redis.Redis.from_url(url), heartbeat_interval, rate_window
+            )
+        else:
+            presence_registries[key] = InProcessPresenceRegistry(heartbeat_interval, rate_window)
+    return presence_registries[key]
+
+
+def get_hot_boards(registry, limit):
+    """
+    Returns the presence of the boards with the most connections
+    """
+    boards = [
+        {"boardid": board_id, **presence}
+        for board_id, presence in registry.get_boards_presence(registry.get_board_ids()).items()
+    ]
+    boards.sort(key=lambda board: (board["connections"], board["messages_per_minute"]), reverse=True)
+    return boards[:limit]
@@ -0,0 +1,60 @@
+"""
+Board revisions for conditional GET requests.
+
+Every board has a revision number, which is increased by every change made on the board. The list endpoints of a
+board send the revision as the ETag of the list, and answer a request whose If-None-Match has the current revision with
+304 Not Modified, without loading or serializing the list. The revision is for the whole board, so a change anywhere on
+the board makes clients fetch its lists again, but an unchanged board costs one small query per list.
+
+The revision is increased when the change is published to the websocket clients (see board_events.py), which every
+view that changes a board does.
+"""
+
+from functools import wraps
+
+from django.db.models import F
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import Board
+
+
+def bump_board_revision(board_id):
+    Board.objects.filter(pk=board_id).update(revision=F("revision") + 1)
+
+
+def get_board_revision(board_id):
+    return Board.objects.filter(pk=board_id).values_list("revision", flat=True).first()
+
+
+def get_column_board_revision(column_id):
+    return Board.objects.filter(column__columnid=column_id).values_list("revision", flat=True).first()
+
+
+def board_revision_etag(get_revision):
+    """
+    Decorates a view so that its GET responses have the revision of the board as ETag, and GET requests that already
+    have the current revision are answered with 304. get_revision gets the url parameters of the view, and returns
+    None if there is no such board.
+    """
+
+    def get_etag(request, **kwargs):
+        if request.method != "GET":
+            return None
+        revision = get_revision(**kwargs)
+        return None if revision is None else f'"{revision}"'
+
+    def decorator(view):
+        conditional_view = condition(etag_func=get_etag)(view)
+
+        @wraps(view)
+        def wrapper(request, **kwargs):
+            response = conditional_view(request, **kwargs)
+            if request.method == "GET":
+                # Browsers check with the ETag that their cached list is still current before every use
+                patch_cache_control(response, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
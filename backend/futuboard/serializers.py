@@ -1,6 +1,10 @@
 from .models import Board, BoardTemplate, Column, Scope, Ticket, TicketEvent, User, Swimlanecolumn, Action
+from django.db.models import Prefetch
 from rest_framework import serializers
 
+# Serializers with nested or many-to-many fields have a setup_eager_loading method. Querysets passed to them with
+# many=True should go through it first, otherwise every row runs its own queries for the related objects.
+
 
 class BoardSerializer(serializers.ModelSerializer):
     class Meta:
@@ -41,6 +45,13 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ["userid", "name", "boardid", "actions", "tickets"]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.prefetch_related(
+            Prefetch("actions", queryset=Action.objects.only("actionid")),
+            Prefetch("tickets", queryset=Ticket.objects.only("ticketid")),
+        )
+
 
 class UserSerializerWithoutActionsOrTickets(serializers.ModelSerializer):
     class Meta:
@@ -58,6 +69,13 @@ class TicketSerializer(serializers.ModelSerializer):
     users = UserSerializerWithoutActionsOrTickets(many=True, read_only=True, source="user_set")
     scopes = ScopeSimpleSerializer(many=True, read_only=True, source="scope_set")
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.prefetch_related(
+            Prefetch("user_set", queryset=User.objects.only("userid", "name")),
+            Prefetch("scope_set", queryset=Scope.objects.only("scopeid", "title")),
+        )
+
     class Meta:
         model = Ticket
         fields = [
@@ -84,6 +102,10 @@ class SwimlaneColumnSerializer(serializers.ModelSerializer):
 class ActionSerializer(serializers.ModelSerializer):
     users = UserSerializerWithoutActionsOrTickets(many=True, read_only=True, source="user_set")
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.prefetch_related(Prefetch("user_set", queryset=User.objects.only("userid", "name")))
+
     class Meta:
         model = Action
         fields = ["actionid", "ticketid", "swimlanecolumnid", "title", "order", "creation_date", "users"]
@@ -92,7 +114,7 @@ class ActionSerializer(serializers.ModelSerializer):
 class BoardTemplateSerializer(serializers.ModelSerializer):
     class Meta:
         model = BoardTemplate
-        fields = ["boardtemplateid", "boardid", "title", "description"]
+        fields = ["boardtemplateid", "boardid", "title", "description", "snapshot_date"]
 
 
 class TicketEventSerializer(serializers.ModelSerializer):
@@ -101,6 +123,7 @@ class TicketEventSerializer(serializers.ModelSerializer):
         fields = [
             "ticketeventid",
             "ticketid",
+            "boardid",
             "event_time",
             "event_type",
             "old_columnid",
@@ -112,6 +135,13 @@ class TicketEventSerializer(serializers.ModelSerializer):
             "title",
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.prefetch_related(
+            Prefetch("old_scopes", queryset=Scope.objects.only("scopeid")),
+            Prefetch("new_scopes", queryset=Scope.objects.only("scopeid")),
+        )
+
 
 class TicketSizeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -138,6 +168,14 @@ class ScopeSerializer(serializers.ModelSerializer):
             "tickets",
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.prefetch_related(
+            Prefetch("forecast_tickets", queryset=Ticket.objects.only("ticketid")),
+            Prefetch("done_columns", queryset=Column.objects.only("columnid")),
+            Prefetch("tickets", queryset=Ticket.objects.only("ticketid")),
+        )
+
 
 class ScopeSerializerWithRelationInfo(serializers.ModelSerializer):
     done_columns = ColumnSerializer(many=True, read_only=True)
@@ -157,3 +195,7 @@ class ScopeSerializerWithRelationInfo(serializers.ModelSerializer):
             "done_columns",
             "tickets",
         ]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.prefetch_related("forecast_tickets", "done_columns", "tickets")
@@ -0,0 +1,42 @@
+"""
+Frozen copies of the boards of templates.
+
+A template keeps a frozen copy of its board, taken when the template is created and taken again only when an admin
+updates the template. Boards are created by copying the frozen board inside the database (see board_clone.py), so
+changes made to the template's board after the copy was taken don't show up in the boards created from the template.
+
+The frozen board is an ordinary board with snapshot_templateid set to its template. Its id is never sent to clients,
+and it is deleted with its template.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .board_clone import clone_board
+from .models import Board
+
+
+def take_snapshot(template):
+    """
+    Saves the template with a new frozen copy of its board, in place of the earlier copy
+    """
+    with transaction.atomic():
+        template.snapshot_date = timezone.now()
+        template.save()
+        Board.objects.filter(snapshot_templateid=template).delete()
+        clone_board(template.boardid_id, {"snapshot_templateid": template.pk})
+
+
+def create_board_from_snapshot(template, board_values, copy_history=True):
+    """
+    Creates a new board from the frozen copy of a template's board, and returns it. board_values replace values of the
+    board, e.g. its title. If copy_history is False, the ticket history of the frozen board is not copied, and the new
+    board's history starts with a CREATE event for each of its tickets.
+    """
+    snapshot_boards = Board.objects.filter(snapshot_templateid=template).values_list("pk", flat=True)
+    snapshot_board_id = snapshot_boards.first()
+    # Templates created before frozen copies get one when they are first used
+    if snapshot_board_id is None:
+        take_snapshot(template)
+        snapshot_board_id = snapshot_boards.first()
+    return clone_board(snapshot_board_id, board_values, copy_history=copy_history)
@@ -0,0 +1,77 @@
+"""
+Helpers for splitting time into the buckets (minutes, hours, days, ...) that chart data is reported in
+"""
+
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+import numpy as np
+
+DATE_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# Numpy datetime64 unit that each time unit is counted in. Weeks are counted in days and grouped by seven.
+NUMPY_DATETIME_UNITS = {"minute": "m", "hour": "h", "day": "D", "week": "D", "month": "M", "year": "Y"}
+
+# 1970-01-01, the start of numpy's day count, was a Thursday. Weeks start on Monday, three days earlier.
+DAYS_FROM_MONDAY_TO_EPOCH = 3
+
+
+def get_time_delta(time_unit):
+    time_delta = timedelta(minutes=1)
+    if time_unit == "minute":
+        time_delta = timedelta(minutes=1)
+    elif time_unit == "hour":
+        time_delta = timedelta(hours=1)
+    elif time_unit == "day":
+        time_delta = timedelta(days=1)
+    elif time_unit == "week":
+        time_delta = timedelta(weeks=1)
+    elif time_unit == "month":
+        time_delta = relativedelta(months=1)
+    elif time_unit == "year":
+        time_delta = relativedelta(years=1)
+
+    return time_delta
+
+
+def round_time(date, time_unit):
+    if time_unit == "minute":
+        return date.replace(second=0, microsecond=0)
+    elif time_unit == "hour":
+        return date.replace(minute=0, second=0, microsecond=0)
+    elif time_unit == "day":
+        return date.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif time_unit == "week":
+        return date.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=date.weekday())
+    elif time_unit == "month":
+        return date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    elif time_unit == "year":
+        return date.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    else:
+        raise ValueError("Invalid time unit")
+
+
+def get_bucket_numbers(times, time_unit):
+    """
+    Returns a numpy array of the time buckets that naive datetimes fall into, counted from 1970-01-01.
+    Bucket numbers of consecutive time buckets differ by one.
+    """
+    numbers = np.array(times, dtype="datetime64[us]").astype(f"datetime64[{NUMPY_DATETIME_UNITS[time_unit]}]")
+    numbers = numbers.astype(np.int64)
+
+    if time_unit == "week":
+        numbers = (numbers + DAYS_FROM_MONDAY_TO_EPOCH) // 7
+
+    return numbers
+
+
+def get_bucket_timestamps(first_bucket, last_bucket, time_unit):
+    """
+    Returns the start times of the time buckets from first_bucket to last_bucket, formatted with DATE_TIME_FORMAT
+    """
+    numbers = np.arange(first_bucket, last_bucket + 1, dtype=np.int64)
+
+    if time_unit == "week":
+        numbers = numbers * 7 - DAYS_FROM_MONDAY_TO_EPOCH
+
+    times = numbers.astype(f"datetime64[{NUMPY_DATETIME_UNITS[time_unit]}]").astype("datetime64[s]")
+    return np.datetime_as_string(times, unit="s").tolist()
@@ -6,7 +6,7 @@ from django.http import Http404, JsonResponse
 from django.utils import timezone
 import jwt
 
-from futuboard.models import Action, Board, Column, Swimlanecolumn, Ticket
+from futuboard.models import Action, Board, Column, Scope, Swimlanecolumn, Ticket, User
 from django.conf import settings
 
 ph = PasswordHasher()
@@ -60,9 +60,15 @@ def check_if_access_token_incorrect(board_id, request):
     if hasattr(settings, "DISABLE_AUTH_TOKEN_CHECKING") and settings.DISABLE_AUTH_TOKEN_CHECKING:
         return None
 
-    board = Board.objects.get(boardid=board_id)
+    has_password = Board.objects.values_list("has_password", flat=True).get(boardid=board_id)
+    return check_if_access_token_incorrect_for_board(board_id, has_password, request)
 
-    if check_if_password_hash_is_empty(board.passwordhash):
+
+def check_if_access_token_incorrect_for_board(board_id, has_password, request):
+    if hasattr(settings, "DISABLE_AUTH_TOKEN_CHECKING") and settings.DISABLE_AUTH_TOKEN_CHECKING:
+        return None
+
+    if not has_password:
         # If the board has no password, we don't need to check the token
         return None
 
@@ -83,35 +89,50 @@ def check_if_access_token_incorrect(board_id, request):
         return JsonResponse({"message": "Access token expired"}, status=401)
     except jwt.InvalidTokenError:
         return JsonResponse({"message": "Access token invalid"}, status=401)
-    except Board.DoesNotExist:
-        return JsonResponse({"message": "Associated board not found"}, status=404)
 
 
 def check_if_password_hash_is_empty(password_hash: str):
-    return verify_password("", password_hash)
-
-
-# model type is type[Column] | type[Scope] | type[Ticket] | type[Swimlanecolumn] | type[Action] | type[User]
-def check_if_acces_token_incorrect_using_other_id(model, id, request):
+    # Argon2 verification is slow on purpose, so this is only used when the has_password flag of a board is computed
+    # from an existing hash. Use Board.has_password everywhere else.
+    if password_hash == "":
+        return True
     try:
-        item = model.objects.get(pk=id)
+        return verify_password("", password_hash)
+    except argon2.exceptions.InvalidHashError:
+        return False
 
-        # Ticket and Swimlanecolumns don't have boardid, so we need to get it from their parent column
-        if model is Ticket or model is Swimlanecolumn:
-            return check_if_acces_token_incorrect_using_other_id(Column, item.columnid.columnid, request)
 
-        # Action doesn't have boardid, so we need to get it from it's parent ticket
-        if model is Action:
-            return check_if_acces_token_incorrect_using_other_id(Ticket, item.ticketid.ticketid, request)
+# Lookup from each model to the board it belongs to
+BOARD_LOOKUPS = {
+    Column: "boardid",
+    Scope: "boardid",
+    User: "boardid",
+    Ticket: "columnid__boardid",
+    Swimlanecolumn: "columnid__boardid",
+    Action: "ticketid__columnid__boardid",
+}
 
-        # If User, Scope or Column, we can get the boardid directly from the item
-        board_id = item.boardid.boardid
-        if token_incorrect := check_if_access_token_incorrect(board_id, request):
-            return token_incorrect
 
+# model type is type[Column] | type[Scope] | type[Ticket] | type[Swimlanecolumn] | type[Action] | type[User]
+def get_item_and_check_access_token(model, id, request):
+    """
+    Loads an item together with its parents up to the board in one query, and checks the access token of the request
+    against that board. Returns the item and an error response, which is None if the token is fine.
+    """
+    board_lookup = BOARD_LOOKUPS[model]
+    try:
+        item = model.objects.select_related(board_lookup).get(pk=id)
     except model.DoesNotExist:
         raise Http404(f"{model.__name__} not found")
 
+    board = item
+    for field in board_lookup.split("__"):
+        board = getattr(board, field, None)
+    if board is None:
+        raise Http404(f"Board of {model.__name__} not found")
+
+    return item, check_if_access_token_incorrect_for_board(board.boardid, board.has_password, request)
+
 
 ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD")
 
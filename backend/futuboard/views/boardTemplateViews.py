@@ -1,16 +1,18 @@
+from rest_framework import serializers
 from rest_framework.decorators import api_view
 from django.http import HttpResponse, JsonResponse
 
-from .import_export_views import create_board_from_data_dict, create_data_dict_from_board
+from .import_export_views import get_new_board_values
 
 from ..verification import is_admin_password_correct
 from ..models import Board, BoardTemplate
-from ..serializers import BoardTemplateSerializer
+from ..serializers import BoardSerializer, BoardTemplateSerializer
+from ..template_snapshots import create_board_from_snapshot, take_snapshot
 import rest_framework.request
 
 
 # Create your views here.
-@api_view(["GET", "POST", "DELETE"])
+@api_view(["GET", "POST", "PUT", "DELETE"])
 def board_templates(request: rest_framework.request.Request):
     if request.method == "GET":
         query_set = BoardTemplate.objects.all()
@@ -27,11 +29,24 @@ def board_templates(request: rest_framework.request.Request):
             description=request.data["description"],
             boardid=board,
         )
-        new_board_template.save()
+        take_snapshot(new_board_template)
 
         serializer = BoardTemplateSerializer(new_board_template)
         return JsonResponse(serializer.data, safe=False)
 
+    if request.method == "PUT":
+        if not is_admin_password_correct(request.data["password"]):
+            return HttpResponse(status=401)
+
+        # Updating a template takes a new frozen copy of its board, so boards created from it get the board's changes
+        board_template = BoardTemplate.objects.get(boardtemplateid=request.data["boardtemplateid"])
+        board_template.title = request.data.get("title", board_template.title)
+        board_template.description = request.data.get("description", board_template.description)
+        take_snapshot(board_template)
+
+        serializer = BoardTemplateSerializer(board_template)
+        return JsonResponse(serializer.data, safe=False)
+
     if request.method == "DELETE":
         if not is_admin_password_correct(request.data["password"]):
             return HttpResponse(status=401)
@@ -45,19 +60,13 @@ def create_board_from_template(request: rest_framework.request.Request, board_te
     if request.method == "POST":
         board_template = BoardTemplate.objects.get(boardtemplateid=board_template_id)
 
-        # Board is copied by exporting and importing the board data
-        data = create_data_dict_from_board(board_template.boardid.boardid)
-
-        # Remove creation_date from data, so new board will have new creation_date:s
-        for model in data.values():
-            model_list = model
-            if not isinstance(model, list):
-                model_list = [model]
-
-            for item in model_list:
-                if "creation_date" in item:
-                    del item["creation_date"]
-
-        new_board = create_board_from_data_dict(data, request.data["title"], request.data["password"])
+        # Board is copied from the template's frozen board, with new ids and creation dates. The ticket history is
+        # copied too, unless copy_history is false
+        copy_history = serializers.BooleanField().to_internal_value(request.data.get("copy_history", True))
+        new_board = create_board_from_snapshot(
+            board_template,
+            get_new_board_values(request.data["title"], request.data["password"]),
+            copy_history=copy_history,
+        )
 
-        return JsonResponse(new_board, safe=False)
+        return JsonResponse(BoardSerializer(new_board).data, safe=False)
@@ -1,14 +1,25 @@
 from django.http import Http404
 from rest_framework.decorators import api_view
-from django.http import JsonResponse
-from ..models import Board
-from ..serializers import BoardSerializer
+from django.http import HttpResponse, JsonResponse
+from ..models import Action, Board, Column, Scope, Swimlanecolumn, Ticket, User
+from ..serializers import (
+    ActionSerializer,
+    BoardSerializer,
+    ColumnSerializer,
+    ScopeSerializerWithRelationInfo,
+    SwimlaneColumnSerializer,
+    TicketSerializer,
+    UserSerializer,
+)
 import rest_framework.request
 from django.utils import timezone
+from .. import board_events
+from ..board_events import publish_board_event
+from ..presence import get_hot_boards, get_presence_registry
 from ..verification import (
-    check_if_password_hash_is_empty,
     encode_token,
     hash_password,
+    is_admin_password_correct,
     verify_password,
     check_if_access_token_incorrect,
 )
@@ -22,6 +33,7 @@ def all_boards(request: rest_framework.request.Request, format=None):
             title=request.data["title"],
             creation_date=timezone.now(),
             passwordhash=hash_password(request.data["password"]),
+            has_password=request.data["password"] != "",
             salt="",
         )
         new_board.save()
@@ -52,9 +64,8 @@ def board_by_id(request, board_id):
         try:
             board = Board.objects.get(pk=board_id)
             serializer = BoardSerializer(board)
-            needs_password = not check_if_password_hash_is_empty(board.passwordhash)
             serializer_data = serializer.data
-            serializer_data["needs_password"] = needs_password
+            serializer_data["needs_password"] = board.has_password
 
             return JsonResponse(serializer_data, safe=False)
 
@@ -71,6 +82,7 @@ def board_by_id(request, board_id):
             board.save()
 
             serializer = BoardSerializer(board)
+            publish_board_event(request, board_id, board_events.BOARD_UPDATED, serializer.data)
             return JsonResponse(serializer.data, safe=False)
         except Board.DoesNotExist:
             raise Http404("Board does not exist")
@@ -81,6 +93,7 @@ def board_by_id(request, board_id):
 
         board = Board.objects.get(pk=board_id)
         board.delete()
+        publish_board_event(request, board_id, board_events.BOARD_DELETED, {"boardid": board_id})
         return JsonResponse({"message": "Board deleted successfully"}, status=200)
 
 
@@ -95,6 +108,7 @@ def update_board_title(request, board_id):
         board.save()
 
         serializer = BoardSerializer(board)
+        publish_board_event(request, board_id, board_events.BOARD_UPDATED, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
     except Board.DoesNotExist:
@@ -119,9 +133,11 @@ def update_board_password(request, board_id):
             return JsonResponse({"message": "Passwords do not match"}, status=400)
 
         board.passwordhash = hash_password(candidate_password)
+        board.has_password = candidate_password != ""
         board.save()
 
         serializer = BoardSerializer(board)
+        publish_board_event(request, board_id, board_events.BOARD_UPDATED, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
     except Board.DoesNotExist:
@@ -145,6 +161,7 @@ def update_ticket_template(request, board_id):
         board.save()
 
         serializer = BoardSerializer(board)
+        publish_board_event(request, board_id, board_events.BOARD_UPDATED, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
     except Board.DoesNotExist:
@@ -161,7 +178,85 @@ def update_board_notes(request, board_id):
         board.notes = request.data.get("notes")
         board.save()
         serializer = BoardSerializer(board)
+        publish_board_event(request, board_id, board_events.BOARD_UPDATED, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
     except Board.DoesNotExist:
         raise Http404("Board does not exist")
+
+
+@api_view(["GET"])
+def board_snapshot(request, board_id):
+    """
+    Returns everything needed to render a board in one response, so that clients don't have to fetch tickets,
+    actions and swimlanecolumns separately for every column. The number of queries doesn't depend on the size of the board.
+    """
+    if not Board.objects.filter(pk=board_id).exists():
+        raise Http404("Board does not exist")
+
+    columns = Column.objects.filter(boardid=board_id).order_by("ordernum")
+    swimlanecolumns = Swimlanecolumn.objects.filter(columnid__boardid=board_id).order_by("ordernum")
+    tickets = TicketSerializer.setup_eager_loading(Ticket.objects.filter(columnid__boardid=board_id).order_by("order"))
+    actions = ActionSerializer.setup_eager_loading(
+        Action.objects.filter(ticketid__columnid__boardid=board_id).select_related("ticketid").order_by("order")
+    )
+    users = UserSerializer.setup_eager_loading(User.objects.filter(boardid=board_id))
+    scopes = ScopeSerializerWithRelationInfo.setup_eager_loading(Scope.objects.filter(boardid=board_id))
+
+    action_data = ActionSerializer(actions, many=True).data
+    for action, serialized_action in zip(actions, action_data):
+        serialized_action["columnid"] = action.ticketid.columnid_id
+
+    return JsonResponse(
+        {
+            "columns": ColumnSerializer(columns, many=True).data,
+            "swimlanecolumns": SwimlaneColumnSerializer(swimlanecolumns, many=True).data,
+            "tickets": TicketSerializer(tickets, many=True).data,
+            "actions": action_data,
+            "users": UserSerializer(users, many=True).data,
+            "scopes": ScopeSerializerWithRelationInfo(scopes, many=True).data,
+        },
+        safe=False,
+    )
+
+
+@api_view(["GET"])
+def board_event_metrics(request, board_id):
+    """
+    Returns the counters of the board's change events in the process that handles the request, e.g. how many events
+    were published compared to how many frames were sent to clients. See board_events.py.
+    """
+    if not Board.objects.filter(pk=board_id).exists():
+        raise Http404("Board does not exist")
+    if token_incorrect := check_if_access_token_incorrect(board_id, request):
+        return token_incorrect
+
+    return JsonResponse(board_events.get_board_event_metrics(board_id))
+
+
+@api_view(["GET"])
+def board_presence(request, board_id):
+    """
+    Returns the number of websocket clients connected to the board, and the rates of connects, disconnects and
+    messages sent to them. See presence.py.
+    """
+    if not Board.objects.filter(pk=board_id).exists():
+        raise Http404("Board does not exist")
+    if token_incorrect := check_if_access_token_incorrect(board_id, request):
+        return token_incorrect
+
+    return JsonResponse(get_presence_registry().get_board_presence(board_id))
+
+
+@api_view(["POST"])
+def hot_boards(request):
+    """
+    Returns the presence of the boards with the most websocket clients. Requires the admin password.
+    """
+    # Without ADMIN_PASSWORD set, a missing password would match it
+    password = request.data.get("password")
+    if not password or not is_admin_password_correct(password):
+        return HttpResponse(status=401)
+
+    limit = int(request.data.get("limit", 20))
+    return JsonResponse(get_hot_boards(get_presence_registry(), limit), safe=False)
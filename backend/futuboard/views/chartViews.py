@@ -5,21 +5,18 @@ from django.http import JsonResponse
 from ..models import Column, Scope, TicketEvent
 from ..serializers import TicketEventSerializer
 import rest_framework.request
-from datetime import timedelta, datetime
-from dateutil.relativedelta import relativedelta
-from django.db.models import Q
-
-DATE_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+from datetime import datetime
+from django.db.models import Exists, OuterRef, Q, Value
+import numpy as np
+from ..chart_cache import CACHED_TIME_UNITS, get_column_sizes_from_aggregates
+from ..time_buckets import get_bucket_numbers, get_bucket_timestamps, round_time
 
 
 @api_view(["GET"])
 def events(request: rest_framework.request.Request, board_id):
     if request.method == "GET":
-        columns = Column.objects.filter(boardid=board_id).order_by("ordernum")
-        query_set = (
-            TicketEvent.objects.filter(old_columnid__in=columns) | TicketEvent.objects.filter(new_columnid__in=columns)
-        ).order_by("event_time")
-        serializer = TicketEventSerializer(query_set, many=True)
+        query_set = TicketEvent.objects.filter(boardid=board_id).order_by("event_time")
+        serializer = TicketEventSerializer(TicketEventSerializer.setup_eager_loading(query_set), many=True)
         return JsonResponse(serializer.data, safe=False)
 
 
@@ -37,7 +34,12 @@ def cumulative_flow(request: rest_framework.request.Request, board_id):
 
         columns = Column.objects.filter(boardid=board_id).order_by("ordernum")
 
-        data_with_column_ids = get_column_sizes_at_times(columns, time_unit, count_unit, start_time, end_time)
+        if time_unit in CACHED_TIME_UNITS:
+            data_with_column_ids = get_column_sizes_from_aggregates(
+                columns, time_unit, count_unit, start_time, end_time
+            )
+        else:
+            data_with_column_ids = get_column_sizes_at_times(columns, time_unit, count_unit, start_time, end_time)
 
         (data_with_column_names, column_names) = change_column_ids_to_names(data_with_column_ids, columns)
 
@@ -56,7 +58,7 @@ def burn_up(request: rest_framework.request.Request, board_id, scope_id):
 
         scope = Scope.objects.get(scopeid=scope_id)
 
-        if not scope or scope.boardid.boardid != board_id:
+        if not scope or scope.boardid_id != board_id:
             return JsonResponse({"error": "Invalid scope"}, status=400)
 
         columns = Column.objects.filter(boardid=board_id).order_by("ordernum")
@@ -132,14 +134,48 @@ def velocity(request: rest_framework.request.Request, board_id):
 def get_column_sizes_at_times(
     columns, time_unit, count_unit, start_time=None, end_time=None, scope_id=None, tickets=None
 ):
-    event_in_columns = Q(old_columnid__in=columns) | Q(new_columnid__in=columns)
-    event_in_scope = Q(old_scopes__in=[scope_id]) | Q(new_scopes__in=[scope_id]) if scope_id else Q()
+    columns = list(columns)
+    if len(columns) == 0:
+        return []
+
+    column_ids = [str(column.columnid) for column in columns]
+    column_indices = {column_id: index for index, column_id in enumerate(column_ids)}
+
+    event_in_scope = Q(is_in_old_scopes=True) | Q(is_in_new_scopes=True) if scope_id else Q()
     event_has_ticket = Q(ticketid__in=tickets) if tickets else Q()
 
+    # Scope membership of the events is read in the same query as the events, instead of querying it for every event
+    if scope_id:
+        is_in_old_scopes = Exists(
+            TicketEvent.old_scopes.through.objects.filter(ticketevent=OuterRef("pk"), scope=scope_id)
+        )
+        is_in_new_scopes = Exists(
+            TicketEvent.new_scopes.through.objects.filter(ticketevent=OuterRef("pk"), scope=scope_id)
+        )
+    else:
+        is_in_old_scopes = Value(False)
+        is_in_new_scopes = Value(False)
+
+    # The events are read from the index on the board and event time, and only the events that touch the columns are
+    # kept, without joining the columns
+    column_uuids = [column.columnid for column in columns]
     ticket_events = (
-        TicketEvent.objects.filter(event_in_columns & event_in_scope & event_has_ticket)
+        TicketEvent.objects.filter(boardid=columns[0].boardid_id)
+        .filter(Q(old_columnid__in=column_uuids) | Q(new_columnid__in=column_uuids))
+        .annotate(is_in_old_scopes=is_in_old_scopes, is_in_new_scopes=is_in_new_scopes)
+        .filter(event_in_scope & event_has_ticket)
         .order_by("event_time")
-        .distinct()
+        .values_list(
+            "event_time",
+            "event_type",
+            "old_columnid",
+            "new_columnid",
+            "old_size",
+            "new_size",
+            "is_in_old_scopes",
+            "is_in_new_scopes",
+            named=True,
+        )
     )
 
     if len(ticket_events) == 0:
@@ -161,110 +197,64 @@ def get_column_sizes_at_times(
 
     end_time = round_time(end_time, time_unit)
 
-    event_dict = {}
+    # Every size change of a column is stored as (event time, column index, change), so that the changes can be
+    # summed per time bucket with numpy instead of stepping through the time buckets one by one
+    change_times = []
+    change_columns = []
+    change_sizes = []
+
+    def addChange(event, columnid, change):
+        column_index = column_indices.get(str(columnid))
+        if column_index is not None:
+            change_times.append(event.event_time.replace(tzinfo=None))
+            change_columns.append(column_index)
+            change_sizes.append(change)
 
     for event in ticket_events:
-        event_time = round_time(event.event_time, time_unit)
-        timestamp = event_time.strftime(DATE_TIME_FORMAT)
-        if event_dict.get(timestamp) is None:
-            event_dict[timestamp] = [event]
-        else:
-            event_dict[timestamp].append(event)
+        event_old_size = event.old_size if count_unit == "size" else 1
+        event_new_size = event.new_size if count_unit == "size" else 1
+
+        # A snapshot is the state of a ticket when its older events were archived, see event_archive.py
+        if event.event_type in (TicketEvent.CREATE, TicketEvent.SNAPSHOT):
+            addChange(event, event.new_columnid, event_new_size)
+        elif event.event_type == TicketEvent.DELETE:
+            addChange(event, event.old_columnid, -event_old_size)
+        elif event.event_type == TicketEvent.MOVE:
+            addChange(event, event.old_columnid, -event_old_size)
+            addChange(event, event.new_columnid, event_new_size)
+        elif event.event_type == TicketEvent.UPDATE:
+            addChange(event, event.new_columnid, event_new_size - event_old_size)
+        elif event.event_type == TicketEvent.SCOPE_CHANGE:
+            if event.is_in_old_scopes and not event.is_in_new_scopes:
+                # Scope was removed from ticket
+                addChange(event, event.old_columnid, -event_old_size)
+            elif not event.is_in_old_scopes and event.is_in_new_scopes:
+                # Scope was added to ticket
+                addChange(event, event.new_columnid, event_new_size)
+
+    first_bucket = get_bucket_numbers([start_time], time_unit)[0]
+    last_bucket = get_bucket_numbers([end_time], time_unit)[0]
+
+    if last_bucket < first_bucket:
+        return []
 
-    empty_column_dict = {}
+    # Rows are time buckets from the start time to the end time, columns are the board's columns
+    changes = np.zeros((last_bucket - first_bucket + 1, len(column_ids)), dtype=np.int64)
+
+    if len(change_times) > 0:
+        bucket_indices = get_bucket_numbers(change_times, time_unit) - first_bucket
+        in_range = bucket_indices <= last_bucket - first_bucket
+        # Changes from before the start time are added to the first time bucket, so that they are part of every size
+        np.add.at(
+            changes,
+            (np.maximum(bucket_indices[in_range], 0), np.array(change_columns)[in_range]),
+            np.array(change_sizes, dtype=np.int64)[in_range],
+        )
 
-    for column in columns:
-        empty_column_dict[str(column.columnid)] = 0
-
-    final_data = []
-
-    def setSize(column_sizes, columnid, change):
-        if column_sizes.get(str(columnid)) is not None:
-            column_sizes[str(columnid)] += change
-
-    time = start_time
-    can_have_events_before_start_time = earliest_event_time < start_time
-    if can_have_events_before_start_time:
-        # Have to start from the earliest event time, not the start time, because otherwise we miss events and the result is wrong
-        time = earliest_event_time
-
-    time_delta = get_time_delta(time_unit)
-
-    prev_column_sizes = None
-    while time <= end_time:
-        timestamp = time.strftime(DATE_TIME_FORMAT)
-        column_sizes = prev_column_sizes or empty_column_dict.copy()
-
-        events_at_time = event_dict.get(timestamp)
-
-        if events_at_time is not None:
-            for event in events_at_time:
-                event_old_size = event.old_size if count_unit == "size" else 1
-                event_new_size = event.new_size if count_unit == "size" else 1
-
-                if event.event_type == TicketEvent.CREATE:
-                    setSize(column_sizes, event.new_columnid.columnid, event_new_size)
-                elif event.event_type == TicketEvent.DELETE:
-                    setSize(column_sizes, event.old_columnid.columnid, -event_old_size)
-                elif event.event_type == TicketEvent.MOVE:
-                    setSize(column_sizes, event.old_columnid.columnid, -event_old_size)
-                    setSize(column_sizes, event.new_columnid.columnid, event_new_size)
-                elif event.event_type == TicketEvent.UPDATE:
-                    setSize(column_sizes, event.new_columnid.columnid, event_new_size - event_old_size)
-                elif event.event_type == TicketEvent.SCOPE_CHANGE:
-                    is_in_old_scopes = event.old_scopes.filter(scopeid=scope_id).exists()
-                    is_in_new_scopes = event.new_scopes.filter(scopeid=scope_id).exists()
-                    if is_in_old_scopes and not is_in_new_scopes:
-                        # Scope was removed from ticket
-                        setSize(column_sizes, event.old_columnid.columnid, -event_old_size)
-                    elif not is_in_old_scopes and is_in_new_scopes:
-                        # Scope was added to ticket
-                        setSize(column_sizes, event.new_columnid.columnid, event_new_size)
-
-        prev_column_sizes = column_sizes.copy()
-        time += time_delta
-        final_data.append((timestamp, column_sizes))
-
-    if can_have_events_before_start_time:
-        # Only keep events after/on the start time
-        final_data = [item for item in final_data if datetime.fromisoformat(item[0]) >= start_time]
-
-    return final_data
-
-
-def get_time_delta(time_unit):
-    time_delta = timedelta(minutes=1)
-    if time_unit == "minute":
-        time_delta = timedelta(minutes=1)
-    elif time_unit == "hour":
-        time_delta = timedelta(hours=1)
-    elif time_unit == "day":
-        time_delta = timedelta(days=1)
-    elif time_unit == "week":
-        time_delta = timedelta(weeks=1)
-    elif time_unit == "month":
-        time_delta = relativedelta(months=1)
-    elif time_unit == "year":
-        time_delta = relativedelta(years=1)
-
-    return time_delta
-
-
-def round_time(date, time_unit):
-    if time_unit == "minute":
-        return date.replace(second=0, microsecond=0)
-    elif time_unit == "hour":
-        return date.replace(minute=0, second=0, microsecond=0)
-    elif time_unit == "day":
-        return date.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif time_unit == "week":
-        return date.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=date.weekday())
-    elif time_unit == "month":
-        return date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    elif time_unit == "year":
-        return date.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-    else:
-        raise ValueError("Invalid time unit")
+    column_sizes = np.cumsum(changes, axis=0)
+    timestamps = get_bucket_timestamps(first_bucket, last_bucket, time_unit)
+
+    return [(timestamp, dict(zip(column_ids, sizes))) for timestamp, sizes in zip(timestamps, column_sizes.tolist())]
 
 
 def change_column_ids_to_names(data, columns):
@@ -3,9 +3,21 @@ Views to import and export JSON files of board data
 """
 
 from datetime import datetime
-import uuid
-from django.http import HttpResponse
-
+import zlib
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+
+from ..binary_export import (
+    BINARY_CONTENT_TYPE,
+    BinaryExportRenderer,
+    read_binary_export_sections,
+    stream_board_msgpack,
+)
+from ..board_import import import_board
+from ..export_reader import BoardImportError, read_export_sections
 from ..verification import hash_password
 
 from ..models import Action, Board, Column, Scope, Swimlanecolumn, Ticket, TicketEvent, User
@@ -20,173 +32,154 @@ from ..serializers import (
     ActionSerializer,
     TicketEventSerializer,
 )
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, renderer_classes
+from rest_framework.renderers import JSONRenderer
 from django.http import JsonResponse
 import json
-from django.db import models
 from django.template.defaultfilters import slugify
 
 
 @api_view(["GET"])
+@renderer_classes([JSONRenderer, BinaryExportRenderer])
 def export_board_data(request, board_id):
     """
-    Export board data to a json file
+    Export board data to a json file, or to a binary file if the client accepts the binary format
+
+    The file is streamed to the client while the tables are read, and compressed with gzip if the client accepts it
     """
     if request.method == "GET":
-        data = create_data_dict_from_board(board_id)
-        response = JsonResponse(data, safe=False)
-        filename = slugify(data["board"]["title"] + "-" + datetime.now().strftime("%d-%m-%Y"))
-        response["Content-Disposition"] = f'attachment; filename="{filename}.json"'
+        board = get_object_or_404(Board, boardid=board_id)
+        use_binary = request.accepted_renderer.media_type == BINARY_CONTENT_TYPE
+        use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+        chunk_size = getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+
+        if use_binary:
+            content = stream_board_msgpack(board, get_export_tables(board.boardid), chunk_size)
+        else:
+            content = stream_board_json(board, chunk_size)
+        response = StreamingHttpResponse(
+            gzip_stream(content) if use_gzip else content,
+            content_type=BINARY_CONTENT_TYPE if use_binary else "application/json",
+        )
+        if use_gzip:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ["Accept", "Accept-Encoding"])
+        filename = slugify(board.title + "-" + datetime.now().strftime("%d-%m-%Y"))
+        extension = "msgpack" if use_binary else "json"
+        response["Content-Disposition"] = f'attachment; filename="{filename}.{extension}"'
 
         return response
     return HttpResponse("Invalid request", status=400)
 
 
-def create_data_dict_from_board(board_id):
-    board = Board.objects.get(boardid=board_id)
-    users = User.objects.filter(boardid=board_id)
+def get_export_tables(board_id):
+    """
+    Returns the tables of an export in the order of the document, as (key, queryset, serializer class)
+    """
     columns = Column.objects.filter(boardid=board_id)
-    swimlanecolumns = Swimlanecolumn.objects.filter(columnid__in=columns)
     tickets = Ticket.objects.filter(columnid__in=columns)
-    actions = Action.objects.filter(ticketid__in=tickets)
-    ticketEvents = TicketEvent.objects.filter(ticketid__in=tickets)
+    return [
+        ("users", UserSerializer.setup_eager_loading(User.objects.filter(boardid=board_id)), UserSerializer),
+        ("columns", columns, ColumnSerializer),
+        ("swimlanecolumns", Swimlanecolumn.objects.filter(columnid__in=columns), SwimlaneColumnSerializer),
+        ("tickets", TicketSerializer.setup_eager_loading(tickets), TicketSerializer),
+        (
+            "actions",
+            ActionSerializer.setup_eager_loading(Action.objects.filter(ticketid__in=tickets)),
+            ActionSerializer,
+        ),
+        (
+            "ticketEvents",
+            TicketEventSerializer.setup_eager_loading(TicketEvent.objects.filter(boardid=board_id)),
+            TicketEventSerializer,
+        ),
+        ("scopes", ScopeSerializer.setup_eager_loading(Scope.objects.filter(boardid=board_id)), ScopeSerializer),
+    ]
+
+
+def create_data_dict_from_board(board_id):
+    board = Board.objects.get(boardid=board_id)
 
     data = {}
     data["board"] = BoardSerializer(board).data
-    data["users"] = UserSerializer(users, many=True).data
-    data["columns"] = ColumnSerializer(columns, many=True).data
-    data["swimlanecolumns"] = SwimlaneColumnSerializer(swimlanecolumns, many=True).data
-    data["tickets"] = TicketSerializer(tickets, many=True).data
-    data["actions"] = ActionSerializer(actions, many=True).data
-    data["ticketEvents"] = TicketEventSerializer(ticketEvents, many=True).data
-    data["scopes"] = ScopeSerializer(Scope.objects.filter(boardid=board_id), many=True).data
+    for key, queryset, serializer_class in get_export_tables(board_id):
+        data[key] = serializer_class(queryset, many=True).data
 
     return data
 
 
+def stream_board_json(board, chunk_size):
+    """
+    Yields the same JSON document as create_data_dict_from_board piece by piece. The tables are read chunk_size rows
+    at a time, so only one chunk of a table is in memory at once.
+    """
+    encoder = DjangoJSONEncoder()
+    yield '{"board": ' + encoder.encode(BoardSerializer(board).data)
+    for key, queryset, serializer_class in get_export_tables(board.boardid):
+        yield f', "{key}": ['
+        separator = ""
+        for row in queryset.iterator(chunk_size=chunk_size):
+            yield separator + encoder.encode(serializer_class(row).data)
+            separator = ", "
+        yield "]"
+    yield "}"
+
+
+def gzip_stream(content):
+    """
+    Compresses a stream of strings or bytes to a gzip stream
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for part in content:
+        compressed = compressor.compress(part.encode("UTF-8") if isinstance(part, str) else part)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
 @api_view(["POST"])
 def import_board_data(request):
     """
-    Import board data from a json file
+    Import board data from a json file, or from a binary file of the binary export format
+
+    The file is read and imported section by section, so large files don't have to fit in memory
     """
     if request.method == "POST":
-        json_file = request.FILES["file"]
-        if not json_file.name.endswith(".json"):
+        max_size = getattr(settings, "IMPORT_MAX_UPLOAD_SIZE", 100 * 1024 * 1024)
+        # Rejected before the upload is read, if the client sent its size
+        if int(request.META.get("CONTENT_LENGTH") or 0) > max_size:
+            return HttpResponse("File is too large", status=413)
+        export_file = request.FILES["file"]
+        if export_file.name.endswith(".json"):
+            sections = read_export_sections(export_file)
+        elif export_file.name.endswith(".msgpack"):
+            sections = read_binary_export_sections(export_file)
+        else:
             return HttpResponse("Invalid file type", status=400)
-        json_string = json_file.read().decode("UTF-8")
-        data = json.loads(json_string)
+        if export_file.size > max_size:
+            return HttpResponse("File is too large", status=413)
 
         board_metadata = json.loads(request.data["board"])
         title = board_metadata["title"]
         password = board_metadata["password"]
 
-        created_board = create_board_from_data_dict(data, title, password)
+        try:
+            new_board = import_board(sections, get_new_board_values(title, password))
+        except BoardImportError as error:
+            return HttpResponse(str(error), status=400)
 
-        return JsonResponse(created_board, safe=False)
+        return JsonResponse(BoardSerializer(new_board).data, safe=False)
 
     return HttpResponse("Invalid request", status=400)
 
 
-def create_board_from_data_dict(data, new_title, new_password):
-    new_ids = {}
-
-    for key in data:
-        replace_ids(data, key, new_ids)
-
-    board_data = data["board"]
-    board_data["title"] = new_title
-    board_data["passwordhash"] = hash_password(new_password)
+def get_new_board_values(title, password):
+    return {"title": title, "passwordhash": hash_password(password), "has_password": password != ""}
 
-    new_board = add_to_db(Board, board_data)
 
-    for column in data["columns"]:
-        add_to_db(Column, column)
-
-    for swimlanecolumn in data["swimlanecolumns"]:
-        add_to_db(Swimlanecolumn, swimlanecolumn)
-
-    for ticket in data["tickets"]:
-        add_to_db(Ticket, ticket)
-
-    for action in data["actions"]:
-        add_to_db(Action, action)
-
-    for scope in data.get("scopes", []):
-        add_to_db(Scope, scope)
-
-    for ticketEvent in data["ticketEvents"]:
-        add_to_db(TicketEvent, ticketEvent)
-
-    for user in data["users"]:
-        add_to_db(User, user)
+def create_board_from_data_dict(data, new_title, new_password):
+    new_board = import_board(data.items(), get_new_board_values(new_title, new_password))
 
     serializer = BoardSerializer(new_board)
 
     return serializer.data
-
-
-def is_valid_uuid(val):
-    try:
-        uuid.UUID(str(val))
-        return True
-    except ValueError:
-        return False
-
-
-# Recursively replace all UUIDs in a dictionary with new UUIDs
-def replace_ids(data_dict, key, new_ids):
-    value = data_dict[key]
-    is_string = isinstance(value, str)
-    if isinstance(value, uuid.UUID) or (is_string and is_valid_uuid(value)):
-        value = str(value)
-        if value in new_ids:
-            data_dict[key] = new_ids[value]
-        else:
-            new_id = str(uuid.uuid4())
-            new_ids[value] = new_id
-            data_dict[key] = new_id
-
-    elif isinstance(value, dict):
-        for innerkey in value:
-            replace_ids(value, innerkey, new_ids)
-
-    elif isinstance(value, list):
-        for i in range(len(value)):
-            replace_ids(value, i, new_ids)
-
-
-def add_to_db(model, data):
-    fields = model._meta.get_fields()
-
-    # Remove fields that are not in the model
-    field_names = [f.name for f in fields]
-    fields_to_remove = []  # Can't remove items from a dictionary while iterating over it
-    for key in data:
-        if key not in field_names:
-            fields_to_remove.append(key)
-
-    for key in fields_to_remove:
-        del data[key]
-
-    many_to_many_values = {}
-
-    for field in fields:
-        # Replace foreign keys with actual objects
-        if isinstance(field, models.ForeignKey):
-            if field.name in data and data[field.name]:
-                data[field.name] = field.related_model.objects.get(pk=data[field.name])
-
-        # Save data from many-to-many fields for later
-        if isinstance(field, models.ManyToManyField):
-            if field.name in data:
-                many_to_many_values[field.name] = data[field.name]
-                del data[field.name]
-
-    new_object = model.objects.create(**data)
-
-    # Add many-to-many values
-    for field_name, values in many_to_many_values.items():
-        for value in values:
-            getattr(new_object, field_name).add(value)  # Same as user.tickets.add(ticket)
-
-    return new_object
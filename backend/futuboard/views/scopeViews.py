@@ -1,19 +1,24 @@
 from rest_framework.decorators import api_view
 from django.http import JsonResponse
 
+from .. import board_events
+from ..board_events import publish_board_event, publish_board_events
+from ..revisions import board_revision_etag, get_board_revision
+from ..chart_cache import record_ticket_events
 from ..verification import check_if_access_token_incorrect
 
 from ..models import Board, Column, Scope, Ticket, TicketEvent
-from ..serializers import ScopeSerializerWithRelationInfo
+from ..serializers import ScopeSerializerWithRelationInfo, TicketSerializer
 import rest_framework.request
 from django.utils.timezone import now
 
 
 @api_view(["GET", "POST", "DELETE"])
+@board_revision_etag(get_board_revision)
 def scopes_on_board(request: rest_framework.request.Request, board_id: str):
     if request.method == "GET":
         board = Board.objects.get(boardid=board_id)
-        query_set = Scope.objects.filter(boardid=board)
+        query_set = ScopeSerializerWithRelationInfo.setup_eager_loading(Scope.objects.filter(boardid=board))
         serializer = ScopeSerializerWithRelationInfo(query_set, many=True)
         return JsonResponse(serializer.data, safe=False)
 
@@ -28,6 +33,7 @@ def scopes_on_board(request: rest_framework.request.Request, board_id: str):
         new_scope.save()
 
         serializer = ScopeSerializerWithRelationInfo(new_scope)
+        publish_board_event(request, board_id, board_events.SCOPE_CREATED, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
     if request.method == "DELETE":
@@ -35,6 +41,7 @@ def scopes_on_board(request: rest_framework.request.Request, board_id: str):
             return token_incorrect
         scope = Scope.objects.get(scopeid=request.data["scopeid"])
         scope.delete()
+        publish_board_event(request, board_id, board_events.SCOPE_DELETED, {"scopeid": request.data["scopeid"]})
         return JsonResponse({"success": True})
 
     return JsonResponse({"error": "Invalid request method"}, status=400)
@@ -53,6 +60,7 @@ def tickets_in_scope(request: rest_framework.request.Request, scopeid: str):
     if request.method == "POST":
         ticket_add_to_scope_event = TicketEvent(
             ticketid=ticket,
+            boardid_id=board_id,
             event_type=TicketEvent.SCOPE_CHANGE,
             old_columnid=ticket.columnid,
             new_columnid=ticket.columnid,
@@ -70,12 +78,15 @@ def tickets_in_scope(request: rest_framework.request.Request, scopeid: str):
         ticket_scopes.append(scope)
 
         ticket_add_to_scope_event.new_scopes.set(ticket_scopes)
+        record_ticket_events([ticket_add_to_scope_event])
+        publish_ticket_scopes_changed(request, scope, ticket)
 
         return JsonResponse({"success": True})
 
     if request.method == "DELETE":
         ticket_remove_from_scope_event = TicketEvent(
             ticketid=ticket,
+            boardid_id=board_id,
             event_type=TicketEvent.SCOPE_CHANGE,
             old_columnid=ticket.columnid,
             new_columnid=ticket.columnid,
@@ -92,12 +103,26 @@ def tickets_in_scope(request: rest_framework.request.Request, scopeid: str):
         ticket_scopes.remove(scope)
 
         ticket_remove_from_scope_event.new_scopes.set(ticket_scopes)
+        record_ticket_events([ticket_remove_from_scope_event])
+        publish_ticket_scopes_changed(request, scope, ticket)
 
         return JsonResponse({"success": True})
 
     return JsonResponse({"error": "Invalid request method"}, status=400)
 
 
+def publish_ticket_scopes_changed(request, scope, ticket):
+    ticket = TicketSerializer.setup_eager_loading(Ticket.objects.filter(pk=ticket.ticketid)).get()
+    publish_board_events(
+        request,
+        scope.boardid_id,
+        [
+            (board_events.TICKET_UPDATED, TicketSerializer(ticket).data),
+            (board_events.SCOPE_UPDATED, {"scopeid": scope.scopeid}),
+        ],
+    )
+
+
 @api_view(["POST"])
 def set_scope_forecast(request: rest_framework.request.Request, scopeid: str):
     scope = Scope.objects.get(scopeid=scopeid)
@@ -113,6 +138,7 @@ def set_scope_forecast(request: rest_framework.request.Request, scopeid: str):
     scope.forecast_size = scope_size
     scope.forecast_tickets.set(scope.tickets.all())
     scope.save()
+    publish_board_event(request, board_id, board_events.SCOPE_UPDATED, {"scopeid": scopeid})
     return JsonResponse({"success": True})
 
 
@@ -126,6 +152,7 @@ def set_scope_title(request: rest_framework.request.Request, scopeid: str):
 
     scope.title = request.data["title"]
     scope.save()
+    publish_board_event(request, board_id, board_events.SCOPE_UPDATED, {"scopeid": scopeid, "title": scope.title})
     return JsonResponse({"success": True})
 
 
@@ -140,4 +167,5 @@ def set_scope_done_columns(request: rest_framework.request.Request, scopeid: str
     columns = Column.objects.filter(columnid__in=request.data["done_columns"])
     scope.done_columns.set(columns)
     scope.save()
+    publish_board_event(request, board_id, board_events.SCOPE_UPDATED, {"scopeid": scopeid})
     return JsonResponse({"success": True})
@@ -3,13 +3,18 @@ from rest_framework.decorators import api_view
 from django.utils import timezone
 from django.http import JsonResponse
 
-from ..verification import check_if_acces_token_incorrect_using_other_id
+from .. import board_events
+from ..board_events import publish_board_event, publish_board_events
+from ..revisions import board_revision_etag, get_column_board_revision
+from ..ordering import get_first_order, get_in_order, get_last_order, set_order
+from ..verification import get_item_and_check_access_token
 
 from ..models import Board, Column, Swimlanecolumn, Action, Ticket, User
 from ..serializers import SwimlaneColumnSerializer, ActionSerializer, UserSerializer
 
 
 @api_view(["GET", "POST"])
+@board_revision_etag(get_column_board_revision)
 def swimlanecolumns_on_column(request, column_id):
     if request.method == "GET":
         query_set = Swimlanecolumn.objects.filter(columnid=column_id).order_by("ordernum")
@@ -17,28 +22,30 @@ def swimlanecolumns_on_column(request, column_id):
         return JsonResponse(serializer.data, safe=False)
 
     if request.method == "POST":
-        if token_incorrect := check_if_acces_token_incorrect_using_other_id(Column, column_id, request):
+        column, token_incorrect = get_item_and_check_access_token(Column, column_id, request)
+        if token_incorrect:
             return token_incorrect
-        length = len(Swimlanecolumn.objects.filter(columnid=column_id))
         new_swimlanecolumn = Swimlanecolumn(
             swimlanecolumnid=request.data["swimlanecolumnid"],
-            columnid=Column.objects.get(pk=column_id),
+            columnid=column,
             title=request.data["title"],
-            ordernum=length,
+            ordernum=get_last_order(Swimlanecolumn.objects.filter(columnid=column_id), "ordernum"),
         )
 
         new_swimlanecolumn.save()
         serializer = SwimlaneColumnSerializer(new_swimlanecolumn)
+        publish_board_event(request, column.boardid_id, board_events.SWIMLANECOLUMN_CREATED, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
 
 @api_view(["GET"])
+@board_revision_etag(get_column_board_revision)
 def get_actions_by_columnId(request, column_id):
     if request.method == "GET":
         try:
             ticketIds_query_set = Ticket.objects.filter(columnid=column_id)
             query_set = Action.objects.filter(ticketid__in=ticketIds_query_set)
-            query_set = query_set.order_by("order")
+            query_set = ActionSerializer.setup_eager_loading(query_set.order_by("order"))
             serializer = ActionSerializer(query_set, many=True)
             for action in serializer.data:
                 action["columnid"] = column_id
@@ -49,33 +56,49 @@ def get_actions_by_columnId(request, column_id):
 
 @api_view(["GET", "POST", "PUT"])
 def action_on_swimlane(request, swimlanecolumn_id, ticket_id):
-    if token_incorrect := check_if_acces_token_incorrect_using_other_id(Ticket, ticket_id, request):
+    ticket, token_incorrect = get_item_and_check_access_token(Ticket, ticket_id, request)
+    if token_incorrect:
         return token_incorrect
 
     if request.method == "PUT":
         actions_data = request.data
-
-        # change action attributes to new swimlanecolumn and ticket
-        for action in actions_data:
-            action_from_database = Action.objects.get(actionid=action["actionid"])
-            action_from_database.ticketid = Ticket.objects.get(pk=ticket_id)
-            action_from_database.swimlanecolumnid = Swimlanecolumn.objects.get(pk=swimlanecolumn_id)
-            action_from_database.save()
-
-        # update order of actions
-        for index, action_data in enumerate(actions_data):
-            action = Action.objects.get(actionid=action_data["actionid"])
-            action.order = index
-            action.save()
+        try:
+            swimlanecolumn = Swimlanecolumn.objects.get(pk=swimlanecolumn_id)
+            actions = get_in_order(Action.objects.all(), [action_data["actionid"] for action_data in actions_data])
+        except (Swimlanecolumn.DoesNotExist, Action.DoesNotExist):
+            raise Http404("Action not found")
+
+        # change action attributes to new swimlanecolumn and ticket, and update order of actions
+        changed_actions = set_order(
+            actions,
+            "order",
+            lambda action: action.ticketid_id == ticket.ticketid and action.swimlanecolumnid_id == swimlanecolumn.pk,
+        )
+        for action in actions:
+            if action.ticketid_id != ticket.ticketid or action.swimlanecolumnid_id != swimlanecolumn.pk:
+                action.ticketid = ticket
+                action.swimlanecolumnid = swimlanecolumn
+        Action.objects.bulk_update(changed_actions, ["ticketid", "swimlanecolumnid", "order"])
+
+        moved_actions = ActionSerializer.setup_eager_loading(
+            Action.objects.filter(pk__in=[action.actionid for action in changed_actions])
+        )
+        moved_action_events = []
+        for action_data in ActionSerializer(moved_actions, many=True).data:
+            action_data["columnid"] = ticket.columnid_id
+            moved_action_events.append((board_events.ACTION_MOVED, action_data))
+        publish_board_events(request, ticket.columnid.boardid_id, moved_action_events)
         return JsonResponse({"message": "Action order updated successfully"}, status=200)
 
     if request.method == "POST":
         new_action = Action(
             actionid=request.data["actionid"],
-            ticketid=Ticket.objects.get(pk=ticket_id),
+            ticketid=ticket,
             swimlanecolumnid=Swimlanecolumn.objects.get(pk=swimlanecolumn_id),
             title=request.data["title"],
-            order=0,
+            order=get_first_order(
+                Action.objects.filter(swimlanecolumnid=swimlanecolumn_id, ticketid=ticket_id), "order"
+            ),
             creation_date=timezone.now(),
         )
 
@@ -84,63 +107,57 @@ def action_on_swimlane(request, swimlanecolumn_id, ticket_id):
 
         new_action.save()
 
-        same_swimlane_actions = Action.objects.filter(swimlanecolumnid=swimlanecolumn_id, ticketid=ticket_id)
-        for action in same_swimlane_actions:
-            action.order += 1
-            action.save()
-
         serializer = ActionSerializer(new_action)
+        publish_action_event(request, board_events.ACTION_CREATED, new_action, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
 
 @api_view(["PUT"])
 def update_swimlanecolumn(request, swimlanecolumn_id):
-    if token_incorrect := check_if_acces_token_incorrect_using_other_id(Swimlanecolumn, swimlanecolumn_id, request):
+    swimlanecolumn, token_incorrect = get_item_and_check_access_token(Swimlanecolumn, swimlanecolumn_id, request)
+    if token_incorrect:
         return token_incorrect
 
-    try:
-        swimlanecolumn = Swimlanecolumn.objects.get(pk=swimlanecolumn_id)
-    except Column.DoesNotExist:
-        raise Http404("Column not found")
-
     if request.method == "PUT":
         swimlanecolumn.title = request.data.get("title", swimlanecolumn.title)
         swimlanecolumn.save()
 
         serializer = SwimlaneColumnSerializer(swimlanecolumn)
+        publish_board_event(
+            request, swimlanecolumn.columnid.boardid_id, board_events.SWIMLANECOLUMN_UPDATED, serializer.data
+        )
         return JsonResponse(serializer.data, safe=False)
 
 
 @api_view(["PUT", "DELETE"])
 def update_action(request, action_id):
-    if token_incorrect := check_if_acces_token_incorrect_using_other_id(Action, action_id, request):
+    action, token_incorrect = get_item_and_check_access_token(Action, action_id, request)
+    if token_incorrect:
         return token_incorrect
 
-    try:
-        action = Action.objects.get(pk=action_id)
-    except Action.DoesNotExist:
-        raise Http404("Action not found")
-
     if request.method == "PUT":
         action.title = request.data.get("title", action.title)
         action.save()
 
         serializer = ActionSerializer(action)
+        publish_action_event(request, board_events.ACTION_UPDATED, action, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
     if request.method == "DELETE":
         action.delete()
+        publish_action_event(request, board_events.ACTION_DELETED, action, {"actionid": action_id})
         return JsonResponse({"message": "Action deleted succesfully"}, status=200)
 
 
 @api_view(["GET", "POST", "DELETE"])
 def users_on_action(request, action_id):
-    if token_incorrect := check_if_acces_token_incorrect_using_other_id(Action, action_id, request):
+    action, token_incorrect = get_item_and_check_access_token(Action, action_id, request)
+    if token_incorrect:
         return token_incorrect
 
     if request.method == "GET":
         try:
-            users = User.objects.filter(actions__actionid=action_id)
+            users = UserSerializer.setup_eager_loading(User.objects.filter(actions__actionid=action_id))
             serializer = UserSerializer(users, many=True)
         except Board.DoesNotExist:
             raise Http404("Error getting users")
@@ -149,11 +166,34 @@ def users_on_action(request, action_id):
     if request.method == "POST":
         userid = request.data["userid"]
         user = User.objects.get(pk=userid)
-        user.actions.add(action_id)
+        user.actions.add(action)
+        publish_action_users_changed(request, action, user)
         return JsonResponse({"message": "Added user to action succesfully"}, status=200)
 
     if request.method == "DELETE":
         userid = request.data["userid"]
         user = User.objects.get(pk=userid)
-        user.actions.remove(action_id)
+        user.actions.remove(action)
+        publish_action_users_changed(request, action, user)
         return JsonResponse({"message": "Removed user from action succesfully"}, status=200)
+
+
+def publish_action_event(request, event_type, action, action_data):
+    # Clients cache actions by the column of their ticket
+    column = action.ticketid.columnid
+    publish_board_event(request, column.boardid_id, event_type, {**action_data, "columnid": column.columnid})
+
+
+def publish_action_users_changed(request, action, user):
+    action_data = ActionSerializer(
+        ActionSerializer.setup_eager_loading(Action.objects.filter(pk=action.pk)).get()
+    ).data
+    column = action.ticketid.columnid
+    publish_board_events(
+        request,
+        column.boardid_id,
+        [
+            (board_events.ACTION_UPDATED, {**action_data, "columnid": column.columnid}),
+            (board_events.USER_UPDATED, UserSerializer(user).data),
+        ],
+    )
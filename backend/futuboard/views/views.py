@@ -2,17 +2,25 @@ from django.http import Http404
 from rest_framework.decorators import api_view
 from django.http import HttpResponse, JsonResponse
 
+from django.db import transaction
+
+from .. import board_events
+from ..board_events import publish_board_event, publish_board_events
+from ..chart_cache import record_ticket_events
 from ..verification import (
-    check_if_acces_token_incorrect_using_other_id,
+    get_item_and_check_access_token,
     is_admin_password_correct,
     check_if_access_token_incorrect,
 )
-from ..models import Board, Column, Ticket, TicketEvent, User, Swimlanecolumn
+from ..models import Board, Column, Scope, Ticket, TicketEvent, User, Swimlanecolumn
+from ..revisions import board_revision_etag, get_board_revision, get_column_board_revision
+from ..ordering import ORDER_GAP, get_first_order, get_in_order, get_last_order, set_order
 from ..serializers import ColumnSerializer, TicketSerializer, UserSerializer
 from django.utils import timezone
 
 
 @api_view(["GET", "POST", "PUT"])
+@board_revision_etag(get_board_revision)
 def columns_on_board(request, board_id):
     if request.method == "GET":
         try:
@@ -26,13 +34,12 @@ def columns_on_board(request, board_id):
         if token_incorrect := check_if_access_token_incorrect(board_id, request):
             return token_incorrect
 
-        length = len(Column.objects.filter(boardid=board_id))
         new_column = Column(
             columnid=request.data["columnid"],
             boardid=Board.objects.get(pk=board_id),
             description="",
             title=request.data["title"],
-            ordernum=length,
+            ordernum=get_last_order(Column.objects.filter(boardid=board_id), "ordernum"),
             creation_date=timezone.now(),
             swimlane=request.data["swimlane"],
         )
@@ -43,59 +50,82 @@ def columns_on_board(request, board_id):
                 swimlanecolumn = Swimlanecolumn(
                     columnid=Column.objects.get(pk=request.data["columnid"]),
                     title=name,
-                    ordernum=defaultSwimlaneNames.index(name),
+                    ordernum=defaultSwimlaneNames.index(name) * ORDER_GAP,
                 )
                 print("SWIM: " + str(swimlanecolumn.swimlanecolumnid))
                 swimlanecolumn.save()
         serializer = ColumnSerializer(new_column)
+        publish_board_event(request, board_id, board_events.COLUMN_CREATED, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
     if request.method == "PUT":
         if token_incorrect := check_if_access_token_incorrect(board_id, request):
             return token_incorrect
         columns_data = request.data
-        for index, column_data in enumerate(columns_data):
-            column = Column.objects.get(columnid=column_data["columnid"])
-            column.ordernum = index
-            column.save()
+        try:
+            columns = get_in_order(
+                Column.objects.filter(boardid=board_id), [column_data["columnid"] for column_data in columns_data]
+            )
+        except Column.DoesNotExist:
+            raise Http404("Column does not exist")
+
+        changed_columns = set_order(columns, "ordernum", lambda column: True)
+        Column.objects.bulk_update(changed_columns, ["ordernum"])
+        publish_board_event(
+            request,
+            board_id,
+            board_events.COLUMNS_REORDERED,
+            [{"columnid": column.columnid, "ordernum": column.ordernum} for column in changed_columns],
+        )
         return JsonResponse({"message": "Columns order updated successfully"}, status=200)
 
 
 @api_view(["GET", "POST", "PUT"])
+@board_revision_etag(get_column_board_revision)
 def tickets_on_column(request, column_id):
     if request.method == "PUT":
-        if token_incorrect := check_if_acces_token_incorrect_using_other_id(Column, column_id, request):
+        column, token_incorrect = get_item_and_check_access_token(Column, column_id, request)
+        if token_incorrect:
             return token_incorrect
 
         try:
             tickets_data = request.data
 
-            # if ticket has a columnid that is not the same as the columnid from the ticket in the database, change it
-            for ticket in tickets_data:
-                ticket_from_database = Ticket.objects.get(ticketid=ticket["ticketid"])
-                column = Column.objects.get(pk=column_id)
-                if ticket_from_database.columnid != column:
-                    old_column = ticket_from_database.columnid
-                    ticket_from_database.columnid = column
-                    ticket_from_database.save()
-                    ticket_move_event = TicketEvent(
-                        ticketid=ticket_from_database,
-                        event_type=TicketEvent.MOVE,
-                        old_columnid=old_column,
-                        new_columnid=column,
-                        old_size=ticket_from_database.size,
-                        new_size=ticket_from_database.size,
-                        title=ticket_from_database.title,
-                    )
-                    ticket_move_event.save()
-                    ticket_move_event.old_scopes.set(ticket_from_database.scope_set.all())
-                    ticket_move_event.new_scopes.set(ticket_from_database.scope_set.all())
-
-            # update order of tickets
-            for index, ticket_data in enumerate(tickets_data):
-                task = Ticket.objects.get(ticketid=ticket_data["ticketid"])
-                task.order = index
-                task.save()
+            with transaction.atomic():
+                tickets = get_in_order(Ticket.objects.all(), [ticket_data["ticketid"] for ticket_data in tickets_data])
+
+                changed_tickets = set_order(tickets, "order", lambda ticket: ticket.columnid_id == column.columnid)
+                old_column_ids = {str(ticket.ticketid): ticket.columnid_id for ticket in changed_tickets}
+
+                # if ticket has a columnid that is not the same as the columnid from the ticket in the database, change it
+                ticket_move_events = []
+                for ticket in tickets:
+                    if ticket.columnid_id != column.columnid:
+                        ticket_move_events.append(
+                            TicketEvent(
+                                ticketid=ticket,
+                                boardid_id=column.boardid_id,
+                                event_type=TicketEvent.MOVE,
+                                old_columnid_id=ticket.columnid_id,
+                                new_columnid=column,
+                                old_size=ticket.size,
+                                new_size=ticket.size,
+                                title=ticket.title,
+                            )
+                        )
+                        ticket.columnid = column
+
+                # Only tickets that were moved from another column or got a new order value are written
+                Ticket.objects.bulk_update(changed_tickets, ["columnid", "order"])
+                create_ticket_events_with_current_scopes(ticket_move_events)
+                record_ticket_events(ticket_move_events)
+
+                moved_tickets = TicketSerializer.setup_eager_loading(Ticket.objects.filter(pk__in=old_column_ids))
+                moved_ticket_events = []
+                for ticket_data in TicketSerializer(moved_tickets, many=True).data:
+                    ticket_data["old_columnid"] = old_column_ids[ticket_data["ticketid"]]
+                    moved_ticket_events.append((board_events.TICKET_MOVED, ticket_data))
+                publish_board_events(request, column.boardid_id, moved_ticket_events)
 
             return JsonResponse({"message": "Tasks order updated successfully"}, status=200)
 
@@ -103,10 +133,10 @@ def tickets_on_column(request, column_id):
             raise Http404("Task does not exist")
 
     if request.method == "POST":
-        if token_incorrect := check_if_acces_token_incorrect_using_other_id(Column, column_id, request):
+        column, token_incorrect = get_item_and_check_access_token(Column, column_id, request)
+        if token_incorrect:
             return token_incorrect
 
-        column = Column.objects.get(pk=column_id)
         new_ticket = Ticket(
             ticketid=request.data["ticketid"],
             columnid=column,
@@ -114,20 +144,16 @@ def tickets_on_column(request, column_id):
             description=request.data["description"],
             color=request.data["color"] if "color" in request.data else "white",
             size=int(request.data["size"]) if request.data["size"] else 0,
-            order=0,
+            order=get_first_order(Ticket.objects.filter(columnid=column_id), "order"),
             creation_date=timezone.now(),
             cornernote=request.data["cornernote"] if "cornernote" in request.data else "",
         )
 
-        same_column_tickets = Ticket.objects.filter(columnid=column_id)
-        for ticket in same_column_tickets:
-            ticket.order += 1
-            ticket.save()
-
         new_ticket.save()
 
         ticket_creation_event = TicketEvent(
             ticketid=new_ticket,
+            boardid_id=column.boardid_id,
             event_type=TicketEvent.CREATE,
             old_columnid=None,
             new_columnid=column,
@@ -136,29 +162,47 @@ def tickets_on_column(request, column_id):
             title=new_ticket.title,
         )
         ticket_creation_event.save()
+        record_ticket_events([ticket_creation_event])
 
         serializer = TicketSerializer(new_ticket)
+        publish_board_event(request, column.boardid_id, board_events.TICKET_CREATED, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
     if request.method == "GET":
-        query_set = Ticket.objects.filter(columnid=column_id).order_by("order")
+        query_set = TicketSerializer.setup_eager_loading(Ticket.objects.filter(columnid=column_id).order_by("order"))
         serializer = TicketSerializer(query_set, many=True)
         return JsonResponse(serializer.data, safe=False)
 
 
+def create_ticket_events_with_current_scopes(ticket_events):
+    """
+    Saves ticket events in bulk, with the current scopes of their tickets as both old and new scopes
+    """
+    TicketEvent.objects.bulk_create(ticket_events)
+
+    ticket_scopes = Scope.tickets.through.objects.filter(ticket__in=[event.ticketid_id for event in ticket_events])
+    scope_ids_by_ticket = {}
+    for ticket_id, scope_id in ticket_scopes.values_list("ticket", "scope"):
+        scope_ids_by_ticket.setdefault(ticket_id, []).append(scope_id)
+
+    for scopes_field in [TicketEvent.old_scopes, TicketEvent.new_scopes]:
+        scopes_field.through.objects.bulk_create(
+            scopes_field.through(ticketevent_id=event.ticketeventid, scope_id=scope_id)
+            for event in ticket_events
+            for scope_id in scope_ids_by_ticket.get(event.ticketid_id, [])
+        )
+
+
 @api_view(["PUT", "DELETE"])
 def update_ticket(request, ticket_id):
-    if token_incorrect := check_if_acces_token_incorrect_using_other_id(Ticket, ticket_id, request):
+    ticket, token_incorrect = get_item_and_check_access_token(Ticket, ticket_id, request)
+    if token_incorrect:
         return token_incorrect
 
-    try:
-        ticket = Ticket.objects.get(pk=ticket_id)
-    except Ticket.DoesNotExist:
-        raise Http404("Ticket not found")
-
     if request.method == "DELETE":
         ticket_delete_event = TicketEvent(
             ticketid=ticket,
+            boardid_id=ticket.columnid.boardid_id,
             event_type=TicketEvent.DELETE,
             old_columnid=ticket.columnid,
             new_columnid=None,
@@ -168,7 +212,14 @@ def update_ticket(request, ticket_id):
         )
         ticket_delete_event.save()
         ticket_delete_event.old_scopes.set(ticket.scope_set.all())
+        record_ticket_events([ticket_delete_event])
         ticket.delete()
+        publish_board_event(
+            request,
+            ticket.columnid.boardid_id,
+            board_events.TICKET_DELETED,
+            {"ticketid": ticket_id, "columnid": ticket.columnid_id},
+        )
         return JsonResponse({"message": "Ticket deleted successfully"}, status=200)
 
     if request.method == "PUT":
@@ -185,6 +236,7 @@ def update_ticket(request, ticket_id):
         if old_size != ticket.size or old_title != ticket.title:
             ticket_update_event = TicketEvent(
                 ticketid=ticket,
+                boardid_id=ticket.columnid.boardid_id,
                 event_type=TicketEvent.UPDATE,
                 old_columnid=ticket.columnid,
                 new_columnid=ticket.columnid,
@@ -195,24 +247,24 @@ def update_ticket(request, ticket_id):
             ticket_update_event.save()
             ticket_update_event.old_scopes.set(ticket.scope_set.all())
             ticket_update_event.new_scopes.set(ticket.scope_set.all())
+            record_ticket_events([ticket_update_event])
 
         serializer = TicketSerializer(ticket)
+        publish_board_event(request, ticket.columnid.boardid_id, board_events.TICKET_UPDATED, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
 
 @api_view(["PUT", "DELETE"])
 def update_column(request, column_id):
     # Have to check using column id, because board id could basically be anything
-    if token_incorrect := check_if_acces_token_incorrect_using_other_id(Column, column_id, request):
+    column, token_incorrect = get_item_and_check_access_token(Column, column_id, request)
+    if token_incorrect:
         return token_incorrect
 
-    try:
-        column = Column.objects.get(pk=column_id)
-    except Column.DoesNotExist:
-        raise Http404("Column not found")
-
     if request.method == "DELETE":
+        # The events of the column are kept, so the aggregates of the other columns don't change
         column.delete()
+        publish_board_event(request, column.boardid_id, board_events.COLUMN_DELETED, {"columnid": column_id})
         return JsonResponse({"message": "Column deleted successfully"}, status=200)
 
     if request.method == "PUT":
@@ -222,13 +274,15 @@ def update_column(request, column_id):
         column.save()
 
         serializer = ColumnSerializer(column)
+        publish_board_event(request, column.boardid_id, board_events.COLUMN_UPDATED, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
 
 @api_view(["GET", "POST"])
+@board_revision_etag(get_board_revision)
 def users_on_board(request, board_id):
     if request.method == "GET":
-        users = User.objects.filter(boardid=board_id)
+        users = UserSerializer.setup_eager_loading(User.objects.filter(boardid=board_id))
         serializer = UserSerializer(users, many=True)
         return JsonResponse(serializer.data, safe=False)
 
@@ -240,42 +294,61 @@ def users_on_board(request, board_id):
         new_user = User(name=request.data["name"], boardid=board)
         new_user.save()
         serializer = UserSerializer(new_user)
+        publish_board_event(request, board_id, board_events.USER_CREATED, serializer.data)
         return JsonResponse(serializer.data, safe=False)
 
 
 @api_view(["GET", "POST", "DELETE"])
 def users_on_ticket(request, ticket_id):
     if request.method == "GET":
-        users = User.objects.filter(tickets__ticketid=ticket_id)
+        users = UserSerializer.setup_eager_loading(User.objects.filter(tickets__ticketid=ticket_id))
         serializer = UserSerializer(users, many=True)
         return JsonResponse(serializer.data, safe=False)
 
     if request.method == "POST":
-        if token_incorrect := check_if_acces_token_incorrect_using_other_id(Ticket, ticket_id, request):
+        ticket, token_incorrect = get_item_and_check_access_token(Ticket, ticket_id, request)
+        if token_incorrect:
             return token_incorrect
         userid = request.data["userid"]
         user = User.objects.get(pk=userid)
-        user.tickets.add(ticket_id)
+        user.tickets.add(ticket)
+        publish_ticket_users_changed(request, ticket, user)
         return JsonResponse({"message": "User added to ticket successfully"}, status=200)
 
     if request.method == "DELETE":
-        if token_incorrect := check_if_acces_token_incorrect_using_other_id(Ticket, ticket_id, request):
+        ticket, token_incorrect = get_item_and_check_access_token(Ticket, ticket_id, request)
+        if token_incorrect:
             return token_incorrect
         userid = request.data["userid"]
         user = User.objects.get(pk=userid)
-        user.tickets.remove(ticket_id)
+        user.tickets.remove(ticket)
+        publish_ticket_users_changed(request, ticket, user)
         return JsonResponse({"message": "Removed user from ticket succesfully"}, status=200)
 
 
+def publish_ticket_users_changed(request, ticket, user):
+    board_id = ticket.columnid.boardid_id
+    ticket = TicketSerializer.setup_eager_loading(Ticket.objects.filter(pk=ticket.ticketid)).get()
+    publish_board_events(
+        request,
+        board_id,
+        [
+            (board_events.TICKET_UPDATED, TicketSerializer(ticket).data),
+            (board_events.USER_UPDATED, UserSerializer(user).data),
+        ],
+    )
+
+
 @api_view(["DELETE"])
 def update_user(request, user_id):
-    if token_incorrect := check_if_acces_token_incorrect_using_other_id(User, user_id, request):
+    user, token_incorrect = get_item_and_check_access_token(User, user_id, request)
+    if token_incorrect:
         return token_incorrect
 
     if request.method == "DELETE":
-        user = User.objects.get(pk=user_id)
         response = "Successfully deleted user: {}".format(user_id)
         user.delete()
+        publish_board_event(request, user.boardid_id, board_events.USER_DELETED, {"userid": user_id})
         return HttpResponse(response)
 
 
@@ -0,0 +1,211 @@
+import uuid
+from io import StringIO
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+import futuboard.models as md
+from futuboard.board_clone import clone_board
+from futuboard.chart_cache import rebuild_board_aggregates
+from futuboard.template_snapshots import take_snapshot
+from .test_utils import addBoard, addBoardTemplate, fillBoard, resetDB
+
+
+############################################################################################################
+############################################ BOARD CLONE TESTS #############################################
+############################################################################################################
+
+
+def describe_board(board_id):
+    """
+    Returns the contents of a board without its ids, with the relations between rows given by their titles
+    """
+    columns = []
+    for column in md.Column.objects.filter(boardid=board_id).order_by("ordernum"):
+        tickets = []
+        for ticket in md.Ticket.objects.filter(columnid=column).order_by("order", "title"):
+            actions = sorted(
+                (action.title, action.swimlanecolumnid.title, sorted(user.name for user in action.user_set.all()))
+                for action in ticket.action_set.all()
+            )
+            tickets.append(
+                (
+                    ticket.title,
+                    ticket.size,
+                    sorted(user.name for user in ticket.user_set.all()),
+                    sorted(scope.title for scope in ticket.scope_set.all()),
+                    actions,
+                )
+            )
+        swimlanecolumns = sorted(swimlanecolumn.title for swimlanecolumn in column.swimlanecolumn_set.all())
+        columns.append((column.title, column.swimlane, swimlanecolumns, tickets))
+    return columns
+
+
+def get_current_sizes(board_id):
+    return sorted(
+        (aggregate.columnid.title, aggregate.size_change, aggregate.count_change)
+        for aggregate in md.ColumnSizeAggregate.objects.filter(
+            boardid=board_id, time_unit=md.ColumnSizeAggregate.CURRENT
+        )
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("copy_history", [True, False])
+def test_clone_copies_board_with_new_ids(copy_history):
+    """
+    Test that a copy of a board has the same contents with new ids and creation dates, and either the same ticket
+    history or a CREATE event for each ticket
+    """
+    board = addBoard(title="original")
+    fillBoard(board.boardid, 3, 4)
+    rebuild_board_aggregates(board.boardid)
+    original_tickets = md.Ticket.objects.filter(columnid__boardid=board)
+
+    new_board = clone_board(
+        board.boardid, {"title": "copy", "passwordhash": "hash", "has_password": True}, copy_history=copy_history
+    )
+
+    assert new_board.boardid != board.boardid
+    assert (new_board.title, new_board.passwordhash, new_board.has_password) == ("copy", "hash", True)
+    assert new_board.creation_date > board.creation_date
+    assert describe_board(new_board.boardid) == describe_board(board.boardid)
+    assert get_current_sizes(new_board.boardid) == get_current_sizes(board.boardid)
+
+    new_tickets = md.Ticket.objects.filter(columnid__boardid=new_board)
+    assert not set(new_tickets.values_list("ticketid", flat=True)) & set(
+        original_tickets.values_list("ticketid", flat=True)
+    )
+    new_events = md.TicketEvent.objects.filter(ticketid__in=new_tickets)
+    new_ids = [
+        *md.Column.objects.filter(boardid=new_board).values_list("columnid", flat=True),
+        *new_tickets.values_list("ticketid", flat=True),
+        *new_events.values_list("ticketeventid", flat=True),
+    ]
+    assert all(new_id.version == 4 and new_id.variant == uuid.RFC_4122 for new_id in new_ids)
+    assert new_events.count() == 12
+    assert not new_events.exclude(event_type=md.TicketEvent.CREATE).exists()
+    assert not new_events.exclude(new_columnid__boardid=new_board).exists()
+    assert md.TicketEvent.objects.filter(ticketid__in=new_tickets, new_scopes__boardid=new_board).count() == 12
+
+    # The original board is unchanged
+    assert original_tickets.count() == 12
+    assert md.TicketEvent.objects.filter(ticketid__in=original_tickets).count() == 12
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_clone_keeps_history_of_deleted_tickets_and_columns():
+    """
+    Test that a board whose history has events of deleted tickets and columns can be copied, and that those events
+    keep the ids of the deleted rows
+    """
+    board = addBoard()
+    fillBoard(board.boardid, 3, 2)
+    columns = list(md.Column.objects.filter(boardid=board).order_by("ordernum"))
+    deleted_ticket = md.Ticket.objects.filter(columnid=columns[0]).first()
+    md.TicketEvent.objects.create(
+        ticketid=deleted_ticket,
+        boardid=board,
+        event_type=md.TicketEvent.DELETE,
+        old_columnid=columns[0],
+        old_size=deleted_ticket.size,
+        new_size=0,
+    )
+    deleted_ticket_id, deleted_column_id = deleted_ticket.ticketid, columns[2].columnid
+    deleted_ticket.delete()
+    columns[2].delete()
+    rebuild_board_aggregates(board.boardid)
+
+    new_board = clone_board(board.boardid, {"title": "copy"})
+
+    events = md.TicketEvent.objects.filter(boardid=board)
+    new_events = md.TicketEvent.objects.filter(boardid=new_board)
+    assert new_events.count() == events.count() == 7
+    assert new_events.filter(ticketid=deleted_ticket_id).count() == 2
+    assert new_events.filter(new_columnid=deleted_column_id).count() == 2
+    assert not new_events.filter(new_columnid=columns[0].columnid).exists()
+    assert describe_board(new_board.boardid) == describe_board(board.boardid)
+    assert get_current_sizes(new_board.boardid) == get_current_sizes(board.boardid)
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_create_board_from_template_runs_fixed_number_of_queries(django_assert_num_queries):
+    """
+    Test that creating a board from a template's frozen board runs the same number of queries, however big the board is
+    """
+    api_client = APIClient()
+
+    for n_columns, n_tickets in [(1, 1), (4, 6)]:
+        board = addBoard()
+        fillBoard(board.boardid, n_columns, n_tickets)
+        template = addBoardTemplate(board.boardid)
+        take_snapshot(template)
+
+        with django_assert_num_queries(33):
+            response = api_client.post(
+                reverse("create_board_from_template", args=[template.boardtemplateid]),
+                {"title": "From template", "password": ""},
+                format="json",
+            )
+        assert response.status_code == 200
+        new_board_id = response.json()["boardid"]
+        assert response.json()["title"] == "From template"
+        assert md.Ticket.objects.filter(columnid__boardid=new_board_id).count() == n_columns * n_tickets
+
+    resetDB()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("copy_history", [True, False])
+def test_create_board_from_template_without_snapshot(copy_history):
+    """
+    Test that a template created before frozen boards gets one when a board is first created from it, and that the
+    board has the contents of the template's board, with its history or with a CREATE event for each ticket
+    """
+    api_client = APIClient()
+    board = addBoard()
+    fillBoard(board.boardid, 2, 3)
+    rebuild_board_aggregates(board.boardid)
+    template = addBoardTemplate(board.boardid)
+    assert not template.snapshot_boards.exists()
+    md.TicketEvent.objects.filter(ticketid__columnid__boardid=board).update(title="Old title")
+
+    response = api_client.post(
+        reverse("create_board_from_template", args=[template.boardtemplateid]),
+        {"title": "From template", "password": "", "copy_history": str(copy_history).lower()},
+    )
+    assert response.status_code == 200
+    new_board_id = response.json()["boardid"]
+
+    template.refresh_from_db()
+    assert template.snapshot_boards.count() == 1
+    assert template.snapshot_date is not None
+    assert describe_board(new_board_id) == describe_board(board.boardid)
+    assert get_current_sizes(new_board_id) == get_current_sizes(board.boardid)
+    new_events = md.TicketEvent.objects.filter(ticketid__columnid__boardid=new_board_id)
+    assert new_events.count() == 6
+    assert not new_events.exclude(event_type=md.TicketEvent.CREATE).exists()
+    assert new_events.filter(title="Old title").count() == (6 if copy_history else 0)
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_benchmark_clone_command():
+    """
+    Test that the clone benchmark copies a synthetic board both ways, reports the times, and removes the boards
+    """
+    output = StringIO()
+    call_command("benchmark_clone", events=200, tickets=20, stdout=output)
+
+    assert "Export and import" in output.getvalue()
+    assert "In the database" in output.getvalue()
+    assert "From a template snapshot" in output.getvalue()
+    assert not md.Board.objects.exists()
+
+    resetDB()
@@ -0,0 +1,400 @@
+import asyncio
+import json
+import time
+import uuid
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.urls import path, reverse
+from rest_framework.test import APIClient
+from futuboard import board_events
+from futuboard.consumers import BoardConsumer
+from .test_utils import addBoard, addColumn, addTicket, resetDB
+
+
+############################################################################################################
+######################################### BOARD EVENT TESTS ################################################
+############################################################################################################
+
+
+def subscribe_to_board(board_id):
+    channel_layer = get_channel_layer()
+    channel = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)(board_events.get_group_name(board_id), channel)
+    return channel
+
+
+def receive_group_messages(channel):
+    """
+    Returns the group messages sent to the channel so far
+    """
+    channel_layer = get_channel_layer()
+
+    async def receive_all():
+        messages = []
+        while True:
+            try:
+                messages.append(await asyncio.wait_for(channel_layer.receive(channel), timeout=0.1))
+            except asyncio.TimeoutError:
+                return messages
+
+    return async_to_sync(receive_all)()
+
+
+def receive_board_events(channel):
+    """
+    Returns the events sent to the channel so far
+    """
+    return [json.loads(text) for message in receive_group_messages(channel) for text in message["texts"]]
+
+
+@pytest.mark.django_db
+def test_ticket_changes_publish_typed_events(django_capture_on_commit_callbacks):
+    """
+    Test that creating, updating, moving and deleting a ticket publish events with the new ticket row to the board
+    """
+    api_client = APIClient(headers={"X-Client-Id": "client-1"})
+    board = addBoard()
+    column1 = addColumn(board.boardid, uuid.uuid4())
+    column2 = addColumn(board.boardid, uuid.uuid4())
+    channel = subscribe_to_board(board.boardid)
+    ticketid = uuid.uuid4()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        data = {"ticketid": str(ticketid), "title": "ticket", "description": "", "size": 1}
+        api_client.post(
+            reverse("tickets_on_column", args=[column1.columnid]),
+            data=json.dumps(data),
+            content_type="application/json",
+        )
+        api_client.put(
+            reverse("update_ticket", args=[ticketid]), data=json.dumps({"size": 5}), content_type="application/json"
+        )
+        api_client.put(
+            reverse("tickets_on_column", args=[column2.columnid]),
+            data=json.dumps([{"ticketid": str(ticketid)}]),
+            content_type="application/json",
+        )
+        api_client.delete(reverse("update_ticket", args=[ticketid]))
+
+    events = receive_board_events(channel)
+    assert [event["type"] for event in events] == [
+        board_events.TICKET_CREATED,
+        board_events.TICKET_UPDATED,
+        board_events.TICKET_MOVED,
+        board_events.TICKET_DELETED,
+    ]
+    assert all(event["boardid"] == str(board.boardid) for event in events)
+    assert all(event["origin"] == "client-1" for event in events)
+
+    created, updated, moved, deleted = [event["data"] for event in events]
+    assert created["ticketid"] == str(ticketid)
+    assert created["columnid"] == str(column1.columnid)
+    assert created["title"] == "ticket"
+    assert updated["size"] == 5
+    assert moved["columnid"] == str(column2.columnid)
+    assert moved["old_columnid"] == str(column1.columnid)
+    assert moved["users"] == [] and moved["scopes"] == []
+    assert deleted == {"ticketid": str(ticketid), "columnid": str(column2.columnid)}
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_reordering_publishes_only_moved_tickets(django_capture_on_commit_callbacks):
+    """
+    Test that reordering a column publishes a ticket_moved event only for the tickets that got a new order value
+    """
+    api_client = APIClient()
+    board = addBoard()
+    column = addColumn(board.boardid, uuid.uuid4())
+    tickets = [addTicket(column.columnid, uuid.uuid4(), title=f"ticket {i}") for i in range(4)]
+    for i, ticket in enumerate(tickets):
+        ticket.order = i * 1024
+        ticket.save()
+    channel = subscribe_to_board(board.boardid)
+
+    # Move the last ticket to the top
+    new_order = [tickets[3], tickets[0], tickets[1], tickets[2]]
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.put(
+            reverse("tickets_on_column", args=[column.columnid]),
+            data=json.dumps([{"ticketid": str(ticket.ticketid)} for ticket in new_order]),
+            content_type="application/json",
+        )
+
+    events = receive_board_events(channel)
+    assert len(events) == 1
+    assert events[0]["type"] == board_events.TICKET_MOVED
+    assert events[0]["data"]["ticketid"] == str(tickets[3].ticketid)
+    assert events[0]["data"]["order"] < 0
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_moved_tickets_are_sent_in_one_group_message(django_capture_on_commit_callbacks):
+    """
+    Test that moving several tickets to another column sends all ticket_moved events in one group message
+    """
+    api_client = APIClient()
+    board = addBoard()
+    column1 = addColumn(board.boardid, uuid.uuid4())
+    column2 = addColumn(board.boardid, uuid.uuid4())
+    tickets = [addTicket(column1.columnid, uuid.uuid4(), title=f"ticket {i}") for i in range(3)]
+    channel = subscribe_to_board(board.boardid)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.put(
+            reverse("tickets_on_column", args=[column2.columnid]),
+            data=json.dumps([{"ticketid": str(ticket.ticketid)} for ticket in tickets]),
+            content_type="application/json",
+        )
+
+    messages = receive_group_messages(channel)
+    assert len(messages) == 1
+    events = [json.loads(text) for text in messages[0]["texts"]]
+    assert [event["type"] for event in events] == [board_events.TICKET_MOVED] * 3
+    assert {event["data"]["ticketid"] for event in events} == {str(ticket.ticketid) for ticket in tickets}
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_events_are_not_published_before_commit(django_capture_on_commit_callbacks):
+    """
+    Test that events are sent only when the transaction that made the change is committed
+    """
+    api_client = APIClient()
+    board = addBoard()
+    channel = subscribe_to_board(board.boardid)
+
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        api_client.put(
+            reverse("update_board_title", args=[board.boardid]),
+            data=json.dumps({"title": "new title"}),
+            content_type="application/json",
+        )
+    assert len(callbacks) == 1
+    assert receive_board_events(channel) == []
+
+    # A new channel, because the first one is tied to the event loop that waited on it
+    channel = subscribe_to_board(board.boardid)
+    callbacks[0]()
+    events = receive_board_events(channel)
+    assert [event["type"] for event in events] == [board_events.BOARD_UPDATED]
+    assert events[0]["data"]["title"] == "new title"
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_events_of_the_same_object_are_coalesced(django_capture_on_commit_callbacks, settings):
+    """
+    Test that the events of a ticket published within the coalescing window are sent as one event with the final
+    state of the ticket, and that the first column of a moved ticket is kept
+    """
+    # Long enough that only the explicit flush sends the events
+    settings.BOARD_EVENT_COALESCE_WINDOW = 60
+    api_client = APIClient(headers={"X-Client-Id": "client-1"})
+    other_client = APIClient(headers={"X-Client-Id": "client-2"})
+    board = addBoard()
+    column1 = addColumn(board.boardid, uuid.uuid4())
+    column2 = addColumn(board.boardid, uuid.uuid4())
+    ticket = addTicket(column1.columnid, uuid.uuid4())
+    channel = subscribe_to_board(board.boardid)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.put(
+            reverse("update_ticket", args=[ticket.ticketid]),
+            data=json.dumps({"size": 2}),
+            content_type="application/json",
+        )
+        api_client.put(
+            reverse("tickets_on_column", args=[column2.columnid]),
+            data=json.dumps([{"ticketid": str(ticket.ticketid)}]),
+            content_type="application/json",
+        )
+        api_client.put(
+            reverse("update_ticket", args=[ticket.ticketid]),
+            data=json.dumps({"size": 3}),
+            content_type="application/json",
+        )
+        # Changes of other clients are not merged, the first client would skip them as its own
+        other_client.put(
+            reverse("update_ticket", args=[ticket.ticketid]),
+            data=json.dumps({"size": 4}),
+            content_type="application/json",
+        )
+    board_events.board_event_buffer.flush(board.boardid)
+
+    messages = receive_group_messages(channel)
+    assert len(messages) == 1
+    events = [json.loads(text) for text in messages[0]["texts"]]
+    assert [(event["type"], event["origin"]) for event in events] == [
+        (board_events.TICKET_MOVED, "client-1"),
+        (board_events.TICKET_UPDATED, "client-2"),
+    ]
+    assert events[0]["data"]["size"] == 3
+    assert events[0]["data"]["columnid"] == str(column2.columnid)
+    assert events[0]["data"]["old_columnid"] == str(column1.columnid)
+
+    metrics = board_events.get_board_event_metrics(board.boardid)
+    assert metrics["events_published"] == 4
+    assert metrics["events_coalesced"] == 2
+    assert metrics["messages_sent"] == 1
+
+    resetDB()
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+async def test_events_are_sent_after_the_coalescing_window(settings):
+    """
+    Test that the events collected during the coalescing window reach the clients of the board right after the window
+    without an explicit flush, when they are published by views running under the server's event loop
+    """
+    settings.BOARD_EVENT_COALESCE_WINDOW = 0.05
+    api_client = APIClient()
+    board = await sync_to_async(addBoard)()
+    application = URLRouter([path("board/<uuid:board_id>", BoardConsumer.as_asgi())])
+    communicator = WebsocketCommunicator(application, f"board/{board.boardid}")
+    assert (await communicator.connect())[0]
+
+    def update_board_titles():
+        # Sync views are run in a thread of the server, like this function
+        for title in ["first", "second"]:
+            api_client.put(
+                reverse("update_board_title", args=[board.boardid]),
+                data=json.dumps({"title": title}),
+                content_type="application/json",
+            )
+
+    try:
+        start = time.perf_counter()
+        await sync_to_async(update_board_titles)()
+        event = json.loads(await communicator.receive_from(timeout=1))
+        elapsed = time.perf_counter() - start
+        assert await communicator.receive_nothing(timeout=0.1)
+    finally:
+        await communicator.disconnect()
+
+    assert event["type"] == board_events.BOARD_UPDATED
+    assert event["data"]["title"] == "second"
+    assert elapsed < 0.5
+
+
+@pytest.mark.django_db
+def test_board_event_metrics():
+    """
+    Test that the metrics endpoint returns the event counters of the board
+    """
+    api_client = APIClient()
+    board = addBoard()
+    board_events.count_board_event_metric(board.boardid, "events_published", 3)
+    board_events.count_board_event_metric(board.boardid, "frames_sent", 6)
+
+    response = api_client.get(reverse("board_event_metrics", args=[board.boardid]))
+    assert response.status_code == 200
+    assert response.json() == {
+        "events_published": 3,
+        "events_coalesced": 0,
+        "messages_sent": 0,
+        "frames_sent": 6,
+        "frames_dropped": 0,
+        "resyncs_sent": 0,
+    }
+
+    response = api_client.get(reverse("board_event_metrics", args=[uuid.uuid4()]))
+    assert response.status_code == 404
+
+    resetDB()
+
+
+@pytest.mark.asyncio
+async def test_consumer_sends_events_and_ignores_client_messages():
+    """
+    Test that the consumer sends the published events of its board to the client as they are, and doesn't relay
+    messages sent by clients to the other clients of the board
+    """
+    application = URLRouter([path("board/<uuid:board_id>", BoardConsumer.as_asgi())])
+    board_id = uuid.uuid4()
+    sender = WebsocketCommunicator(application, f"board/{board_id}")
+    receiver = WebsocketCommunicator(application, f"board/{board_id}")
+    assert (await sender.connect())[0]
+    assert (await receiver.connect())[0]
+
+    await sender.send_to(text_data=json.dumps({"clientId": "client-1", "tags": ["Columns"]}))
+    assert await receiver.receive_nothing(timeout=0.1)
+
+    texts = [
+        json.dumps({"type": board_events.COLUMN_DELETED, "data": {"columnid": "1"}}),
+        json.dumps({"type": board_events.COLUMN_DELETED, "data": {"columnid": "2"}}),
+    ]
+    await get_channel_layer().group_send(
+        board_events.get_group_name(board_id), {"type": "board_event", "texts": texts}
+    )
+    # Every event of a group message is sent as its own frame
+    for communicator in [receiver, sender]:
+        assert [await communicator.receive_from(), await communicator.receive_from()] == texts
+    assert board_events.get_board_event_metrics(board_id)["frames_sent"] == 4
+
+    await sender.disconnect()
+    await receiver.disconnect()
+
+
+class SlowBoardConsumer(BoardConsumer):
+    """
+    A consumer that takes a while to send every frame. Under a real server, send doesn't wait for the client, so this
+    stands for a connection whose sending task falls behind, not for a client on a slow network.
+    """
+
+    async def send(self, *args, **kwargs):
+        await asyncio.sleep(0.01)
+        await super().send(*args, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_slow_consumers_get_resync_instead_of_backlog(settings):
+    """
+    Test that a connection that can't send the events as fast as they arrive gets a resync frame instead of the events
+    it fell behind on, while the other clients of the board get every event
+    """
+    settings.BOARD_EVENT_QUEUE_SIZE = 20
+    board_id = uuid.uuid4()
+    fast_application = URLRouter([path("board/<uuid:board_id>", BoardConsumer.as_asgi())])
+    slow_application = URLRouter([path("board/<uuid:board_id>", SlowBoardConsumer.as_asgi())])
+    fast_clients = [WebsocketCommunicator(fast_application, f"board/{board_id}") for _ in range(3)]
+    slow_clients = [WebsocketCommunicator(slow_application, f"board/{board_id}") for _ in range(3)]
+    for communicator in fast_clients + slow_clients:
+        assert (await communicator.connect())[0]
+
+    texts = [json.dumps({"type": board_events.TICKET_UPDATED, "data": {"n": i}}) for i in range(500)]
+    for i in range(0, len(texts), 5):
+        await get_channel_layer().group_send(
+            board_events.get_group_name(board_id), {"type": "board_event", "texts": texts[i : i + 5]}
+        )
+        await asyncio.sleep(0.001)
+
+    for communicator in fast_clients:
+        assert [await communicator.receive_from() for _ in texts] == texts
+
+    for communicator in slow_clients:
+        frames = []
+        while not await communicator.receive_nothing(timeout=0.1):
+            frames.append(json.loads(await communicator.receive_from()))
+        assert board_events.RESYNC in [frame["type"] for frame in frames]
+        assert len(frames) < len(texts) / 2
+        # Whatever was not dropped is sent in order
+        numbers = [frame["data"]["n"] for frame in frames if frame["type"] == board_events.TICKET_UPDATED]
+        assert numbers == sorted(numbers)
+
+    metrics = board_events.get_board_event_metrics(board_id)
+    assert metrics["resyncs_sent"] >= len(slow_clients)
+    assert metrics["frames_dropped"] > 0
+    assert metrics["frames_sent"] + metrics["frames_dropped"] == len(texts) * 6 + metrics["resyncs_sent"]
+
+    for communicator in fast_clients + slow_clients:
+        await communicator.disconnect()
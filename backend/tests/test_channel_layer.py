@@ -0,0 +1,117 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+import pytest
+from fakeredis import TcpFakeServer
+from backend.common_settings import get_channel_layers
+
+
+############################################################################################################
+###################################### SHARED CHANNEL LAYER TESTS ##########################################
+############################################################################################################
+
+PROCESS_COUNT = 3
+CLIENTS_PER_PROCESS = 2
+MESSAGE_COUNT = 50
+EVENTS_PER_MESSAGE = 10
+
+
+@pytest.fixture
+def broker_url():
+    """
+    Runs a Redis compatible broker in a thread of the test process, and returns its url
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def run_board_consumers(board_id, expected_count, ready, results):
+    """
+    Runs in a separate process, like a daphne worker. Connects clients to the board and reports the frames they got.
+    The process gets the broker url from the CHANNEL_LAYER_URL environment variable, like the backend does.
+    """
+    import django
+
+    django.setup()
+    from channels.routing import URLRouter
+    from channels.testing import WebsocketCommunicator
+    from django.urls import path
+    from futuboard.consumers import BoardConsumer
+
+    async def receive_frames():
+        application = URLRouter([path("board/<uuid:board_id>", BoardConsumer.as_asgi())])
+        communicators = [WebsocketCommunicator(application, f"board/{board_id}") for _ in range(CLIENTS_PER_PROCESS)]
+        for communicator in communicators:
+            await communicator.connect()
+        # Give the broker time to register the subscriptions
+        await asyncio.sleep(0.5)
+        ready.set()
+
+        frames = []
+        for communicator in communicators:
+            frames.append([await communicator.receive_from(timeout=30) for _ in range(expected_count)])
+        for communicator in communicators:
+            await communicator.disconnect()
+        return frames
+
+    results.put((os.getpid(), asyncio.run(receive_frames())))
+
+
+def test_events_are_delivered_to_consumers_in_every_process(broker_url, settings, monkeypatch):
+    """
+    Test that events sent from one process reach the consumers of the board in every other process through the
+    shared broker, in order and exactly once per client
+    """
+    # Imported here, as the consumer processes import this module before they have set up Django
+    from futuboard import board_events
+
+    monkeypatch.setenv("CHANNEL_LAYER_URL", broker_url)
+    settings.CHANNEL_LAYERS = get_channel_layers(broker_url)
+    board_id = uuid.uuid4()
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    readies = [context.Event() for _ in range(PROCESS_COUNT)]
+    expected_count = MESSAGE_COUNT * EVENTS_PER_MESSAGE
+    processes = [
+        context.Process(target=run_board_consumers, args=(board_id, expected_count, ready, results))
+        for ready in readies
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        for ready in readies:
+            assert ready.wait(timeout=60)
+
+        texts = [json.dumps({"type": board_events.TICKET_UPDATED, "data": {"n": i}}) for i in range(expected_count)]
+        start = time.perf_counter()
+        for i in range(MESSAGE_COUNT):
+            board_events.send_to_board(board_id, texts[i * EVENTS_PER_MESSAGE : (i + 1) * EVENTS_PER_MESSAGE])
+        received = [results.get(timeout=60) for _ in processes]
+        elapsed = time.perf_counter() - start
+    finally:
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
+
+    assert len({pid for pid, _ in received}) == PROCESS_COUNT
+    for _, frames in received:
+        assert frames == [texts] * CLIENTS_PER_PROCESS
+
+    # One publish per group message is fanned out to every client. A lenient floor that still catches e.g. a
+    # broker round trip per client and event.
+    frames_per_second = PROCESS_COUNT * CLIENTS_PER_PROCESS * expected_count / elapsed
+    assert frames_per_second > 500
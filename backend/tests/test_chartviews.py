@@ -1,10 +1,19 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+import random
 import uuid
+from unittest.mock import patch
 from freezegun import freeze_time
 import pytest
 from rest_framework.test import APIClient
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+import futuboard.models as md
+from futuboard.chart_cache import get_column_sizes_from_aggregates, rebuild_board_aggregates, record_ticket_events
+from futuboard.views.chartViews import get_column_sizes_at_times
+from futuboard.time_buckets import DATE_TIME_FORMAT, get_time_delta, round_time
 from .test_utils import addBoard, addColumn, resetDB
 
 
@@ -134,6 +143,7 @@ def test_ticket_create_event():
     assert data[0] == {
         "ticketeventid": data[0]["ticketeventid"],
         "ticketid": ticket["ticketid"],
+        "boardid": str(boardid),
         "event_time": creation_time.isoformat() + "Z",
         "event_type": "CREATE",
         "old_columnid": None,
@@ -172,6 +182,7 @@ def test_ticket_move_event():
     assert data[1] == {
         "ticketeventid": data[1]["ticketeventid"],
         "ticketid": ticket["ticketid"],
+        "boardid": str(boardid),
         "event_time": move_time.isoformat() + "Z",
         "event_type": "MOVE",
         "old_columnid": str(column_id_1),
@@ -214,6 +225,7 @@ def test_ticket_edit_event():
     assert data[1] == {
         "ticketeventid": data[1]["ticketeventid"],
         "ticketid": ticket["ticketid"],
+        "boardid": str(boardid),
         "event_time": edit_time.isoformat() + "Z",
         "event_type": "UPDATE",
         "old_columnid": str(column_id),
@@ -252,6 +264,7 @@ def test_ticket_delete_event():
     assert data[1] == {
         "ticketeventid": data[1]["ticketeventid"],
         "ticketid": ticket["ticketid"],
+        "boardid": str(boardid),
         "event_time": delete_time.isoformat() + "Z",
         "event_type": "DELETE",
         "old_columnid": str(column_id),
@@ -533,3 +546,373 @@ def test_burn_up():
     ]
 
     resetDB()
+
+
+def create_board_with_random_events(seed, n_events=40, max_hours_between_events=72):
+    """
+    Creates a board with three columns and random ticket creations, moves, edits, deletions and scope changes
+    """
+    rng = random.Random(seed)
+    api_client = APIClient()
+
+    boardid = addBoard().boardid
+    column_ids = [addColumn(boardid, uuid.uuid4(), "Column " + str(i)).columnid for i in range(3)]
+    scope_id = api_client.post(reverse("scopes_on_board", args=[boardid]), {"title": "scope"}).json()["scopeid"]
+
+    time = datetime(2024, 1, 1, 8, 30)
+    tickets = []
+    for _ in range(n_events):
+        time += timedelta(minutes=rng.randint(1, max_hours_between_events * 60))
+        action = rng.choice(["create", "create", "move", "edit", "delete", "scope"]) if tickets else "create"
+
+        if action == "create":
+            tickets.append(create_ticket_at_time(boardid, rng.choice(column_ids), time, size=rng.randint(0, 8)))
+        elif action == "move":
+            move_ticket_at_time(boardid, rng.choice(column_ids), time, rng.choice(tickets)["ticketid"])
+        elif action == "edit":
+            ticket = rng.choice(tickets).copy()
+            ticket["size"] = rng.randint(0, 8)
+            edit_ticket_at_time(None, time, ticket)
+        elif action == "delete":
+            ticket = tickets.pop(rng.randrange(len(tickets)))
+            delete_ticket_at_time(None, time, ticket["ticketid"])
+        else:
+            freezer = freeze_time(time)
+            freezer.start()
+            api_client.post(
+                reverse("tickets_in_scope", args=[scope_id]), {"ticketid": rng.choice(tickets)["ticketid"]}
+            )
+            freezer.stop()
+
+    return boardid
+
+
+@freeze_time("2024-06-01")
+@pytest.mark.django_db
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_cumulative_flow_aggregates_match_event_replay(seed):
+    """
+    Test that cumulative flow computed from the aggregates is the same as when replaying the events
+    """
+    boardid = create_board_with_random_events(seed)
+    columns = md.Column.objects.filter(boardid=boardid).order_by("ordernum")
+
+    ranges = [
+        (None, None),
+        ("2024-01-20", None),
+        ("2023-12-01", "2024-02-15"),
+        ("2024-02-03", "2024-03-01"),
+        ("2024-03-01", "2024-02-01"),
+    ]
+    for time_unit in ["day", "week", "month", "year"]:
+        for count_unit in ["size", "cards"]:
+            for start_time, end_time in ranges:
+                replayed = get_column_sizes_at_times(columns, time_unit, count_unit, start_time, end_time)
+                aggregated = get_column_sizes_from_aggregates(columns, time_unit, count_unit, start_time, end_time)
+                assert aggregated == replayed, (time_unit, count_unit, start_time, end_time)
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_rebuilt_aggregates_match_incremental_aggregates():
+    """
+    Test that aggregates updated event by event are the same as aggregates computed from the whole history
+    """
+    boardid = create_board_with_random_events(4)
+
+    def get_aggregates():
+        return sorted(
+            md.ColumnSizeAggregate.objects.filter(boardid=boardid).values_list(
+                "columnid", "time_unit", "bucket", "size_change", "count_change"
+            ),
+            key=str,
+        )
+
+    incremental_aggregates = get_aggregates()
+    rebuild_board_aggregates(boardid)
+    assert get_aggregates() == incremental_aggregates
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_concurrent_writers_create_each_aggregate_once():
+    """
+    Test that when another writer creates the aggregates of the same buckets between the update that didn't find them
+    and the insert, the changes of both writers are added to the same rows
+    """
+    board = addBoard()
+    column = addColumn(board.boardid, uuid.uuid4())
+    events = [
+        md.TicketEvent(
+            ticketid_id=uuid.uuid4(),
+            boardid=board,
+            event_type=md.TicketEvent.CREATE,
+            new_columnid=column,
+            old_size=0,
+            new_size=size,
+        )
+        for size in [2, 3]
+    ]
+    update = QuerySet.update
+    other_writers = [events[1]]
+
+    def update_before_other_writer(queryset, **kwargs):
+        updated = update(queryset, **kwargs)
+        # The other writer runs to the end right after the first writer didn't find the first row
+        if not updated and other_writers:
+            record_ticket_events([other_writers.pop()])
+        return updated
+
+    with patch.object(QuerySet, "update", update_before_other_writer):
+        record_ticket_events([events[0]])
+
+    aggregates = md.ColumnSizeAggregate.objects.filter(columnid=column)
+    assert aggregates.count() == 4
+    assert set(aggregates.values_list("size_change", "count_change")) == {(5, 2)}
+    current = aggregates.get(time_unit=md.ColumnSizeAggregate.CURRENT)
+    assert current.bucket == md.ColumnSizeAggregate.CURRENT_BUCKET
+
+    resetDB()
+
+
+@freeze_time("2024-01-04")
+@pytest.mark.django_db
+def test_cumulative_flow_does_not_read_events():
+    """
+    Test that cumulative flow with a time unit of a day or longer is read from the aggregates, not the event table
+    """
+    api_client = APIClient()
+    boardid = create_board_with_events()
+
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.get(reverse("cumulative_flow", args=[boardid]) + "?time_unit=week")
+    assert response.status_code == 200
+    assert not any('"TicketEvent"' in query["sql"] for query in context.captured_queries)
+
+    resetDB()
+
+
+@freeze_time("2024-01-04")
+@pytest.mark.django_db
+def test_cumulative_flow_after_deleting_column():
+    """
+    Test that deleting a column keeps the moves out of it in the other columns' cumulative flow, and in the events of
+    the board
+    """
+    api_client = APIClient()
+    boardid, column_id_1, column_id_2 = create_board_and_columns()
+    ticket = create_ticket_at_time(boardid, column_id_1, datetime(2024, 1, 1))
+    move_ticket_at_time(boardid, column_id_2, datetime(2024, 1, 2), ticket["ticketid"])
+
+    api_client.delete(reverse("update_column", args=[column_id_1]))
+
+    columns = md.Column.objects.filter(boardid=boardid)
+    column_sizes = get_column_sizes_at_times(columns, "day", "size")
+    assert get_column_sizes_from_aggregates(columns, "day", "size") == column_sizes
+    assert column_sizes[-1] == ("2024-01-04T00:00:00", {str(column_id_2): 5})
+
+    events = api_client.get(reverse("events", args=[boardid])).json()
+    assert [(event["event_type"], event["old_columnid"]) for event in events] == [
+        ("CREATE", None),
+        ("MOVE", str(column_id_1)),
+    ]
+
+    resetDB()
+
+
+def reference_get_column_sizes_at_times(
+    columns, time_unit, count_unit, start_time=None, end_time=None, scope_id=None, tickets=None
+):
+    """
+    The original, bucket by bucket implementation of get_column_sizes_at_times, kept to check the numpy version against
+    """
+    event_in_columns = Q(old_columnid__in=columns) | Q(new_columnid__in=columns)
+    event_in_scope = Q(old_scopes__in=[scope_id]) | Q(new_scopes__in=[scope_id]) if scope_id else Q()
+    event_has_ticket = Q(ticketid__in=tickets) if tickets else Q()
+
+    ticket_events = (
+        md.TicketEvent.objects.filter(event_in_columns & event_in_scope & event_has_ticket)
+        .order_by("event_time")
+        .distinct()
+    )
+
+    if len(ticket_events) == 0:
+        return []
+
+    earliest_event_time = round_time(ticket_events[0].event_time.replace(tzinfo=None), time_unit)
+
+    if start_time is None:
+        start_time = earliest_event_time
+    else:
+        start_time = datetime.fromisoformat(start_time)
+
+    start_time = round_time(start_time, time_unit)
+
+    if end_time is None:
+        end_time = datetime.now()
+    else:
+        end_time = datetime.fromisoformat(end_time)
+
+    end_time = round_time(end_time, time_unit)
+
+    event_dict = {}
+
+    for event in ticket_events:
+        event_time = round_time(event.event_time, time_unit)
+        timestamp = event_time.strftime(DATE_TIME_FORMAT)
+        if event_dict.get(timestamp) is None:
+            event_dict[timestamp] = [event]
+        else:
+            event_dict[timestamp].append(event)
+
+    empty_column_dict = {}
+
+    for column in columns:
+        empty_column_dict[str(column.columnid)] = 0
+
+    final_data = []
+
+    def setSize(column_sizes, columnid, change):
+        if column_sizes.get(str(columnid)) is not None:
+            column_sizes[str(columnid)] += change
+
+    time = start_time
+    can_have_events_before_start_time = earliest_event_time < start_time
+    if can_have_events_before_start_time:
+        # Have to start from the earliest event time, not the start time, because otherwise we miss events and the result is wrong
+        time = earliest_event_time
+
+    time_delta = get_time_delta(time_unit)
+
+    prev_column_sizes = None
+    while time <= end_time:
+        timestamp = time.strftime(DATE_TIME_FORMAT)
+        column_sizes = prev_column_sizes or empty_column_dict.copy()
+
+        events_at_time = event_dict.get(timestamp)
+
+        if events_at_time is not None:
+            for event in events_at_time:
+                event_old_size = event.old_size if count_unit == "size" else 1
+                event_new_size = event.new_size if count_unit == "size" else 1
+
+                if event.event_type == md.TicketEvent.CREATE:
+                    setSize(column_sizes, event.new_columnid.columnid, event_new_size)
+                elif event.event_type == md.TicketEvent.DELETE:
+                    setSize(column_sizes, event.old_columnid.columnid, -event_old_size)
+                elif event.event_type == md.TicketEvent.MOVE:
+                    setSize(column_sizes, event.old_columnid.columnid, -event_old_size)
+                    setSize(column_sizes, event.new_columnid.columnid, event_new_size)
+                elif event.event_type == md.TicketEvent.UPDATE:
+                    setSize(column_sizes, event.new_columnid.columnid, event_new_size - event_old_size)
+                elif event.event_type == md.TicketEvent.SCOPE_CHANGE:
+                    is_in_old_scopes = event.old_scopes.filter(scopeid=scope_id).exists()
+                    is_in_new_scopes = event.new_scopes.filter(scopeid=scope_id).exists()
+                    if is_in_old_scopes and not is_in_new_scopes:
+                        # Scope was removed from ticket
+                        setSize(column_sizes, event.old_columnid.columnid, -event_old_size)
+                    elif not is_in_old_scopes and is_in_new_scopes:
+                        # Scope was added to ticket
+                        setSize(column_sizes, event.new_columnid.columnid, event_new_size)
+
+        prev_column_sizes = column_sizes.copy()
+        time += time_delta
+        final_data.append((timestamp, column_sizes))
+
+    if can_have_events_before_start_time:
+        # Only keep events after/on the start time
+        final_data = [item for item in final_data if datetime.fromisoformat(item[0]) >= start_time]
+
+    return final_data
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("seed", [5, 6, 7])
+def test_column_sizes_match_reference_implementation(seed):
+    """
+    Test that get_column_sizes_at_times gives the same results as the original implementation, also for scopes
+    """
+    boardid = create_board_with_random_events(seed, n_events=30, max_hours_between_events=2)
+    columns = md.Column.objects.filter(boardid=boardid).order_by("ordernum")
+    scope = md.Scope.objects.get(boardid=boardid)
+    first_event_time = md.TicketEvent.objects.order_by("event_time").first().event_time.replace(tzinfo=None)
+    last_event_time = md.TicketEvent.objects.order_by("event_time").last().event_time.replace(tzinfo=None)
+    middle_time = (first_event_time + (last_event_time - first_event_time) / 2).isoformat()
+
+    ranges = [
+        (None, last_event_time.isoformat()),
+        (middle_time, None),
+        ("2023-12-31", middle_time),
+        (middle_time, first_event_time.isoformat()),
+    ]
+    filters = [{}, {"scope_id": scope.scopeid}, {"tickets": scope.tickets.all()}]
+
+    freezer = freeze_time(last_event_time + timedelta(hours=3))
+    freezer.start()
+    for time_unit in ["minute", "hour", "day", "week", "month", "year"]:
+        for count_unit in ["size", "cards"]:
+            for start_time, end_time in ranges:
+                for extra_filters in filters:
+                    args = (columns, time_unit, count_unit, start_time, end_time)
+                    expected = reference_get_column_sizes_at_times(*args, **extra_filters)
+                    assert get_column_sizes_at_times(*args, **extra_filters) == expected, (args, extra_filters)
+    freezer.stop()
+
+    resetDB()
+
+
+def create_scope_history(boardid, column_id, done_column_id, n_tickets):
+    """
+    Creates a scope with n_tickets tickets that are added to and removed from it a few times, and moved to a done column
+    """
+    api_client = APIClient()
+    scope_id = api_client.post(reverse("scopes_on_board", args=[boardid]), {"title": "test scope"}).json()["scopeid"]
+    api_client.post(
+        reverse("set_scope_done_columns", args=[scope_id]),
+        json.dumps({"done_columns": [str(done_column_id)]}),
+        content_type="application/json",
+    )
+
+    for i in range(n_tickets):
+        ticket = create_ticket_at_time(boardid, column_id, datetime(2024, 1, 1))
+        for day in range(2, 5):
+            freezer = freeze_time(datetime(2024, 1, day, i))
+            freezer.start()
+            api_client.post(reverse("tickets_in_scope", args=[scope_id]), {"ticketid": ticket["ticketid"]})
+            if day < 4:
+                api_client.delete(reverse("tickets_in_scope", args=[scope_id]), {"ticketid": ticket["ticketid"]})
+            freezer.stop()
+        move_ticket_at_time(boardid, done_column_id, datetime(2024, 1, 5), ticket["ticketid"])
+
+    return scope_id
+
+
+@freeze_time("2024-01-06")
+@pytest.mark.django_db
+def test_burn_up_query_count_does_not_depend_on_history():
+    """
+    Test that burn up runs the same number of queries for short and long scope histories
+    """
+    api_client = APIClient()
+    query_counts = []
+
+    for n_tickets in [1, 10]:
+        boardid, column_id, done_column_id = create_board_and_columns()
+        scope_id = create_scope_history(boardid, column_id, done_column_id, n_tickets)
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(reverse("burn_up", args=[boardid, scope_id]))
+        assert response.status_code == 200
+        assert response.json()["data"][-1] == {
+            "name": "2024-01-06T00:00:00",
+            "scope": 5 * n_tickets,
+            "done": 5 * n_tickets,
+        }
+        query_counts.append(len(context.captured_queries))
+
+    assert query_counts[0] == query_counts[1]
+    assert query_counts[0] <= 6
+
+    resetDB()
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from freezegun import freeze_time
+import pytest
+from django.core.management import call_command
+import futuboard.models as md
+from futuboard.event_archive import compact_board_events
+from futuboard.views.chartViews import get_column_sizes_at_times
+from .test_chartviews import create_board_with_random_events
+from .test_utils import resetDB
+
+
+############################################################################################################
+########################################### EVENT ARCHIVE TESTS ############################################
+############################################################################################################
+
+
+def get_charts_from(boardid, start_time):
+    """
+    Returns the column sizes of the board, its scope and the tickets of its scope from the start time onwards
+    """
+    columns = md.Column.objects.filter(boardid=boardid).order_by("ordernum")
+    scope = md.Scope.objects.get(boardid=boardid)
+    filters = [{}, {"scope_id": scope.scopeid}, {"tickets": scope.tickets.all()}]
+    return [
+        get_column_sizes_at_times(columns, time_unit, count_unit, start_time.isoformat(), **extra_filters)
+        for time_unit in ["hour", "day", "week"]
+        for count_unit in ["size", "cards"]
+        for extra_filters in filters
+    ]
+
+
+def get_aggregates(boardid):
+    return sorted(
+        md.ColumnSizeAggregate.objects.filter(boardid=boardid).values_list(
+            "columnid", "time_unit", "bucket", "size_change", "count_change"
+        ),
+        key=str,
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("seed", [1, 2])
+def test_compaction_keeps_charts_from_cutoff_time(seed):
+    """
+    Test that compacting a board's history archives the events before the cutoff time, and that the charts from the
+    cutoff time onwards stay the same, also when the history is compacted again later
+    """
+    boardid = create_board_with_random_events(seed, n_events=60)
+    events = md.TicketEvent.objects.filter(boardid=boardid)
+    first_event_time = events.order_by("event_time").first().event_time.replace(tzinfo=None)
+    last_event_time = events.order_by("event_time").last().event_time.replace(tzinfo=None)
+    cutoff_times = [
+        datetime.combine((first_event_time + (last_event_time - first_event_time) * part).date(), datetime.min.time())
+        for part in [0.4, 0.7]
+    ]
+    n_events = events.count()
+    aggregates = get_aggregates(boardid)
+
+    freezer = freeze_time(last_event_time + timedelta(hours=3))
+    freezer.start()
+    charts = get_charts_from(boardid, cutoff_times[-1])
+
+    n_archived = 0
+    for cutoff_time in cutoff_times:
+        n_old_events = events.filter(event_time__lt=cutoff_time.replace(tzinfo=timezone.utc)).exclude(
+            event_type=md.TicketEvent.SNAPSHOT
+        )
+        expected_archived = n_old_events.count()
+        archived, snapshots = compact_board_events(boardid, cutoff_time.replace(tzinfo=timezone.utc))
+        n_archived += archived
+
+        assert archived == expected_archived
+        assert not events.filter(event_time__lt=cutoff_time.replace(tzinfo=timezone.utc)).exists()
+        assert events.filter(event_type=md.TicketEvent.SNAPSHOT).count() == snapshots
+        assert get_charts_from(boardid, cutoff_times[-1]) == charts
+
+    assert md.ArchivedTicketEvent.objects.filter(boardid=boardid).count() == n_archived
+    assert not md.ArchivedTicketEvent.objects.filter(event_type=md.TicketEvent.SNAPSHOT).exists()
+    assert events.exclude(event_type=md.TicketEvent.SNAPSHOT).count() + n_archived == n_events
+    assert get_aggregates(boardid) == aggregates
+    freezer.stop()
+
+    resetDB()
+
+
+@freeze_time("2024-06-01")
+@pytest.mark.django_db
+def test_compact_ticket_events_command():
+    """
+    Test that the command archives the events older than the given number of days, and keeps the scopes of the
+    archived events
+    """
+    boardid = create_board_with_random_events(3)
+    n_events = md.TicketEvent.objects.filter(boardid=boardid).count()
+    scope_events = md.TicketEvent.objects.filter(event_type=md.TicketEvent.SCOPE_CHANGE)
+    scope_ids = {
+        str(event.ticketeventid): [str(scope.scopeid) for scope in event.new_scopes.all()] for event in scope_events
+    }
+
+    output = StringIO()
+    call_command("compact_ticket_events", days=0, stdout=output)
+
+    assert f"Archived {n_events} events" in output.getvalue()
+    assert not md.TicketEvent.objects.exclude(event_type=md.TicketEvent.SNAPSHOT).exists()
+    archived_scope_events = md.ArchivedTicketEvent.objects.filter(event_type=md.TicketEvent.SCOPE_CHANGE)
+    assert {str(event.ticketeventid): event.new_scopes for event in archived_scope_events} == scope_ids
+
+    resetDB()
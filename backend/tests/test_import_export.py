@@ -1,3 +1,7 @@
+import gzip
+import msgpack
+import tracemalloc
+from io import BytesIO, StringIO
 import pytest
 import futuboard.models as md
 from rest_framework.test import APIClient
@@ -6,7 +10,14 @@ from django.utils import timezone
 from django.urls import reverse
 import json
 from django.core.files.uploadedfile import SimpleUploadedFile
-from .test_utils import resetDB
+from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from futuboard.binary_export import BINARY_CONTENT_TYPE, read_binary_export_sections
+from futuboard.board_import import IMPORT_TABLES
+from futuboard.export_reader import BoardImportError, read_export_sections
+from futuboard.management.commands.benchmark_import import make_synthetic_board_data
+from futuboard.views.import_export_views import create_board_from_data_dict, create_data_dict_from_board
+from .test_utils import addBoard, fillBoard, resetDB
 
 
 ############################################################################################################
@@ -98,7 +109,7 @@ def test_import_export():
                     users[k].actions.add(md.Action.objects.get(actionid=action.actionid))
         # Export the board
         response = client.get(reverse("export_board_data", args=[boards[num].boardid]))
-        data = response.content
+        data = b"".join(response.streaming_content)
         # Create a file from the data
         file = SimpleUploadedFile("test.json", data, content_type="text/json")
         assert response.status_code == 200
@@ -171,3 +182,290 @@ def test_import_export():
         num += 1
     # Clean up everything
     resetDB()
+
+
+@pytest.mark.django_db
+def test_export_is_streamed_in_chunks(settings):
+    """
+    Test that the streamed export is the same document as the board data dict, when the tables are read in chunks
+    smaller than the tables and when the export is compressed with gzip
+    """
+    settings.EXPORT_CHUNK_SIZE = 2
+    client = APIClient()
+    board = addBoard()
+    fillBoard(board.boardid, 3, 5)
+    expected = json.loads(json.dumps(create_data_dict_from_board(board.boardid), cls=DjangoJSONEncoder))
+
+    response = client.get(reverse("export_board_data", args=[board.boardid]))
+    assert response.streaming
+    assert "Content-Encoding" not in response
+    assert json.loads(b"".join(response.streaming_content)) == expected
+
+    response = client.get(reverse("export_board_data", args=[board.boardid]), headers={"Accept-Encoding": "gzip"})
+    assert response["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(b"".join(response.streaming_content))) == expected
+
+    response = client.get(reverse("export_board_data", args=[uuid.uuid4()]))
+    assert response.status_code == 404
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_import_runs_fixed_number_of_queries(django_assert_max_num_queries):
+    """
+    Test that importing a board inserts its rows in bulk, so the number of queries doesn't grow with the size of the
+    board, and that the many-to-many values are imported
+    """
+    for n_tickets, n_events in [(5, 10), (100, 500)]:
+        data = make_synthetic_board_data(n_columns=3, n_tickets=n_tickets, n_events=n_events, n_users=3)
+        with django_assert_max_num_queries(30):
+            board = create_board_from_data_dict(data, "Imported", "")
+
+        tickets = md.Ticket.objects.filter(columnid__boardid=board["boardid"])
+        assert tickets.count() == n_tickets
+        assert md.TicketEvent.objects.filter(ticketid__in=tickets).count() == n_events
+        user = md.User.objects.filter(boardid=board["boardid"]).first()
+        assert user.tickets.count() == n_tickets
+        scope = md.Scope.objects.get(boardid=board["boardid"])
+        assert scope.tickets.count() == n_tickets
+        assert md.TicketEvent.objects.filter(ticketid__in=tickets, new_scopes=scope).count() == n_events
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_failed_import_leaves_nothing_behind():
+    """
+    Test that a board whose import fails is not partially created
+    """
+    data = make_synthetic_board_data(n_columns=3, n_tickets=5, n_events=10, n_users=3)
+    # A ticket without an order can't be inserted
+    del data["tickets"][-1]["order"]
+
+    with pytest.raises(Exception):
+        create_board_from_data_dict(data, "Imported", "")
+
+    assert not md.Board.objects.exists()
+    assert not md.Column.objects.exists()
+    assert not md.Ticket.objects.exists()
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_benchmark_import_command():
+    """
+    Test that the import benchmark imports a synthetic board, reports the time, and removes the board
+    """
+    output = StringIO()
+    call_command("benchmark_import", events=200, tickets=20, stdout=output)
+
+    assert "Imported 200 events" in output.getvalue()
+    assert "msgpack: " in output.getvalue()
+    assert not md.Board.objects.exists()
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_import_only_replaces_id_fields():
+    """
+    Test that importing replaces the ids of every table consistently, and doesn't touch text that looks like an id
+    """
+    data = make_synthetic_board_data(n_columns=2, n_tickets=3, n_events=4, n_users=2)
+    text_id = str(uuid.uuid4())
+    data["tickets"][0]["title"] = text_id
+    data["tickets"][0]["description"] = data["tickets"][1]["ticketid"]
+    old_ids = {ticket["ticketid"] for ticket in data["tickets"]} | {column["columnid"] for column in data["columns"]}
+
+    board = create_board_from_data_dict(data, "Imported", "")
+
+    tickets = md.Ticket.objects.filter(columnid__boardid=board["boardid"])
+    new_ids = {str(ticket.ticketid) for ticket in tickets}
+    new_ids |= {str(column.columnid) for column in md.Column.objects.filter(boardid=board["boardid"])}
+    assert len(new_ids) == len(old_ids)
+    assert not new_ids & old_ids
+    ticket = tickets.get(title=text_id)
+    assert ticket.description in old_ids
+    assert md.TicketEvent.objects.filter(ticketid__in=tickets).count() == 4
+    # The events of the synthetic export have no board, like the events of exports made before events had one
+    assert md.TicketEvent.objects.filter(boardid=board["boardid"]).count() == 4
+    assert md.User.objects.filter(boardid=board["boardid"]).first().tickets.count() == 3
+
+    resetDB()
+
+
+def test_export_reader_reads_values_across_chunks():
+    """
+    Test that the export reader reads the same sections as json.loads, when values are split between chunks
+    """
+    document = {
+        "board": {"boardid": str(uuid.uuid4()), "title": "Tälläinen ✓ board", "size": 12345678},
+        "columns": [{"columnid": str(uuid.uuid4()), "ordernum": i, "title": "ö" * i} for i in range(20)],
+        "empty": [],
+        "ticketEvents": [{"old_size": 10**i, "new_size": -1.5, "old_scopes": [None, True]} for i in range(10)],
+    }
+    content = json.dumps(document, ensure_ascii=False, indent=2).encode("UTF-8")
+
+    for chunk_size in [1, 7, 64 * 1024]:
+        sections = {}
+        for key, value in read_export_sections(BytesIO(content), chunk_size=chunk_size):
+            sections[key] = value if isinstance(value, dict) else list(value)
+        assert sections == document
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"", b"[]", b'{"board": {"title": "a"}', b'{"columns": [{"columnid": 1}, ]}', b"{} {}", b'{"title": "\xff"}'],
+)
+def test_export_reader_rejects_invalid_json(content):
+    """
+    Test that the export reader raises BoardImportError for files that are not a JSON object
+    """
+    with pytest.raises(BoardImportError):
+        for _, value in read_export_sections(BytesIO(content), chunk_size=4):
+            if not isinstance(value, dict):
+                list(value)
+
+
+def test_export_reader_memory_is_bounded():
+    """
+    Test that reading a large export keeps only a small part of it in memory
+    """
+    data = make_synthetic_board_data(n_columns=5, n_tickets=100, n_events=20000, n_users=5)
+    content = json.dumps(data).encode("UTF-8")
+    del data
+
+    tracemalloc.start()
+    row_count = 0
+    for _, value in read_export_sections(BytesIO(content)):
+        if not isinstance(value, dict):
+            row_count += sum(1 for _ in value)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert row_count == 5 + 100 + 20000 + 1 + 5
+    assert peak < len(content) / 10
+
+
+@pytest.mark.django_db
+def test_import_rejects_invalid_and_too_large_files(settings):
+    """
+    Test that importing a file that is not a valid export, or that is larger than the maximum upload size, fails with
+    an error and leaves nothing behind
+    """
+    client = APIClient()
+    board_data = json.dumps({"title": "Test Board", "password": ""})
+    data = make_synthetic_board_data(n_columns=2, n_tickets=3, n_events=4, n_users=2)
+    data["ticketEvents"][2] = "not a row"
+    content = json.dumps(data).encode("UTF-8")
+
+    response = client.post(
+        reverse("import_board_data"), {"board": board_data, "file": SimpleUploadedFile("test.json", content)}
+    )
+    assert response.status_code == 400
+    assert not md.Board.objects.exists()
+    assert not md.Ticket.objects.exists()
+
+    response = client.post(
+        reverse("import_board_data"), {"board": board_data, "file": SimpleUploadedFile("test.json", content[:-20])}
+    )
+    assert response.status_code == 400
+    assert not md.Board.objects.exists()
+
+    settings.IMPORT_MAX_UPLOAD_SIZE = 100
+    response = client.post(
+        reverse("import_board_data"), {"board": board_data, "file": SimpleUploadedFile("test.json", content)}
+    )
+    assert response.status_code == 413
+
+    resetDB()
+
+
+def normalize_json_rows(model, rows, names):
+    """
+    Converts the values of JSON export rows to the Python values of the model's fields
+    """
+    fields = {field.name: field for field in model._meta.concrete_fields + model._meta.many_to_many}
+    normalized = []
+    for row in rows:
+        values = {}
+        for name in names:
+            field = fields[name]
+            if field.many_to_many:
+                values[name] = sorted(uuid.UUID(str(value)) for value in row[name])
+            elif field.is_relation:
+                values[name] = field.target_field.to_python(row[name])
+            else:
+                values[name] = field.to_python(row[name])
+        normalized.append(values)
+    return sorted(normalized, key=lambda values: str(values[model._meta.pk.name]))
+
+
+@pytest.mark.django_db
+def test_binary_export_has_same_data_as_json_export():
+    """
+    Test that the binary export of a board decodes to the same values as its JSON export, that it is smaller, and that
+    it can be imported
+    """
+    client = APIClient()
+    data = make_synthetic_board_data(n_columns=3, n_tickets=10, n_events=50, n_users=3)
+    board = create_board_from_data_dict(data, "Exported", "")
+    url = reverse("export_board_data", args=[board["boardid"]])
+
+    response = client.get(url)
+    json_content = b"".join(response.streaming_content)
+    json_data = json.loads(json_content)
+
+    response = client.get(url, headers={"Accept": BINARY_CONTENT_TYPE})
+    assert response["Content-Type"] == BINARY_CONTENT_TYPE
+    assert response["Content-Disposition"].endswith('.msgpack"')
+    binary_content = b"".join(response.streaming_content)
+    assert len(binary_content) < len(json_content) / 2
+
+    sections = 0
+    for key, value in read_binary_export_sections(BytesIO(binary_content)):
+        model = md.Board if key == "board" else IMPORT_TABLES[key]
+        rows = [value] if key == "board" else list(value)
+        json_rows = [json_data[key]] if key == "board" else json_data[key]
+        names = list(rows[0].keys()) if rows else []
+        for row in rows:
+            for name, row_value in row.items():
+                if isinstance(row_value, list):
+                    row[name] = sorted(row_value)
+        assert sorted(rows, key=lambda row: str(row[model._meta.pk.name])) == normalize_json_rows(
+            model, json_rows, names
+        )
+        sections += 1
+    assert sections == len(json_data)
+
+    file = SimpleUploadedFile("test.msgpack", binary_content)
+    response = client.post(
+        reverse("import_board_data"),
+        {"board": json.dumps({"title": "Imported", "password": ""}), "file": file},
+    )
+    assert response.status_code == 200
+    new_board = response.json()["boardid"]
+    assert md.TicketEvent.objects.filter(ticketid__columnid__boardid=new_board).count() == 50
+    assert md.User.objects.filter(boardid=new_board).first().tickets.count() == 10
+
+    resetDB()
+
+
+def test_binary_export_reader_rejects_invalid_files():
+    """
+    Test that the binary export reader raises BoardImportError for files that are not binary exports
+    """
+    header = msgpack.packb({"format": "futuboard-board", "version": 1})
+    for content in [
+        b"",
+        b'{"board": {}}',
+        msgpack.packb({"format": "futuboard-board", "version": 2}),
+        header + msgpack.packb({"table": "columns", "fields": ["columnid"]}) + msgpack.packb([[b"1234"]]),
+        header + msgpack.packb({"table": "columns", "fields": ["columnid"]}) + msgpack.packb([[1, 2]]),
+    ]:
+        with pytest.raises(BoardImportError):
+            for _, value in read_binary_export_sections(BytesIO(content)):
+                if not isinstance(value, dict):
+                    list(value)
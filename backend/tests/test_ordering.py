@@ -0,0 +1,249 @@
+import io
+import json
+import uuid
+import pytest
+import futuboard.models as md
+from rest_framework.test import APIClient
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from futuboard.ordering import MAX_ORDER, MIN_ORDER, ORDER_GAP, get_new_orders, rebalance_order
+from .test_utils import addBoard, addColumn, resetDB
+
+
+############################################################################################################
+############################################# ORDERING TESTS ###############################################
+############################################################################################################
+
+
+def test_moving_one_row_changes_one_value():
+    """
+    Test that moving one row of a list gives a new value to that row only
+    """
+    orders = [i * ORDER_GAP for i in range(10)]
+
+    # Move the last row to the third place
+    new_orders = get_new_orders(orders[:2] + [orders[9]] + orders[2:9])
+
+    assert new_orders == orders[:2] + [ORDER_GAP + ORDER_GAP // 2] + orders[2:9]
+
+
+def test_new_rows_are_placed_between_their_neighbours():
+    """
+    Test that rows new to a list get values between their neighbours, and before or after the first and last row
+    """
+    new_orders = get_new_orders([None, 0, None, None, 90, None])
+
+    assert new_orders == [-ORDER_GAP, 0, 30, 60, 90, 90 + ORDER_GAP]
+
+
+def test_full_gap_is_reported():
+    """
+    Test that no values are returned when there is no room between two neighbours
+    """
+    assert get_new_orders([0, None, 1]) is None
+    assert get_new_orders([0, None, None, 2]) is None
+
+
+def get_ticket_order_updates(context, exclude_ticketid=None):
+    return [
+        query["sql"]
+        for query in context.captured_queries
+        if query["sql"].startswith('UPDATE "Ticket"')
+        and '"order"' in query["sql"]
+        and (exclude_ticketid is None or exclude_ticketid.hex not in query["sql"])
+    ]
+
+
+@pytest.mark.django_db
+def test_creating_ticket_does_not_update_other_tickets():
+    """
+    Test that creating a ticket puts it at the top of the column without writing the other tickets of the column
+    """
+    api_client = APIClient()
+    board = addBoard()
+    column = addColumn(board.boardid, uuid.uuid4())
+
+    ticketids = [uuid.uuid4() for _ in range(5)]
+    for ticketid in ticketids:
+        data = {"ticketid": str(ticketid), "title": "ticket", "description": "", "size": 1}
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.post(
+                reverse("tickets_on_column", args=[column.columnid]),
+                data=json.dumps(data),
+                content_type="application/json",
+            )
+        assert response.status_code == 200
+        # Saving the new ticket tries an update of the new row first, which is not counted
+        assert get_ticket_order_updates(context, exclude_ticketid=ticketid) == []
+
+    response = api_client.get(reverse("tickets_on_column", args=[column.columnid]))
+    assert [ticket["ticketid"] for ticket in response.json()] == [str(ticketid) for ticketid in reversed(ticketids)]
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_moving_ticket_updates_only_moved_ticket():
+    """
+    Test that moving a ticket inside a column or to another column only writes the moved ticket
+    """
+    api_client = APIClient()
+    board = addBoard()
+    column1 = addColumn(board.boardid, uuid.uuid4())
+    column2 = addColumn(board.boardid, uuid.uuid4())
+
+    for column in [column1, column2]:
+        for i in range(5):
+            data = {"ticketid": str(uuid.uuid4()), "title": f"ticket {i}", "description": "", "size": 1}
+            response = api_client.post(
+                reverse("tickets_on_column", args=[column.columnid]),
+                data=json.dumps(data),
+                content_type="application/json",
+            )
+            assert response.status_code == 200
+
+    def ticket_ids(column):
+        return [
+            str(ticketid)
+            for ticketid in md.Ticket.objects.filter(columnid=column)
+            .order_by("order")
+            .values_list("ticketid", flat=True)
+        ]
+
+    def put_tickets(column, new_order):
+        url = reverse("tickets_on_column", args=[column.columnid])
+        data = [{"ticketid": ticketid} for ticketid in new_order]
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.put(url, data=json.dumps(data), content_type="application/json")
+        assert response.status_code == 200
+        assert ticket_ids(column) == new_order
+        return context
+
+    # Move the last ticket of the first column to the second place
+    ids = ticket_ids(column1)
+    orders_before = dict(md.Ticket.objects.exclude(pk=ids[4]).values_list("ticketid", "order"))
+    context = put_tickets(column1, [ids[0], ids[4], ids[1], ids[2], ids[3]])
+    assert len(get_ticket_order_updates(context)) == 1
+    assert dict(md.Ticket.objects.exclude(pk=ids[4]).values_list("ticketid", "order")) == orders_before
+
+    # Move the first ticket of the second column to the middle of the first column
+    moved = ticket_ids(column2)[0]
+    orders_before = dict(md.Ticket.objects.exclude(pk=moved).values_list("ticketid", "order"))
+    new_order = ticket_ids(column1)
+    new_order.insert(2, moved)
+    put_tickets(column1, new_order)
+    assert dict(md.Ticket.objects.exclude(pk=moved).values_list("ticketid", "order")) == orders_before
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_moving_ticket_renumbers_column_when_gap_is_full():
+    """
+    Test that moving tickets into the same place over and over renumbers the column when there is no room left
+    """
+    api_client = APIClient()
+    board = addBoard()
+    column = addColumn(board.boardid, uuid.uuid4())
+    for i in range(3):
+        data = {"ticketid": str(uuid.uuid4()), "title": f"ticket {i}", "description": "", "size": 1}
+        api_client.post(
+            reverse("tickets_on_column", args=[column.columnid]),
+            data=json.dumps(data),
+            content_type="application/json",
+        )
+
+    # Keep moving the last ticket to the second place, halving the gap between the first two tickets every time
+    renumbered = False
+    for _ in range(15):
+        ids = list(md.Ticket.objects.filter(columnid=column).order_by("order").values_list("ticketid", flat=True))
+        new_order = [ids[0], ids[-1]] + ids[1:-1]
+        data = [{"ticketid": str(ticketid)} for ticketid in new_order]
+        response = api_client.put(
+            reverse("tickets_on_column", args=[column.columnid]),
+            data=json.dumps(data),
+            content_type="application/json",
+        )
+        assert response.status_code == 200
+        orders = list(md.Ticket.objects.filter(columnid=column).order_by("order").values_list("ticketid", "order"))
+        assert [ticketid for ticketid, _ in orders] == new_order
+        assert len({order for _, order in orders}) == len(orders)
+        renumbered = renumbered or [order for _, order in orders] == [0, ORDER_GAP, 2 * ORDER_GAP]
+
+    assert renumbered
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_adding_rows_renumbers_list_at_the_order_limits():
+    """
+    Test that adding a ticket to the top of a column or a column to the end of a board renumbers the list when the
+    new row's order value would go past the limits of the order column
+    """
+    api_client = APIClient()
+    board = addBoard()
+    column = addColumn(board.boardid, uuid.uuid4())
+    column.ordernum = MAX_ORDER - 10
+    column.save()
+    for i, order in enumerate([MIN_ORDER + 10, MIN_ORDER + 20, 0]):
+        md.Ticket.objects.create(ticketid=uuid.uuid4(), columnid=column, title=f"ticket {i}", order=order)
+
+    new_ticketid = uuid.uuid4()
+    data = {"ticketid": str(new_ticketid), "title": "new ticket", "description": "", "size": 1}
+    response = api_client.post(
+        reverse("tickets_on_column", args=[column.columnid]),
+        data=json.dumps(data),
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    tickets = md.Ticket.objects.filter(columnid=column).order_by("order")
+    assert list(tickets.values_list("title", flat=True)) == ["new ticket", "ticket 0", "ticket 1", "ticket 2"]
+    assert list(tickets.values_list("order", flat=True)) == [-ORDER_GAP, 0, ORDER_GAP, 2 * ORDER_GAP]
+
+    new_columnid = uuid.uuid4()
+    data = {"columnid": str(new_columnid), "title": "new column", "description": "", "swimlane": False}
+    response = api_client.post(
+        reverse("columns_on_board", args=[board.boardid]), data=json.dumps(data), content_type="application/json"
+    )
+    assert response.status_code == 200
+    columns = md.Column.objects.filter(boardid=board).order_by("ordernum")
+    assert list(columns.values_list("columnid", "ordernum")) == [(column.columnid, 0), (new_columnid, ORDER_GAP)]
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_rebalance_order():
+    """
+    Test that rebalancing renumbers crowded lists and leaves well spaced lists alone, unless forced
+    """
+    board = addBoard()
+    crowded_column = addColumn(board.boardid, uuid.uuid4())
+    spaced_column = addColumn(board.boardid, uuid.uuid4())
+    for i, order in enumerate([0, 6, 6, 100]):
+        md.Ticket.objects.create(ticketid=uuid.uuid4(), columnid=crowded_column, title=f"crowded {i}", order=order)
+    for i in range(3):
+        md.Ticket.objects.create(ticketid=uuid.uuid4(), columnid=spaced_column, title=f"spaced {i}", order=i * 100)
+    titles_before = list(md.Ticket.objects.order_by("columnid", "order", "ticketid").values_list("title", flat=True))
+
+    assert rebalance_order(md.Ticket) == 3
+    crowded_orders = (
+        md.Ticket.objects.filter(columnid=crowded_column).order_by("order").values_list("order", flat=True)
+    )
+    assert list(crowded_orders) == [0, ORDER_GAP, 2 * ORDER_GAP, 3 * ORDER_GAP]
+    spaced_orders = md.Ticket.objects.filter(columnid=spaced_column).order_by("order").values_list("order", flat=True)
+    assert list(spaced_orders) == [0, 100, 200]
+
+    call_command("rebalance_ordering", "--all", stdout=io.StringIO())
+    spaced_orders = md.Ticket.objects.filter(columnid=spaced_column).order_by("order").values_list("order", flat=True)
+    assert list(spaced_orders) == [0, ORDER_GAP, 2 * ORDER_GAP]
+    assert list(md.Ticket.objects.order_by("columnid", "order").values_list("title", flat=True)) == titles_before
+    assert list(md.Column.objects.order_by("ordernum").values_list("columnid", flat=True)) == [
+        crowded_column.columnid,
+        spaced_column.columnid,
+    ]
+
+    resetDB()
@@ -0,0 +1,167 @@
+import uuid
+from unittest.mock import patch
+import fakeredis
+import pytest
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.urls import path, reverse
+from freezegun import freeze_time
+from rest_framework.test import APIClient
+from futuboard.consumers import BoardConsumer
+from futuboard.presence import (
+    MESSAGES,
+    InProcessPresenceRegistry,
+    RedisPresenceRegistry,
+    get_hot_boards,
+    get_presence_registry,
+)
+from .test_utils import addBoard, resetDB
+
+
+############################################################################################################
+########################################### PRESENCE TESTS #################################################
+############################################################################################################
+
+
+@pytest.fixture(params=["in_process", "redis"])
+def registry(request):
+    if request.param == "redis":
+        return RedisPresenceRegistry(fakeredis.FakeRedis(), heartbeat_interval=30, rate_window=5)
+    return InProcessPresenceRegistry(heartbeat_interval=30, rate_window=5)
+
+
+def test_registry_counts_connections_and_rates(registry):
+    """
+    Test that the registry counts the open connections of a board, and the rates of connects, disconnects and
+    messages over the rate window
+    """
+    board_id = uuid.uuid4()
+    with freeze_time("2024-01-05 12:00:00"):
+        registry.add_connection(board_id, "connection-1")
+        registry.add_connection(board_id, "connection-2")
+        registry.add_connection(board_id, "connection-3")
+        registry.count(board_id, MESSAGES, 20)
+        registry.remove_connection(board_id, "connection-3")
+
+    with freeze_time("2024-01-05 12:02:00"):
+        registry.count(board_id, MESSAGES, 10)
+        registry.refresh_connection(board_id, "connection-1")
+        registry.refresh_connection(board_id, "connection-2")
+        assert registry.get_board_presence(board_id) == {
+            "connections": 2,
+            "connects_per_minute": 3 / 5,
+            "disconnects_per_minute": 1 / 5,
+            "messages_per_minute": 30 / 5,
+        }
+        assert registry.get_board_presence(uuid.uuid4())["connections"] == 0
+
+    # The counts of the first minute fall out of the window
+    with freeze_time("2024-01-05 12:05:30"):
+        registry.refresh_connection(board_id, "connection-1")
+        registry.refresh_connection(board_id, "connection-2")
+        assert registry.get_board_presence(board_id) == {
+            "connections": 2,
+            "connects_per_minute": 0,
+            "disconnects_per_minute": 0,
+            "messages_per_minute": 10 / 5,
+        }
+
+
+def test_connections_without_heartbeats_are_not_counted(registry):
+    """
+    Test that connections that haven't been refreshed for two heartbeat intervals, e.g. because their process died,
+    are not counted
+    """
+    board_id = uuid.uuid4()
+    with freeze_time("2024-01-05 12:00:00"):
+        registry.add_connection(board_id, "connection-1")
+        registry.add_connection(board_id, "connection-2")
+    with freeze_time("2024-01-05 12:00:50"):
+        registry.refresh_connection(board_id, "connection-1")
+    with freeze_time("2024-01-05 12:01:10"):
+        assert registry.get_board_presence(board_id)["connections"] == 1
+
+
+def test_hot_boards_are_ordered_by_connections(registry):
+    """
+    Test that the hot boards are the boards with the most connections
+    """
+    board_ids = [uuid.uuid4() for _ in range(3)]
+    for board_id, connection_count in zip(board_ids, [1, 3, 2]):
+        for i in range(connection_count):
+            registry.add_connection(board_id, f"connection-{i}")
+
+    hot_boards = get_hot_boards(registry, 2)
+    assert [board["boardid"] for board in hot_boards] == [str(board_ids[1]), str(board_ids[2])]
+    assert [board["connections"] for board in hot_boards] == [3, 2]
+
+
+def test_hot_boards_are_read_from_redis_in_one_round_trip():
+    """
+    Test that the presence of every board is read from the broker with one pipeline
+    """
+    registry = RedisPresenceRegistry(fakeredis.FakeRedis(), heartbeat_interval=30, rate_window=5)
+    board_ids = [uuid.uuid4() for _ in range(5)]
+    for board_id in board_ids:
+        registry.add_connection(board_id, "connection-1")
+
+    with patch.object(registry.client, "pipeline", wraps=registry.client.pipeline) as pipeline:
+        hot_boards = get_hot_boards(registry, 10)
+    assert pipeline.call_count == 1
+    assert len(hot_boards) == 5
+    assert all(board["connections"] == 1 for board in hot_boards)
+
+
+@pytest.mark.asyncio
+async def test_consumer_registers_its_connection():
+    """
+    Test that a websocket connection is registered for its board while it is open
+    """
+    application = URLRouter([path("board/<uuid:board_id>", BoardConsumer.as_asgi())])
+    board_id = uuid.uuid4()
+    communicators = [WebsocketCommunicator(application, f"board/{board_id}") for _ in range(2)]
+    try:
+        for communicator in communicators:
+            assert (await communicator.connect())[0]
+        assert get_presence_registry().get_board_presence(board_id)["connections"] == 2
+
+        await communicators[0].disconnect()
+        presence = get_presence_registry().get_board_presence(board_id)
+        assert presence["connections"] == 1
+        assert presence["disconnects_per_minute"] > 0
+    finally:
+        for communicator in communicators:
+            await communicator.disconnect()
+
+
+@pytest.mark.django_db
+def test_presence_endpoints():
+    """
+    Test that the presence of a board can be read with the board's token, and the hot boards with the admin password
+    """
+    api_client = APIClient()
+    board = addBoard()
+    get_presence_registry().add_connection(board.boardid, "connection-1")
+
+    response = api_client.get(reverse("board_presence", args=[board.boardid]))
+    assert response.status_code == 200
+    assert response.json()["connections"] == 1
+
+    response = api_client.get(reverse("board_presence", args=[uuid.uuid4()]))
+    assert response.status_code == 404
+
+    response = api_client.post(reverse("hot_boards"), {"password": "wrong"}, format="json")
+    assert response.status_code == 401
+
+    # A missing password is rejected even when no admin password is set
+    with patch("futuboard.verification.ADMIN_PASSWORD", None):
+        for data in [{}, {"password": None}, {"password": ""}]:
+            response = api_client.post(reverse("hot_boards"), data, format="json")
+            assert response.status_code == 401
+
+    response = api_client.post(reverse("hot_boards"), {"password": "admin", "limit": 1}, format="json")
+    assert response.status_code == 200
+    assert response.json()[0]["boardid"] == str(board.boardid)
+
+    get_presence_registry().remove_connection(board.boardid, "connection-1")
+    resetDB()
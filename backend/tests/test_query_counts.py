@@ -0,0 +1,166 @@
+import json
+import uuid
+import pytest
+import futuboard.models as md
+from rest_framework.test import APIClient
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .test_utils import addBoard, addColumn, fillBoard, resetDB
+
+
+############################################################################################################
+########################################### QUERY COUNT TESTS ##############################################
+############################################################################################################
+
+"""
+List endpoints must run a fixed number of queries, no matter how many rows they return. Every endpoint is called
+on a small and on a big board, and both calls have to match the expected query count.
+"""
+
+# Endpoint name -> (function that returns the url arguments for a board, expected number of queries)
+# The lists with an ETag also load the revision of the board
+LIST_ENDPOINTS = {
+    "columns_on_board": (lambda board: [board.boardid], 2),
+    "tickets_on_column": (lambda board: [first_column(board).columnid], 4),
+    "get_actions_by_columnId": (lambda board: [first_column(board).columnid], 3),
+    "swimlanecolumns_on_column": (lambda board: [first_column(board).columnid], 2),
+    "users_on_board": (lambda board: [board.boardid], 4),
+    "users_on_ticket": (lambda board: [first_ticket(board).ticketid], 3),
+    "users_on_action": (lambda board: [first_action(board).actionid], 4),
+    "scopes_on_board": (lambda board: [board.boardid], 6),
+    "events": (lambda board: [board.boardid], 3),
+    "export_board_data": (lambda board: [board.boardid], 18),
+    "board_snapshot": (lambda board: [board.boardid], 15),
+}
+
+
+def first_column(board):
+    return md.Column.objects.filter(boardid=board).order_by("ordernum").first()
+
+
+def first_ticket(board):
+    return md.Ticket.objects.filter(columnid=first_column(board)).first()
+
+
+def first_action(board):
+    return md.Action.objects.filter(ticketid=first_ticket(board)).first()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("endpoint", LIST_ENDPOINTS.keys())
+def test_list_endpoint_query_count(endpoint, django_assert_num_queries):
+    """
+    Test that the query count of a list endpoint is fixed and doesn't grow with the size of the board
+    """
+    api_client = APIClient()
+    get_args, expected_queries = LIST_ENDPOINTS[endpoint]
+
+    for n_columns, n_tickets in [(1, 1), (4, 6)]:
+        board = addBoard()
+        fillBoard(board.boardid, n_columns, n_tickets)
+        url = reverse(endpoint, args=get_args(board))
+
+        info = f"{endpoint} on a board with {n_columns} columns of {n_tickets} tickets"
+        with django_assert_num_queries(expected_queries, info=info):
+            response = api_client.get(url)
+            # Streamed responses run their queries while the content is read
+            if response.streaming:
+                b"".join(response.streaming_content)
+        assert response.status_code == 200
+
+    resetDB()
+
+
+def count_put_queries(url, data):
+    api_client = APIClient()
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.put(url, data=json.dumps(data), content_type="application/json")
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_reordering_query_count():
+    """
+    Test that reordering and moving tickets, columns and actions runs the same number of queries for short and long
+    lists
+    """
+    query_counts = {"tickets": [], "columns": [], "actions": []}
+
+    for n_tickets in [2, 20]:
+        board = addBoard()
+        fillBoard(board.boardid, 4, n_tickets)
+        columns = list(md.Column.objects.filter(boardid=board).order_by("ordernum"))
+        new_column = addColumn(board.boardid, uuid.uuid4(), "new column")
+
+        # Move all tickets of the first column to the new column, in reverse order
+        tickets = md.Ticket.objects.filter(columnid=columns[0]).order_by("-order")
+        url = reverse("tickets_on_column", args=[new_column.columnid])
+        query_counts["tickets"].append(count_put_queries(url, [{"ticketid": str(t.ticketid)} for t in tickets]))
+        assert md.Ticket.objects.filter(columnid=new_column).count() == n_tickets
+        move_events = md.TicketEvent.objects.filter(event_type=md.TicketEvent.MOVE, new_columnid=new_column)
+        assert move_events.count() == n_tickets
+        assert all(list(event.old_scopes.all()) == list(event.ticketid.scope_set.all()) for event in move_events)
+
+        url = reverse("columns_on_board", args=[board.boardid])
+        data = [{"columnid": str(column.columnid)} for column in reversed(columns)]
+        query_counts["columns"].append(count_put_queries(url, data))
+
+        # Move all actions of the board to the same ticket and swimlanecolumn
+        ticket = tickets[0]
+        swimlanecolumn = md.Swimlanecolumn.objects.filter(columnid=columns[1]).first()
+        actions = md.Action.objects.filter(ticketid__columnid__boardid=board)
+        url = reverse("action_on_swimlane", args=[swimlanecolumn.swimlanecolumnid, ticket.ticketid])
+        query_counts["actions"].append(count_put_queries(url, [{"actionid": str(a.actionid)} for a in actions]))
+        assert md.Action.objects.filter(ticketid=ticket, swimlanecolumnid=swimlanecolumn).count() == 4 * n_tickets
+
+    for endpoint, counts in query_counts.items():
+        assert counts[0] == counts[1], endpoint
+
+    resetDB()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "endpoint,get_item,expected_queries",
+    [
+        ("update_column", lambda board: first_column(board).columnid, 3),
+        (
+            "update_swimlanecolumn",
+            lambda board: md.Swimlanecolumn.objects.filter(columnid__boardid=board).first().pk,
+            3,
+        ),
+        # The serialized action includes its users
+        ("update_action", lambda board: first_action(board).actionid, 4),
+    ],
+)
+def test_access_token_check_loads_item_in_one_query(
+    endpoint, get_item, expected_queries, settings, django_assert_num_queries
+):
+    """
+    Test that checking the access token of a child object of a board and loading the object is done in one query
+    """
+    settings.DISABLE_AUTH_TOKEN_CHECKING = False
+    api_client = APIClient()
+    board = addBoard(password="password")
+    fillBoard(board.boardid, 1, 1)
+    token = api_client.post(reverse("board_by_id", args=[board.boardid]), {"password": "password"}).json()["token"]
+    url = reverse(endpoint, args=[get_item(board)])
+
+    with django_assert_num_queries(1):
+        response = api_client.put(url, data=json.dumps({"title": "new title"}), content_type="application/json")
+    assert response.status_code == 401
+
+    # Loading and checking the object, saving it, and increasing the revision of the board
+    with django_assert_num_queries(expected_queries):
+        response = api_client.put(
+            url,
+            data=json.dumps({"title": "new title"}),
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    assert response.status_code == 200
+    assert response.json()["title"] == "new title"
+
+    resetDB()
@@ -0,0 +1,142 @@
+import re
+import pytest
+import futuboard.models as md
+from rest_framework.test import APIClient
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .test_utils import addBoard, fillBoard, resetDB
+
+
+############################################################################################################
+########################################### QUERY PLAN TESTS ###############################################
+############################################################################################################
+
+"""
+The queries of the hot endpoints must be served by indexes. Every query of an endpoint is run with EXPLAIN on a
+database with a few boards, and the plan must not have a sequential scan of a table. Lists that are read by their
+parent in order must also be read in the order of an index instead of being sorted.
+"""
+
+# Endpoint name -> (function that returns the url arguments for a board and its scope, query string)
+HOT_ENDPOINTS = {
+    "columns_on_board": (lambda board, scope: [board.boardid], ""),
+    "tickets_on_column": (lambda board, scope: [first_column(board).columnid], ""),
+    "get_actions_by_columnId": (lambda board, scope: [first_column(board).columnid], ""),
+    "swimlanecolumns_on_column": (lambda board, scope: [first_column(board).columnid], ""),
+    "users_on_board": (lambda board, scope: [board.boardid], ""),
+    "scopes_on_board": (lambda board, scope: [board.boardid], ""),
+    "events": (lambda board, scope: [board.boardid], ""),
+    "cumulative_flow": (lambda board, scope: [board.boardid], "?time_unit=hour"),
+    "burn_up": (lambda board, scope: [board.boardid, scope.scopeid], ""),
+    "board_snapshot": (lambda board, scope: [board.boardid], ""),
+}
+
+# Name -> function that returns a query of a list that is read in order, for a board
+ORDERED_QUERIES = {
+    "columns of a board": lambda board: md.Column.objects.filter(boardid=board).order_by("ordernum"),
+    "swimlanecolumns of a column": lambda board: md.Swimlanecolumn.objects.filter(
+        columnid=first_column(board)
+    ).order_by("ordernum"),
+    "tickets of a column": lambda board: md.Ticket.objects.filter(columnid=first_column(board)).order_by("order"),
+    "actions of a ticket in a swimlanecolumn": lambda board: md.Action.objects.filter(
+        ticketid=first_action(board).ticketid, swimlanecolumnid=first_action(board).swimlanecolumnid
+    ).order_by("order"),
+    "events of a board": lambda board: md.TicketEvent.objects.filter(boardid=board).order_by("event_time"),
+    "events into a column": lambda board: md.TicketEvent.objects.filter(new_columnid=first_column(board)).order_by(
+        "event_time"
+    ),
+    "events out of a column": lambda board: md.TicketEvent.objects.filter(old_columnid=first_column(board)).order_by(
+        "event_time"
+    ),
+}
+
+# Plan lines of a full scan of a table, and of a sort
+SEQUENTIAL_SCAN = {"sqlite": re.compile(r"^SCAN (?!\(|CONSTANT ROW)"), "postgresql": re.compile(r"Seq Scan on ")}
+SORT = {"sqlite": re.compile(r"USE TEMP B-TREE FOR ORDER BY"), "postgresql": re.compile(r"(^|-> )Sort ")}
+
+
+def first_column(board):
+    return md.Column.objects.filter(boardid=board).order_by("ordernum").first()
+
+
+def first_action(board):
+    return md.Action.objects.filter(ticketid__columnid=first_column(board)).first()
+
+
+def seed_boards():
+    """
+    Adds a few boards with moved tickets, and returns the last one with its scope
+    """
+    for _ in range(3):
+        board = addBoard()
+        scope = fillBoard(board.boardid, 4, 6)
+        columns = list(md.Column.objects.filter(boardid=board).order_by("ordernum"))
+        for ticket in md.Ticket.objects.filter(columnid=columns[0]):
+            md.TicketEvent.objects.create(
+                ticketid=ticket,
+                boardid=board,
+                event_type=md.TicketEvent.MOVE,
+                old_columnid=columns[0],
+                new_columnid=columns[1],
+                old_size=0,
+                new_size=0,
+            ).old_scopes.add(scope)
+    return board, scope
+
+
+def get_plan(sql, params=()):
+    """
+    Returns the lines of the query plan of a query. Sequential scans are disabled on PostgreSQL, so that one shows up
+    only when there is no index for it, however small the tables are.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[3] for row in cursor.fetchall()]
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("EXPLAIN " + sql, params)
+        return [row[0].strip() for row in cursor.fetchall()]
+
+
+def find_plan_lines(plan, patterns):
+    return [line for line in plan if patterns[connection.vendor].search(line)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("endpoint", HOT_ENDPOINTS.keys())
+def test_hot_endpoint_queries_use_indexes(endpoint):
+    """
+    Test that no query of a hot endpoint scans a whole table
+    """
+    api_client = APIClient()
+    board, scope = seed_boards()
+    get_args, query_string = HOT_ENDPOINTS[endpoint]
+
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.get(reverse(endpoint, args=get_args(board, scope)) + query_string)
+    assert response.status_code == 200
+
+    queries = [query["sql"] for query in context.captured_queries if query["sql"].startswith("SELECT")]
+    assert queries
+    for sql in queries:
+        plan = get_plan(sql)
+        assert not find_plan_lines(plan, SEQUENTIAL_SCAN), f"{sql}\n\n" + "\n".join(plan)
+
+    resetDB()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", ORDERED_QUERIES.keys())
+def test_ordered_lists_are_read_in_index_order(name):
+    """
+    Test that lists read by their parent in order use an index for both, without a full scan or a sort
+    """
+    board, _ = seed_boards()
+    sql, params = ORDERED_QUERIES[name](board).query.sql_with_params()
+
+    plan = get_plan(sql, params)
+    assert not find_plan_lines(plan, SEQUENTIAL_SCAN), "\n".join(plan)
+    assert not find_plan_lines(plan, SORT), "\n".join(plan)
+
+    resetDB()
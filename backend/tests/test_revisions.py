@@ -0,0 +1,89 @@
+import json
+import uuid
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+import futuboard.models as md
+from .test_utils import addBoard, fillBoard, resetDB
+
+
+############################################################################################################
+######################################### BOARD REVISION TESTS #############################################
+############################################################################################################
+
+
+def first_column(board):
+    return md.Column.objects.filter(boardid=board).order_by("ordernum").first()
+
+
+# Endpoint name -> function that returns the url arguments for a board
+ETAG_ENDPOINTS = {
+    "columns_on_board": lambda board: [board.boardid],
+    "tickets_on_column": lambda board: [first_column(board).columnid],
+    "swimlanecolumns_on_column": lambda board: [first_column(board).columnid],
+    "get_actions_by_columnId": lambda board: [first_column(board).columnid],
+    "users_on_board": lambda board: [board.boardid],
+    "scopes_on_board": lambda board: [board.boardid],
+}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("endpoint", ETAG_ENDPOINTS.keys())
+def test_lists_are_not_sent_again_while_board_is_unchanged(endpoint, django_assert_num_queries):
+    """
+    Test that the list endpoints answer a request with the current revision of the board with 304 using one query,
+    and send the list again after the board has been changed
+    """
+    api_client = APIClient()
+    board = addBoard()
+    fillBoard(board.boardid, 2, 2)
+    url = reverse(endpoint, args=ETAG_ENDPOINTS[endpoint](board))
+
+    response = api_client.get(url)
+    assert response.status_code == 200
+    assert "no-cache" in response["Cache-Control"]
+    etag = response["ETag"]
+
+    with django_assert_num_queries(1):
+        response = api_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+
+    api_client.put(
+        reverse("update_board_title", args=[board.boardid]),
+        data=json.dumps({"title": "new title"}),
+        content_type="application/json",
+    )
+    response = api_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_changes_increase_board_revision():
+    """
+    Test that a change made through the API increases the revision of the board once, and doesn't change the
+    revisions of other boards
+    """
+    api_client = APIClient()
+    board = addBoard()
+    other_board = addBoard()
+    fillBoard(board.boardid, 1, 1)
+    ticket = md.Ticket.objects.filter(columnid__boardid=board).first()
+    revision = md.Board.objects.get(pk=board.boardid).revision
+
+    api_client.put(
+        reverse("update_ticket", args=[ticket.ticketid]), data=json.dumps({"size": 3}), content_type="application/json"
+    )
+    assert md.Board.objects.get(pk=board.boardid).revision == revision + 1
+    assert md.Board.objects.get(pk=other_board.boardid).revision == 0
+
+    # Changes that fail don't increase the revision
+    api_client.put(
+        reverse("update_ticket", args=[uuid.uuid4()]), data=json.dumps({"size": 3}), content_type="application/json"
+    )
+    assert md.Board.objects.get(pk=board.boardid).revision == revision + 1
+
+    resetDB()
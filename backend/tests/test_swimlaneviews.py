@@ -175,9 +175,8 @@ def test_action_on_swimlane():
     for action in data:
         assert action["swimlanecolumnid"] == str(swimlanecolumnid2)
     # Check that the order of the actions has been updated
-    assert data[0]["order"] == 0
-    assert data[1]["order"] == 1
-    assert data[2]["order"] == 2
+    assert [action["actionid"] for action in data] == [str(actionids[1]), str(actionids[0]), str(actionids[2])]
+    assert data[0]["order"] < data[1]["order"] < data[2]["order"]
     # Clean up
     resetDB()
 
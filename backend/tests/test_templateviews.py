@@ -1,8 +1,10 @@
 import os
+import uuid
 import pytest
 from rest_framework.test import APIClient
 from django.urls import reverse
-from .test_utils import addBoard, addBoardTemplate, resetDB
+import futuboard.models as md
+from .test_utils import addBoard, addBoardTemplate, addColumn, addTicket, resetDB
 
 
 @pytest.mark.django_db
@@ -54,6 +56,7 @@ def test_create_board_template():
     assert data["boardid"] == str(boardid)
     assert data["title"] == sent_data["title"]
     assert data["description"] == sent_data["description"]
+    assert data["snapshot_date"] is not None
 
     resetDB()
 
@@ -134,3 +137,111 @@ def test_cant_delete_board_template_with_wrong_password():
     assert len(get_response.json()) == 1
 
     resetDB()
+
+
+@pytest.mark.django_db
+def test_update_board_template_takes_new_snapshot():
+    """
+    Test that boards created from a template don't have the changes made to the template's board after the template
+    was created, until the template is updated
+    """
+    api_client = APIClient()
+
+    os.environ["ADMIN_PASSWORD"] = "admin"
+
+    board = addBoard()
+    column = addColumn(board.boardid, uuid.uuid4())
+    addTicket(column.columnid, uuid.uuid4(), title="Before")
+    response = api_client.post(
+        reverse("board_templates"),
+        data={"password": "admin", "title": "Template", "description": "", "boardid": board.boardid},
+    )
+    template_data = response.json()
+    addTicket(column.columnid, uuid.uuid4(), title="After")
+
+    def get_template_ticket_titles():
+        response = api_client.post(
+            reverse("create_board_from_template", args=[template_data["boardtemplateid"]]),
+            {"title": "From template", "password": ""},
+            format="json",
+        )
+        tickets = md.Ticket.objects.filter(columnid__boardid=response.json()["boardid"])
+        return sorted(tickets.values_list("title", flat=True))
+
+    assert get_template_ticket_titles() == ["Before"]
+
+    response = api_client.put(
+        reverse("board_templates"),
+        data={"password": "admin", "boardtemplateid": template_data["boardtemplateid"], "title": "New title"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["title"] == "New title"
+    assert data["description"] == ""
+    assert data["snapshot_date"] > template_data["snapshot_date"]
+    assert md.Board.objects.filter(snapshot_templateid=data["boardtemplateid"]).count() == 1
+
+    assert get_template_ticket_titles() == ["After", "Before"]
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_frozen_board_is_deleted_with_template():
+    """
+    Test that the frozen copy of a template's board is deleted with the template, also when the template is deleted
+    with its board
+    """
+    api_client = APIClient()
+
+    os.environ["ADMIN_PASSWORD"] = "admin"
+
+    for delete_board in [False, True]:
+        board = addBoard()
+        addTicket(addColumn(board.boardid, uuid.uuid4()).columnid, uuid.uuid4())
+        response = api_client.post(
+            reverse("board_templates"),
+            data={"password": "admin", "title": "Template", "description": "", "boardid": board.boardid},
+        )
+        template_id = response.json()["boardtemplateid"]
+        snapshot_board = md.Board.objects.get(snapshot_templateid=template_id)
+        assert md.Ticket.objects.filter(columnid__boardid=snapshot_board).count() == 1
+
+        if delete_board:
+            board.delete()
+        else:
+            api_client.delete(reverse("board_templates"), data={"password": "admin", "boardtemplateid": template_id})
+
+        assert not md.BoardTemplate.objects.filter(pk=template_id).exists()
+        assert not md.Board.objects.filter(pk=snapshot_board.pk).exists()
+        assert not md.Ticket.objects.filter(columnid__boardid=snapshot_board.pk).exists()
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_cant_update_board_template_with_wrong_password():
+    """
+    Test that a board template can't be updated with a wrong password
+    """
+    api_client = APIClient()
+
+    os.environ["ADMIN_PASSWORD"] = "test password"
+
+    boardid = addBoard().boardid
+    board_template = addBoardTemplate(boardid)
+
+    data = {
+        "password": "wrong password",
+        "boardtemplateid": board_template.boardtemplateid,
+        "title": "New title",
+    }
+
+    response = api_client.put(reverse("board_templates"), data=data)
+    assert response.status_code == 401
+
+    board_template.refresh_from_db()
+    assert board_template.title == "Template title"
+    assert not board_template.snapshot_boards.exists()
+
+    resetDB()
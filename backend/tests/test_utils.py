@@ -1,3 +1,4 @@
+import uuid
 import futuboard.models as md
 from django.utils import timezone
 import django.apps
@@ -14,6 +15,7 @@ def addBoard(title="title", password="", description="", background_color="white
         background_color=background_color,
         creation_date=timezone.now(),
         passwordhash="" if password == "" else hash_password(password),
+        has_password=password != "",
         salt="",
     )
     new_board.save()
@@ -102,6 +104,34 @@ def addBoardTemplate(boardId, title="Template title", description="Template desc
     return new_board_template
 
 
+def fillBoard(boardId, n_columns, n_tickets=2):
+    """
+    Adds n_columns swimlane columns to the board, each with a swimlanecolumn and n_tickets tickets with an action.
+    Every ticket and action gets a user and a ticket creation event, and every ticket is added to a scope.
+    """
+    board = md.Board.objects.get(pk=boardId)
+    scope = md.Scope.objects.create(boardid=board, title="scope")
+    for i in range(n_columns):
+        columnid = addColumn(boardId, uuid.uuid4(), "column" + str(i), True).columnid
+        swimlanecolumnid = addSwimlanecolumn(columnid, uuid.uuid4(), "swimlane").swimlanecolumnid
+        for j in range(n_tickets):
+            ticket = addTicket(columnid, uuid.uuid4(), "ticket" + str(j))
+            action = addAction(ticket.ticketid, swimlanecolumnid, uuid.uuid4(), "action")
+            user = md.User.objects.create(name="user", boardid=board)
+            user.tickets.add(ticket)
+            user.actions.add(action)
+            scope.tickets.add(ticket)
+            md.TicketEvent.objects.create(
+                ticketid=ticket,
+                boardid=board,
+                event_type=md.TicketEvent.CREATE,
+                new_columnid=ticket.columnid,
+                old_size=0,
+                new_size=0,
+            ).new_scopes.add(scope)
+    return scope
+
+
 def resetDB():
     for model in django.apps.apps.get_models():
         model.objects.all().delete()
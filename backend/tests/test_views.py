@@ -4,7 +4,9 @@ from rest_framework.test import APIClient
 import uuid
 from django.urls import reverse
 import json
-from .test_utils import addBoard, addColumn, addTicket, resetDB
+import futuboard.verification as ver
+from django.test import RequestFactory
+from .test_utils import addBoard, addColumn, addTicket, fillBoard, resetDB
 from ..futuboard.verification import verify_password
 
 
@@ -572,10 +574,13 @@ def test_updating_columns_order():
         reverse("columns_on_board", args=[boardid]), data=json.dumps(data), content_type="application/json"
     )
     assert response.status_code == 200
-    assert md.Column.objects.get(pk=columnid1).ordernum == 3
-    assert md.Column.objects.get(pk=columnid2).ordernum == 2
-    assert md.Column.objects.get(pk=columnid3).ordernum == 0
-    assert md.Column.objects.get(pk=columnid4).ordernum == 1
+    ordernums = [
+        md.Column.objects.get(pk=columnid).ordernum for columnid in [columnid3, columnid4, columnid2, columnid1]
+    ]
+    assert ordernums == sorted(ordernums)
+    # Columns 3 and 4 are already in the right order relative to each other, so they keep their values
+    assert md.Column.objects.get(pk=columnid3).ordernum == 2
+    assert md.Column.objects.get(pk=columnid4).ordernum == 3
 
     response = api_client.get(reverse("columns_on_board", args=[boardid]))
     data = response.json()
@@ -680,6 +685,61 @@ def test_password_change_with_clashing_confirm_password():
     resetDB()
 
 
+@pytest.mark.django_db
+def test_has_password_follows_password_changes():
+    """
+    Test that the has_password flag of a board is set on creation and kept up to date when the password changes
+    """
+    api_client = APIClient()
+
+    response = api_client.post(reverse("all_boards"), {"title": "board", "password": ""})
+    boardid = response.json()["boardid"]
+    assert md.Board.objects.get(pk=boardid).has_password is False
+    assert api_client.get(reverse("board_by_id", args=[boardid])).json()["needs_password"] is False
+
+    response = api_client.put(
+        reverse("update_board_password", args=[boardid]),
+        data={"old_password": "", "new_password": "password", "confirm_password": "password"},
+    )
+    assert response.status_code == 200
+    assert md.Board.objects.get(pk=boardid).has_password is True
+    assert api_client.get(reverse("board_by_id", args=[boardid])).json()["needs_password"] is True
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_access_token_check_does_not_verify_password_hash(
+    enable_auth_token_checking, monkeypatch, django_assert_num_queries
+):
+    """
+    Test that checking an access token runs one query and no Argon2 verification
+    """
+    api_client = APIClient()
+    protected_board = addBoard(password="password")
+    open_board = addBoard()
+    token = api_client.post(reverse("board_by_id", args=[protected_board.boardid]), {"password": "password"}).json()[
+        "token"
+    ]
+
+    def fail_verify(*args):
+        raise AssertionError("Password hash was verified")
+
+    monkeypatch.setattr(ver, "verify_password", fail_verify)
+
+    for board, headers, expected_status in [
+        (protected_board, {"HTTP_AUTHORIZATION": f"Bearer {token}"}, 200),
+        (protected_board, {}, 401),
+        (open_board, {}, 200),
+    ]:
+        request = RequestFactory().put("/", **headers)
+        with django_assert_num_queries(1):
+            result = ver.check_if_access_token_incorrect(board.boardid, request)
+        assert (result.status_code if result else 200) == expected_status
+
+    resetDB()
+
+
 @pytest.mark.django_db
 def test_update_ticket_template():
     """
@@ -747,3 +807,60 @@ def test_update_board_notes():
     assert md.Board.objects.get(pk=boardid).notes == "test notes"
 
     resetDB()
+
+
+@pytest.mark.django_db
+def test_board_snapshot():
+    """
+    Test the board_snapshot function in backend/futuboard/views/boardViews.py
+    Has one method: GET
+        GET: Returns columns, tickets, swimlanecolumns, actions, users and scopes of a board
+    """
+    api_client = APIClient()
+    boardid = addBoard().boardid
+    fillBoard(boardid, 3)
+
+    response = api_client.get(reverse("board_snapshot", args=[boardid]))
+    assert response.status_code == 200
+    data = response.json()
+
+    assert [column["title"] for column in data["columns"]] == ["column0", "column1", "column2"]
+    assert len(data["swimlanecolumns"]) == 3
+    assert len(data["tickets"]) == 6
+    assert len(data["actions"]) == 6
+    assert len(data["users"]) == 6
+    assert len(data["scopes"]) == 1
+    assert len(data["scopes"][0]["tickets"]) == 6
+
+    # Snapshot has the same content as the per-column endpoints
+    for column in data["columns"]:
+        columnid = column["columnid"]
+        tickets = api_client.get(reverse("tickets_on_column", args=[columnid])).json()
+        assert tickets == [ticket for ticket in data["tickets"] if ticket["columnid"] == columnid]
+        actions = api_client.get(reverse("get_actions_by_columnId", args=[columnid])).json()
+        column_actions = [action for action in data["actions"] if action["columnid"] == columnid]
+        assert sorted(actions, key=lambda a: a["actionid"]) == sorted(column_actions, key=lambda a: a["actionid"])
+
+    response = api_client.get(reverse("board_snapshot", args=[uuid.uuid4()]))
+    assert response.status_code == 404
+
+    resetDB()
+
+
+@pytest.mark.django_db
+def test_board_snapshot_query_count_does_not_grow(django_assert_num_queries):
+    """
+    Test that the number of queries of board_snapshot doesn't depend on the size of the board
+    """
+    api_client = APIClient()
+    small_boardid = addBoard().boardid
+    fillBoard(small_boardid, 1)
+    big_boardid = addBoard().boardid
+    fillBoard(big_boardid, 10)
+
+    with django_assert_num_queries(15):
+        api_client.get(reverse("board_snapshot", args=[small_boardid]))
+    with django_assert_num_queries(15):
+        api_client.get(reverse("board_snapshot", args=[big_boardid]))
+
+    resetDB()
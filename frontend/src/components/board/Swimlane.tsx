@@ -14,9 +14,10 @@ interface SwimlaneActionListProps {
   taskId: string
   swimlanecolumn: SwimlaneColumn
   actionList: ActionType[]
+  index: number
 }
 
-const SwimlaneActionList: React.FC<SwimlaneActionListProps> = ({ taskId, swimlanecolumn, actionList }) => {
+const SwimlaneActionList: React.FC<SwimlaneActionListProps> = ({ taskId, swimlanecolumn, actionList, index }) => {
   return (
     <>
       <Droppable
@@ -36,7 +37,7 @@ const SwimlaneActionList: React.FC<SwimlaneActionListProps> = ({ taskId, swimlan
               backgroundColor: snapshot.isDraggingOver ? "rgba(22, 95, 199, 0.1)" : "#E5DB0",
               overflowX: "hidden"
             }}
-            data-testid={`action-list-${swimlanecolumn.ordernum}`}
+            data-testid={`action-list-${index}`}
           >
             {actionList &&
               actionList.map((action, index) => <Action key={action.actionid} action={action} index={index} />)}
@@ -142,6 +143,7 @@ const Swimlane: React.FC<SwimlaneProps> = ({ task, swimlaneColumns, actions, col
               key={index}
               taskId={task.ticketid}
               swimlanecolumn={swimlaneColumn}
+              index={index}
               actionList={actions.filter((action) => action.swimlanecolumnid == swimlaneColumn.swimlanecolumnid)}
             />
           ))}
@@ -7,6 +7,7 @@ import AccessBoardForm from "@/components/board/AccessBoardForm"
 import { cacheTagTypes } from "@/constants"
 import { boardsApi, useGetBoardQuery, useLoginMutation } from "@/state/apiSlice"
 import { getAuth, getIsInReadMode, setBoardId, setIsInReadMode } from "@/state/auth"
+import { applyBoardEvent } from "@/state/boardEvents"
 import { setNotification } from "@/state/notification"
 import { webSocketContainer } from "@/state/websocket"
 import { Board } from "@/types"
@@ -34,8 +35,8 @@ const LoggedInContainer: React.FC<LoggedInContainerProps> = ({ children, titlePr
       dispatch(setBoardId(id))
       setIsBoardIdset(true)
       await webSocketContainer.connectToBoard(id)
-      webSocketContainer.setOnMessageHandler((tags) => {
-        dispatch(boardsApi.util.invalidateTags(tags))
+      webSocketContainer.setOnMessageHandler((event) => {
+        applyBoardEvent(dispatch, event)
       })
       webSocketContainer.setResetHandler(() => {
         dispatch(boardsApi.util.invalidateTags([...cacheTagTypes]))
@@ -178,7 +178,7 @@ const BoardCreationForm: React.FC<AddBoardCreationFormProps> = ({ onSubmit, onCa
               type="file"
               {...register("file", { onChange: handleFileSelect })}
               style={{ display: "none" }}
-              accept=".json"
+              accept=".json,.msgpack"
             />
           </Button>
           <Typography variant="body2" color="textSecondary" style={{ marginTop: "8px" }}>
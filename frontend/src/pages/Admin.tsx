@@ -1,5 +1,6 @@
 import AddIcon from "@mui/icons-material/Add"
 import DeleteIcon from "@mui/icons-material/Delete"
+import RefreshIcon from "@mui/icons-material/Refresh"
 import Box from "@mui/material/Box"
 import Button from "@mui/material/Button"
 import Card from "@mui/material/Card"
@@ -20,7 +21,8 @@ import ToolBar from "@/components/general/Toolbar"
 import {
   useAddBoardTemplateMutation,
   useDeleteBoardTemplateMutation,
-  useGetBoardTemplatesQuery
+  useGetBoardTemplatesQuery,
+  useUpdateBoardTemplateMutation
 } from "@/state/apiSlice"
 import { BoardTemplate, NewBoardTemplate } from "@/types"
 
@@ -31,6 +33,7 @@ const Admin = () => {
   const [isDialogOpen, setIsDialogOpen] = useState(false)
 
   const [addBoardTemplate] = useAddBoardTemplateMutation()
+  const [updateBoardTemplate] = useUpdateBoardTemplateMutation()
   const [deleteBoardTemplate] = useDeleteBoardTemplateMutation()
 
   let { data: boardTemplates } = useGetBoardTemplatesQuery()
@@ -78,6 +81,16 @@ const Admin = () => {
     }
   }
 
+  const handleBoardTemplateUpdate = async (
+    event: React.MouseEvent<HTMLButtonElement, MouseEvent>,
+    boardTemplate: BoardTemplate
+  ) => {
+    event.preventDefault()
+    if (confirm(`Update ${boardTemplate.title} to the current state of its board?`)) {
+      await updateBoardTemplate(boardTemplate.boardtemplateid)
+    }
+  }
+
   const handleBoardTemplateDelete = async (
     event: React.MouseEvent<HTMLButtonElement, MouseEvent>,
     boardTemplate: BoardTemplate
@@ -206,7 +219,14 @@ const Admin = () => {
                       </Typography>
 
                       <IconButton
-                        sx={{ position: "absolute", left: 50, bottom: 0 }}
+                        sx={{ position: "absolute", left: 20, bottom: 0 }}
+                        onClick={(event) => handleBoardTemplateUpdate(event, boardTemplate)}
+                        aria-label={`Update template ${boardTemplate.title}`}
+                      >
+                        <RefreshIcon sx={{ fontSize: 40 }} color="primary" />
+                      </IconButton>
+                      <IconButton
+                        sx={{ position: "absolute", right: 20, bottom: 0 }}
                         onClick={(event) => handleBoardTemplateDelete(event, boardTemplate)}
                         aria-label={`Delete template ${boardTemplate.title}`}
                       >
@@ -44,11 +44,6 @@ const isLoggedInWithReadOnly = (
   return getIsInReadMode(boardId)
 }
 
-const invalidateRemoteCache = (tags: CacheInvalidationTag[]) => {
-  webSocketContainer.invalidateCacheOfOtherUsers(tags)
-  return tags
-}
-
 // TODO: type this better
 const updateCache = (
   endpointName: Parameters<typeof boardsApi.util.updateQueryData>[0],
@@ -71,6 +66,7 @@ const baseQuery = fetchBaseQuery({
   baseUrl: import.meta.env.VITE_DB_ADDRESS,
 
   prepareHeaders: (headers, { getState }) => {
+    headers.set("X-Client-Id", webSocketContainer.getClientId())
     const boardId = (getState() as RootState).auth.boardId
     if (boardId) {
       const auth = getAuth(boardId)
@@ -149,7 +145,7 @@ export const boardsApi = createApi({
           body: boardData
         }
       },
-      invalidatesTags: () => invalidateRemoteCache(["Boards"])
+      invalidatesTags: () => ["Boards"]
     }),
 
     importBoard: builder.mutation<Board, FormData>({
@@ -160,7 +156,7 @@ export const boardsApi = createApi({
           body: formData
         }
       },
-      invalidatesTags: () => invalidateRemoteCache(["Boards"])
+      invalidatesTags: () => ["Boards"]
     }),
 
     getBoardTemplates: builder.query<BoardTemplate[], void>({
@@ -180,6 +176,18 @@ export const boardsApi = createApi({
       invalidatesTags: ["BoardTemplate"]
     }),
 
+    updateBoardTemplate: builder.mutation<BoardTemplate, string>({
+      query: (boardtemplateid) => {
+        const password = getAdminPassword()
+        return {
+          url: "boardtemplates/",
+          method: "PUT",
+          body: { boardtemplateid, password }
+        }
+      },
+      invalidatesTags: ["BoardTemplate"]
+    }),
+
     deleteBoardTemplate: builder.mutation<BoardTemplate, string>({
       query: (boardtemplateid) => {
         const password = getAdminPassword()
@@ -200,7 +208,7 @@ export const boardsApi = createApi({
           body: { title, password }
         }
       },
-      invalidatesTags: () => invalidateRemoteCache(["Boards"])
+      invalidatesTags: () => ["Boards"]
     }),
 
     deleteBoard: builder.mutation<Board, string>({
@@ -208,7 +216,7 @@ export const boardsApi = createApi({
         url: `boards/${boardId}/`,
         method: "DELETE"
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Boards"])
+      invalidatesTags: () => ["Boards"]
     }),
 
     updateBoardTitle: builder.mutation<Board, { boardId: string; newTitle: string }>({
@@ -217,7 +225,7 @@ export const boardsApi = createApi({
         method: "PUT",
         body: { title: newTitle }
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Boards"])
+      invalidatesTags: () => ["Boards"]
     }),
 
     updateBoardPassword: builder.mutation<Board, { boardId: string; newPassword: PasswordChangeFormData }>({
@@ -226,7 +234,7 @@ export const boardsApi = createApi({
         method: "PUT",
         body: newPassword
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Boards"])
+      invalidatesTags: () => ["Boards"]
     }),
 
     updateBoardColor: builder.mutation<Board, { boardId: string; newColor: string }>({
@@ -235,7 +243,7 @@ export const boardsApi = createApi({
         method: "PUT",
         body: { background_color: newColor }
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Boards"])
+      invalidatesTags: () => ["Boards"]
     }),
 
     updateTaskTemplate: builder.mutation<Board, { boardId: string; newTaskTemplate: TaskTemplate }>({
@@ -244,7 +252,7 @@ export const boardsApi = createApi({
         method: "PUT",
         body: newTaskTemplate
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Boards"])
+      invalidatesTags: () => ["Boards"]
     }),
     updateBoardNotes: builder.mutation<Board, { boardId: string; notes: string }>({
       query: ({ boardId, notes }) => ({
@@ -252,7 +260,7 @@ export const boardsApi = createApi({
         method: "PUT",
         body: { notes: notes }
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Boards"])
+      invalidatesTags: () => ["Boards"]
     }),
     getColumnsByBoardId: builder.query<Column[], string>({
       query: (boardid) => `boards/${boardid}/columns/`,
@@ -290,7 +298,7 @@ export const boardsApi = createApi({
         method: "POST",
         body: column
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Columns"])
+      invalidatesTags: () => ["Columns"]
     }),
 
     addTask: builder.mutation<Task, { columnId: string; task: NewTask }>({
@@ -299,11 +307,10 @@ export const boardsApi = createApi({
         method: "POST",
         body: task
       }),
-      invalidatesTags: (_result, _error, { columnId }) =>
-        invalidateRemoteCache([
-          { type: "Columns", id: columnId },
-          { type: "Ticket", id: "LIST" }
-        ])
+      invalidatesTags: (_result, _error, { columnId }) => [
+        { type: "Columns", id: columnId },
+        { type: "Ticket", id: "LIST" }
+      ]
     }),
 
     updateTask: builder.mutation<Task, { task: NewTask }>({
@@ -312,11 +319,10 @@ export const boardsApi = createApi({
         method: "PUT",
         body: task
       }),
-      invalidatesTags: (_result, _error, { task }) =>
-        invalidateRemoteCache([
-          { type: "Ticket", id: task.ticketid },
-          { type: "Ticket", id: "LIST" }
-        ])
+      invalidatesTags: (_result, _error, { task }) => [
+        { type: "Ticket", id: task.ticketid },
+        { type: "Ticket", id: "LIST" }
+      ]
     }),
 
     deleteTask: builder.mutation<Task, { task: Task }>({
@@ -324,11 +330,10 @@ export const boardsApi = createApi({
         url: `tickets/${task.ticketid}/`,
         method: "DELETE"
       }),
-      invalidatesTags: (_result, _error, { task }) =>
-        invalidateRemoteCache([
-          { type: "Ticket", id: task.ticketid },
-          { type: "Ticket", id: "LIST" }
-        ])
+      invalidatesTags: (_result, _error, { task }) => [
+        { type: "Ticket", id: task.ticketid },
+        { type: "Ticket", id: "LIST" }
+      ]
     }),
 
     updateColumn: builder.mutation<Column, { column: Column; ticketIds?: string[] }>({
@@ -337,7 +342,7 @@ export const boardsApi = createApi({
         method: "PUT",
         body: { ...column, ticket_ids: ticketIds }
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Columns"])
+      invalidatesTags: () => ["Columns"]
     }),
 
     updateColumnOrder: builder.mutation<Column[], { boardId: string; columns: Column[] }>({
@@ -361,7 +366,6 @@ export const boardsApi = createApi({
         )
 
         apiActions.queryFulfilled.finally(() => {
-          invalidateRemoteCache(invalidationTags)
           boardsApi.util.invalidateTags(invalidationTags)
         })
       }
@@ -372,7 +376,7 @@ export const boardsApi = createApi({
         url: `columns/${column.columnid}/`,
         method: "DELETE"
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Columns"])
+      invalidatesTags: () => ["Columns"]
     }),
 
     updateTaskListByColumnId: builder.mutation<Task[], { columnId: string; tasks: Task[] }>({
@@ -405,7 +409,6 @@ export const boardsApi = createApi({
         )
 
         apiActions.queryFulfilled.finally(() => {
-          invalidateRemoteCache([...tagsToInvalidate])
           apiActions.dispatch(boardsApi.util.invalidateTags(tagsToInvalidate))
         })
       }
@@ -422,7 +425,7 @@ export const boardsApi = createApi({
         method: "POST",
         body: user
       }),
-      invalidatesTags: () => invalidateRemoteCache([{ type: "Users", id: "ALL_USERS" }])
+      invalidatesTags: () => [{ type: "Users", id: "ALL_USERS" }]
     }),
 
     login: builder.mutation<{ success: boolean; token: string }, { boardId: string; password: string }>({
@@ -487,7 +490,6 @@ export const boardsApi = createApi({
         )
 
         apiActions.queryFulfilled.finally(() => {
-          invalidateRemoteCache(tagsToInvalidate)
           apiActions.dispatch(boardsApi.util.invalidateTags(tagsToInvalidate))
         })
       }
@@ -536,7 +538,6 @@ export const boardsApi = createApi({
         )
 
         apiActions.queryFulfilled.finally(() => {
-          invalidateRemoteCache(tagsToInvalidate)
           apiActions.dispatch(boardsApi.util.invalidateTags(tagsToInvalidate))
         })
       }
@@ -588,7 +589,6 @@ export const boardsApi = createApi({
         )
 
         apiActions.queryFulfilled.finally(() => {
-          invalidateRemoteCache(tagsToInvalidate)
           apiActions.dispatch(boardsApi.util.invalidateTags(tagsToInvalidate))
         })
       }
@@ -637,7 +637,6 @@ export const boardsApi = createApi({
         )
 
         apiActions.queryFulfilled.finally(() => {
-          invalidateRemoteCache(tagsToInvalidate)
           apiActions.dispatch(boardsApi.util.invalidateTags(tagsToInvalidate))
         })
       }
@@ -648,7 +647,7 @@ export const boardsApi = createApi({
         url: `users/${userId}`,
         method: "DELETE"
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Users"])
+      invalidatesTags: () => ["Users"]
     }),
 
     getSwimlaneColumnsByColumnId: builder.query<SwimlaneColumn[], string>({
@@ -662,7 +661,7 @@ export const boardsApi = createApi({
         method: "PUT",
         body: swimlaneColumn
       }),
-      invalidatesTags: () => invalidateRemoteCache([{ type: "SwimlaneColumn", id: "LIST" }])
+      invalidatesTags: () => [{ type: "SwimlaneColumn", id: "LIST" }]
     }),
 
     getActionsByColumnId: builder.query<Action[], string>({
@@ -710,7 +709,6 @@ export const boardsApi = createApi({
         )
 
         apiActions.queryFulfilled.finally(() => {
-          invalidateRemoteCache(invalidationTags)
           apiActions.dispatch(boardsApi.util.invalidateTags(invalidationTags))
         })
       }
@@ -723,7 +721,7 @@ export const boardsApi = createApi({
         method: "PUT",
         body: action
       }),
-      invalidatesTags: (result) => invalidateRemoteCache([{ type: "Action", id: result?.columnid }])
+      invalidatesTags: (result) => [{ type: "Action", id: result?.columnid }]
     }),
 
     deleteAction: builder.mutation<Action, { actionid: string }>({
@@ -731,7 +729,7 @@ export const boardsApi = createApi({
         url: `actions/${actionid}/`,
         method: "DELETE"
       }),
-      invalidatesTags: (result) => invalidateRemoteCache([{ type: "Action", id: result?.columnid }])
+      invalidatesTags: (result) => [{ type: "Action", id: result?.columnid }]
     }),
 
     // update action order
@@ -770,7 +768,6 @@ export const boardsApi = createApi({
         )
 
         apiActions.queryFulfilled.finally(() => {
-          invalidateRemoteCache(invalidationTags)
           apiActions.dispatch(boardsApi.util.invalidateTags(invalidationTags))
         })
       }
@@ -818,7 +815,7 @@ export const boardsApi = createApi({
         method: "POST",
         body: { title }
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Scopes"])
+      invalidatesTags: () => ["Scopes"]
     }),
 
     deleteScope: builder.mutation<Scope, { boardid: string; scopeid: string }>({
@@ -843,7 +840,6 @@ export const boardsApi = createApi({
         )
 
         apiActions.queryFulfilled.finally(() => {
-          invalidateRemoteCache(tagsToInvalidate)
           apiActions.dispatch(boardsApi.util.invalidateTags(tagsToInvalidate))
         })
       }
@@ -875,8 +871,6 @@ export const boardsApi = createApi({
         )
 
         apiActions.queryFulfilled.finally(() => {
-          invalidateRemoteCache(tagsToInvalidate)
-
           // We don't invalidate the local cache, because the optimisitic update is already done, and doing a refetch would cause the UI to be very slow.
 
           // apiActions.dispatch(boardsApi.util.invalidateTags(tagsToInvalidate))
@@ -889,7 +883,7 @@ export const boardsApi = createApi({
         url: `scopes/${scopeid}/set_scope_forecast`,
         method: "POST"
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Scopes"])
+      invalidatesTags: () => ["Scopes"]
     }),
 
     setScopeTitle: builder.mutation<{ success: boolean }, { scopeid: string; title: string }>({
@@ -898,7 +892,7 @@ export const boardsApi = createApi({
         method: "POST",
         body: { title: title }
       }),
-      invalidatesTags: () => invalidateRemoteCache(["Ticket", "Scopes"])
+      invalidatesTags: () => ["Ticket", "Scopes"]
     }),
 
     addTaskToScope: builder.mutation<{ success: boolean }, { scope: SimpleScope; ticketid: string }>({
@@ -928,7 +922,6 @@ export const boardsApi = createApi({
         tagsToInvalidate.push("Scopes")
 
         apiActions.queryFulfilled.finally(() => {
-          invalidateRemoteCache(tagsToInvalidate)
           apiActions.dispatch(boardsApi.util.invalidateTags(tagsToInvalidate))
         })
       }
@@ -961,7 +954,6 @@ export const boardsApi = createApi({
         tagsToInvalidate.push("Scopes")
 
         apiActions.queryFulfilled.finally(() => {
-          invalidateRemoteCache(tagsToInvalidate)
           apiActions.dispatch(boardsApi.util.invalidateTags(tagsToInvalidate))
         })
       }
@@ -1001,6 +993,7 @@ export const {
   useGetBoardQuery,
   useAddBoardMutation,
   useAddBoardTemplateMutation,
+  useUpdateBoardTemplateMutation,
   useDeleteBoardTemplateMutation,
   useCreateBoardFromTemplateMutation,
   useGetBoardTemplatesQuery,
@@ -0,0 +1,153 @@
+import { cacheTagTypes } from "@/constants"
+import { Action, BoardEvent, CacheInvalidationTag, Column, Task, User } from "@/types"
+
+import { boardsApi } from "./apiSlice"
+import { AppDispatch } from "./store"
+
+// Tickets and actions are kept in the cache in the order of their order values
+const insertInOrder = <T extends { order?: number }>(list: T[], item: T) => {
+  const index = list.findIndex((other) => (other.order ?? 0) > (item.order ?? 0))
+  if (index === -1) {
+    list.push(item)
+  } else {
+    list.splice(index, 0, item)
+  }
+}
+
+const removeTask = (dispatch: AppDispatch, columnId: string, ticketId: string) => {
+  dispatch(
+    boardsApi.util.updateQueryData("getTaskListByColumnId", { columnId }, (tasks) =>
+      tasks.filter((task) => task.ticketid !== ticketId)
+    )
+  )
+}
+
+const putTask = (dispatch: AppDispatch, task: Task) => {
+  dispatch(
+    boardsApi.util.updateQueryData("getTaskListByColumnId", { columnId: task.columnid }, (tasks) => {
+      const otherTasks = tasks.filter((other) => other.ticketid !== task.ticketid)
+      insertInOrder(otherTasks, task)
+      return otherTasks
+    })
+  )
+}
+
+const removeAction = (dispatch: AppDispatch, columnId: string, actionId: string) => {
+  dispatch(
+    boardsApi.util.updateQueryData("getActionsByColumnId", columnId, (actions) =>
+      actions.filter((action) => action.actionid !== actionId)
+    )
+  )
+}
+
+const putAction = (dispatch: AppDispatch, action: Action) => {
+  dispatch(
+    boardsApi.util.updateQueryData("getActionsByColumnId", action.columnid, (actions) => {
+      const otherActions = actions.filter((other) => other.actionid !== action.actionid)
+      insertInOrder(otherActions, action)
+      return otherActions
+    })
+  )
+}
+
+const putColumn = (dispatch: AppDispatch, boardId: string, column: Column) => {
+  dispatch(
+    boardsApi.util.updateQueryData("getColumnsByBoardId", boardId, (columns) =>
+      columns.map((other) => (other.columnid === column.columnid ? column : other))
+    )
+  )
+}
+
+const putUser = (dispatch: AppDispatch, boardId: string, user: User) => {
+  dispatch(
+    boardsApi.util.updateQueryData("getUsersByBoardId", boardId, (users) => {
+      const index = users.findIndex((other) => other.userid === user.userid)
+      if (index === -1) {
+        users.push(user)
+      } else {
+        users[index] = user
+      }
+    })
+  )
+}
+
+/*
+Applies a change made by another client to the cache. Changes to tickets, actions, columns and users are applied
+directly to the cached lists, other changes invalidate the cached data they affect.
+*/
+export const applyBoardEvent = (dispatch: AppDispatch, event: BoardEvent) => {
+  const tagsToInvalidate: CacheInvalidationTag[] = []
+
+  switch (event.type) {
+    case "ticket_created":
+    case "ticket_updated":
+      putTask(dispatch, event.data)
+      // Charts and scopes are computed from the tickets
+      tagsToInvalidate.push({ type: "Ticket", id: "LIST" })
+      break
+    case "ticket_moved":
+      if (event.data.old_columnid !== event.data.columnid) {
+        removeTask(dispatch, event.data.old_columnid, event.data.ticketid)
+      }
+      putTask(dispatch, event.data)
+      tagsToInvalidate.push({ type: "Ticket", id: "LIST" })
+      break
+    case "ticket_deleted":
+      removeTask(dispatch, event.data.columnid, event.data.ticketid)
+      tagsToInvalidate.push({ type: "Ticket", id: "LIST" })
+      break
+    case "action_created":
+    case "action_updated":
+    case "action_moved":
+      putAction(dispatch, event.data)
+      break
+    case "action_deleted":
+      removeAction(dispatch, event.data.columnid, event.data.actionid)
+      break
+    case "column_updated":
+      putColumn(dispatch, event.boardid, event.data)
+      break
+    case "column_created":
+    case "columns_reordered":
+      tagsToInvalidate.push({ type: "Columns", id: "LIST" })
+      break
+    case "column_deleted":
+      tagsToInvalidate.push("Columns")
+      break
+    case "swimlanecolumn_created":
+    case "swimlanecolumn_updated":
+      tagsToInvalidate.push({ type: "SwimlaneColumn", id: "LIST" })
+      break
+    case "user_created":
+    case "user_updated":
+      putUser(dispatch, event.boardid, event.data)
+      break
+    case "user_deleted":
+      tagsToInvalidate.push("Users")
+      break
+    case "scope_updated":
+      // Tickets show the titles of their scopes
+      if (event.data.title !== undefined) {
+        tagsToInvalidate.push("Ticket")
+      }
+      tagsToInvalidate.push("Scopes")
+      break
+    case "scope_created":
+      tagsToInvalidate.push("Scopes")
+      break
+    case "scope_deleted":
+      tagsToInvalidate.push("Ticket", "Scopes")
+      break
+    case "board_updated":
+    case "board_deleted":
+      tagsToInvalidate.push("Boards")
+      break
+    case "resync":
+      tagsToInvalidate.push(...cacheTagTypes)
+      break
+  }
+
+  if (tagsToInvalidate.length > 0) {
+    dispatch(boardsApi.util.invalidateTags(tagsToInvalidate))
+  }
+}
@@ -1,10 +1,6 @@
 import { getId } from "@/services/Utils"
-import { CacheInvalidationTag } from "@/types"
+import { BoardEvent } from "@/types"
 
-type CacheInvalidationMessage = {
-  clientId: string
-  tags: CacheInvalidationTag[]
-}
 class WebSocketContainer {
   private socket: WebSocket | null
   private clientId: string
@@ -78,20 +74,17 @@ class WebSocketContainer {
     }
   }
 
-  public invalidateCacheOfOtherUsers(tags: CacheInvalidationTag[]) {
-    if (this.socket) {
-      const message: CacheInvalidationMessage = { clientId: this.clientId, tags }
-      this.socket.send(JSON.stringify(message))
-    }
+  // Sent to the backend with every request, so that the events of this client's own changes can be skipped
+  public getClientId() {
+    return this.clientId
   }
 
-  public setOnMessageHandler(invalidateLocalCache: (tags: CacheInvalidationTag[]) => void) {
-    this.onMessageHandler = (event) => {
-      const data = JSON.parse(event.data)
-      const { tags, clientId: messageClientId } = JSON.parse(data) as CacheInvalidationMessage
+  public setOnMessageHandler(applyBoardEvent: (event: BoardEvent) => void) {
+    this.onMessageHandler = (message) => {
+      const event = JSON.parse(message.data) as BoardEvent
 
-      if (messageClientId !== this.clientId) {
-        invalidateLocalCache(tags)
+      if (event.origin !== this.clientId) {
+        applyBoardEvent(event)
       }
     }
 
@@ -39,6 +39,7 @@ export type Task = {
   caretakers?: User[]
   size?: number
   columnid: string
+  order?: number
   users: UserWithoutTicketsOrActions[]
   scopes: SimpleScope[]
 }
@@ -122,9 +123,10 @@ export type BoardTemplate = {
   boardid: string
   title: string
   description: string
+  snapshot_date: string | null
 }
 
-export type NewBoardTemplate = Omit<BoardTemplate, "boardtemplateid">
+export type NewBoardTemplate = Omit<BoardTemplate, "boardtemplateid" | "snapshot_date">
 
 export type ChartData = {
   columns: string[]
@@ -151,3 +153,36 @@ export type SimpleScope = {
 export type TimeUnit = (typeof timeUnitOptions)[number]
 
 export type CountUnit = (typeof countUnitOptions)[number]
+
+// Change events sent by the backend through the board's websocket, see backend/futuboard/board_events.py
+type BoardEventOf<EventType extends string, Data> = {
+  type: EventType
+  boardid: string
+  origin: string | null
+  data: Data
+}
+
+export type BoardEvent =
+  | BoardEventOf<"ticket_created" | "ticket_updated", Task>
+  | BoardEventOf<"ticket_moved", Task & { old_columnid: string }>
+  | BoardEventOf<"ticket_deleted", { ticketid: string; columnid: string }>
+  | BoardEventOf<"action_created" | "action_updated" | "action_moved", Action>
+  | BoardEventOf<"action_deleted", { actionid: string; columnid: string }>
+  | BoardEventOf<"column_updated", Column>
+  | BoardEventOf<"user_created" | "user_updated", User>
+  | BoardEventOf<"scope_updated", { scopeid: string; title?: string }>
+  | BoardEventOf<
+      | "board_updated"
+      | "board_deleted"
+      | "column_created"
+      | "column_deleted"
+      | "columns_reordered"
+      | "swimlanecolumn_created"
+      | "swimlanecolumn_updated"
+      | "user_deleted"
+      | "scope_created"
+      | "scope_deleted",
+      unknown
+    >
+  // The client fell too far behind with the events and has to fetch everything again
+  | BoardEventOf<"resync", null>